@@ -1,20 +1,27 @@
-import os
 import json
 import asyncio
-from typing import AsyncGenerator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import AsyncGenerator, Optional
 from datetime import datetime, timedelta
 
 import yfinance as yf
 import numpy as np
-from core.genai_client import api_key, generate_text, get_model_name
-
-# Setup Caching
-CACHE_DIR = os.path.join(os.path.dirname(__file__), "cache")
-os.makedirs(CACHE_DIR, exist_ok=True)
-CACHE_TTL_SECONDS = 4 * 3600  # 4 hours
-
-MODEL_NAME = get_model_name()
-
+import pandas as pd
+from core.config import settings
+from core.errors import ApiError
+from core.genai_client import api_key, generate_text, route_for, stream_text
+from core.llm_cache import llm_response_cache
+from core.prompt_format import compact_json, prompt_metrics
+from services import indicators, scoring
+from services.analysis_dag import Stage, StageGraph, StageRun, stage_memo
+from services.analysis_store import analysis_store
+from services.cache_store import swr_cache
+from services.chart_encoding import UNIX_TIME_INTERVALS
+from services.indicator_state import indicator_states
+from services.macro_service import DEFAULT_VIX_LEVEL, fetch_vix_history, get_macro_snapshot
+from services.market_data import get_market_snapshot
+from services.ohlcv_store import ohlcv_store
 
 def _safe_number(value, default=None):
     try:
@@ -43,134 +50,40 @@ def _completeness_ratio(values):
 
 
 def _bucket_market_cap(market_cap):
-    cap = _safe_number(market_cap, 0) or 0
-    if cap >= 200_000_000_000:
-        return "mega_cap"
-    if cap >= 10_000_000_000:
-        return "large_cap"
-    if cap >= 2_000_000_000:
-        return "mid_cap"
-    return "small_cap"
+    return str(scoring.bucket_market_caps(_safe_number(market_cap, 0)))
 
 
 def _classify_score(score):
-    if score >= 85:
-        return "STRONG BUY"
-    if score >= 70:
-        return "BUY"
-    if score >= 45:
-        return "HOLD"
-    if score >= 25:
-        return "SELL"
-    return "STRONG SELL"
+    return str(scoring.classify_scores(score))
 
 
-def _fundamental_signal(fundamentals):
-    score = 50.0
-    pe = _safe_number(fundamentals.get("P_E_Ratio"))
-    sector_pe = _safe_number(fundamentals.get("Sector_P_E_Median"), 25.0)
-    peg = _safe_number(fundamentals.get("PEG_Ratio"))
-    roe = _safe_number(fundamentals.get("ROE_pct"))
-    debt = _safe_number(fundamentals.get("Debt_to_Equity"))
-    fcf_yield = _safe_number(fundamentals.get("Free_Cash_Flow_Yield_pct"))
-    eps_growth = _safe_number(fundamentals.get("5Y_EPS_Growth_Rate_pct"))
-
-    if pe is not None and sector_pe:
-        premium_pct = ((pe - sector_pe) / sector_pe) * 100
-        if premium_pct <= -15:
-            score += 10
-        elif premium_pct <= 10:
-            score += 3
-        elif premium_pct >= 50:
-            score -= 12
-        elif premium_pct >= 25:
-            score -= 7
-
-    if peg is not None:
-        if peg <= 1.2:
-            score += 10
-        elif peg <= 2.0:
-            score += 4
-        elif peg >= 3.0:
-            score -= 8
-
-    if roe is not None:
-        if roe >= 20:
-            score += 12
-        elif roe >= 12:
-            score += 6
-        elif roe < 5:
-            score -= 8
-
-    if debt is not None:
-        if debt <= 0.8:
-            score += 8
-        elif debt <= 1.5:
-            score += 2
-        elif debt >= 2.5:
-            score -= 10
-
-    if fcf_yield is not None:
-        if fcf_yield >= 5:
-            score += 10
-        elif fcf_yield >= 2:
-            score += 4
-        elif fcf_yield < 0:
-            score -= 10
-
-    if eps_growth is not None:
-        if eps_growth >= 20:
-            score += 12
-        elif eps_growth >= 8:
-            score += 5
-        elif eps_growth < 0:
-            score -= 12
+def _direction(text, positive, negative):
+    text = str(text or "").lower()
+    return 1 if positive in text else (-1 if negative in text else 0)
 
-    return _clamp_score(score)
-
-
-def _technical_signal(technicals):
-    score = 50.0
-    current_price = _safe_number(technicals.get("Current_Price"))
-    sma50 = _safe_number(technicals.get("SMA_50"))
-    sma200 = _safe_number(technicals.get("SMA_200"))
-    rsi = _safe_number(technicals.get("RSI_14"))
-    williams_r = _safe_number(technicals.get("Williams_R"))
-    macd_signal = str(technicals.get("MACD_Signal") or "").lower()
-    volume_momentum = str(technicals.get("Volume_Momentum") or "").lower()
-
-    if current_price is not None and sma50 is not None:
-        score += 8 if current_price > sma50 else -8
-    if current_price is not None and sma200 is not None:
-        score += 10 if current_price > sma200 else -10
-    if sma50 is not None and sma200 is not None:
-        score += 6 if sma50 > sma200 else -6
-
-    if rsi is not None:
-        if 45 <= rsi <= 65:
-            score += 8
-        elif 35 <= rsi < 45 or 65 < rsi <= 75:
-            score += 2
-        else:
-            score -= 8
 
-    if williams_r is not None:
-        if -80 <= williams_r <= -20:
-            score += 4
-        else:
-            score -= 4
-
-    if "bullish" in macd_signal:
-        score += 8
-    elif "bearish" in macd_signal:
-        score -= 8
+def _fundamental_signal(fundamentals):
+    return int(scoring.fundamental_points(
+        _safe_number(fundamentals.get("P_E_Ratio")),
+        _safe_number(fundamentals.get("Sector_P_E_Median"), 25.0),
+        _safe_number(fundamentals.get("PEG_Ratio")),
+        _safe_number(fundamentals.get("ROE_pct")),
+        _safe_number(fundamentals.get("Debt_to_Equity")),
+        _safe_number(fundamentals.get("Free_Cash_Flow_Yield_pct")),
+        _safe_number(fundamentals.get("5Y_EPS_Growth_Rate_pct")),
+    ))
 
-    if "expanding" in volume_momentum:
-        score += 4
-    elif "contracting" in volume_momentum:
-        score -= 4
 
-    return _clamp_score(score)
+def _technical_signal(technicals):
+    return int(scoring.technical_points(
+        _safe_number(technicals.get("Current_Price")),
+        _safe_number(technicals.get("SMA_50")),
+        _safe_number(technicals.get("SMA_200")),
+        _safe_number(technicals.get("RSI_14")),
+        _safe_number(technicals.get("Williams_R")),
+        _direction(technicals.get("MACD_Signal"), "bullish", "bearish"),
+        _direction(technicals.get("Volume_Momentum"), "expanding", "contracting"),
+    ))
 
 
 def _sentiment_signal(sentiment):
@@ -195,36 +108,124 @@ def _sentiment_signal(sentiment):
 
 
 def _macro_signal(macro_risk, market_cap_bucket):
-    score = 50.0
-    vix = _safe_number(macro_risk.get("VIX_Level"))
-    beta = _safe_number(macro_risk.get("Stock_Beta"))
-    pe_premium = _safe_number((macro_risk.get("Valuation_vs_Sector") or {}).get("P_E_Premium_pct"))
-
-    if vix is not None:
-        if vix <= 16:
-            score += 10
-        elif vix <= 22:
-            score += 2
-        elif vix >= 30:
-            score -= 14
-        else:
-            score -= 6
-
-    if beta is not None:
-        if market_cap_bucket in {"mega_cap", "large_cap"}:
-            score += 6 if beta <= 1.1 else (-8 if beta >= 1.5 else -2)
-        else:
-            score += 4 if beta <= 1.3 else (-10 if beta >= 2.0 else -3)
-
-    if pe_premium is not None:
-        if pe_premium >= 50:
-            score -= 10
-        elif pe_premium >= 20:
-            score -= 5
-        elif pe_premium <= -10:
-            score += 4
-
-    return _clamp_score(score)
+    return int(scoring.macro_points(
+        _safe_number(macro_risk.get("VIX_Level")),
+        _safe_number(macro_risk.get("Stock_Beta")),
+        _safe_number((macro_risk.get("Valuation_vs_Sector") or {}).get("P_E_Premium_pct")),
+        scoring.is_large_cap(market_cap_bucket),
+    ))
+
+
+# ─── Deterministic Composite ──────────────────────────────────────────────────
+
+def _weighted_score(sub_scores, score_weights):
+    return round(sum(sub_scores[key] * weight for key, weight in score_weights.items()))
+
+
+def _completeness(fundamentals, technicals, sentiment, macro_risk):
+    return {
+        "Fundamental": _completeness_ratio(
+            [
+                fundamentals.get("P_E_Ratio"),
+                fundamentals.get("P_B_Ratio"),
+                fundamentals.get("PEG_Ratio"),
+                fundamentals.get("ROE_pct"),
+                fundamentals.get("Debt_to_Equity"),
+                fundamentals.get("Free_Cash_Flow_Yield_pct"),
+                fundamentals.get("5Y_EPS_Growth_Rate_pct"),
+            ]
+        ),
+        "Technical": _completeness_ratio(
+            [
+                technicals.get("Current_Price"),
+                technicals.get("SMA_50"),
+                technicals.get("SMA_200"),
+                technicals.get("RSI_14"),
+                technicals.get("Williams_R"),
+            ]
+        ),
+        "Sentiment": _completeness_ratio(
+            [
+                sentiment.get("FinBERT_News_Score_Approx"),
+                len(sentiment.get("Recent_Headlines") or []),
+            ]
+        ),
+        "Macro_Risk": _completeness_ratio(
+            [
+                macro_risk.get("VIX_Level"),
+                macro_risk.get("Stock_Beta"),
+                (macro_risk.get("Valuation_vs_Sector") or {}).get("P_E_Premium_pct"),
+            ]
+        ),
+    }
+
+
+def _deterministic_composite(inputs):
+    """Rule-based sub-scores and the cap-weighted composite; needs no LLM."""
+    market_cap_bucket = inputs["market_cap_bucket"]
+    sub_scores = {
+        "Fundamental": _fundamental_signal(inputs["fundamentals"]),
+        "Technical": _technical_signal(inputs["technicals"]),
+        "Sentiment": _sentiment_signal(inputs["sentiment"]),
+        "Macro_Risk": _macro_signal(inputs["macro_risk"], market_cap_bucket),
+    }
+    score_weights = scoring.SCORE_WEIGHTS[market_cap_bucket]
+    score = _weighted_score(sub_scores, score_weights)
+    return {
+        "score": score,
+        "recommendation": _classify_score(score),
+        "sub_scores": sub_scores,
+        "score_weights": score_weights,
+        "stockProfile": market_cap_bucket,
+    }
+
+
+def _calibrate(llm_result, composite, completeness):
+    """Blends the CIO sub-scores with the deterministic ones, weighted by data completeness."""
+    llm_sub_scores = llm_result.get("Sub_Scores", {}) or {}
+    deterministic_sub_scores = composite["sub_scores"]
+
+    calibrated_sub_scores = {}
+    domain_confidence = {}
+    deltas = []
+    for key, deterministic_score in deterministic_sub_scores.items():
+        llm_score = _clamp_score(llm_sub_scores.get(key), deterministic_score)
+        completeness_ratio = completeness.get(key, 0.5)
+        llm_weight = 0.5 + (completeness_ratio * 0.2)
+        deterministic_weight = 1.0 - llm_weight
+        calibrated_score = round((llm_score * llm_weight) + (deterministic_score * deterministic_weight))
+        calibrated_sub_scores[key] = _clamp_score(calibrated_score, deterministic_score)
+
+        delta = abs(llm_score - deterministic_score)
+        deltas.append(delta)
+        domain_confidence[key] = max(35, min(99, int((completeness_ratio * 100) - (delta * 0.45) + 28)))
+
+    score = _weighted_score(calibrated_sub_scores, composite["score_weights"])
+
+    avg_delta = sum(deltas) / len(deltas) if deltas else 18
+    avg_completeness = sum(completeness.values()) / len(completeness) if completeness else 0.5
+    analysis_confidence = max(40, min(98, int((avg_completeness * 100) - (avg_delta * 0.55) + 35)))
+
+    low_confidence_reasons = []
+    for key, confidence_value in domain_confidence.items():
+        if confidence_value < 60:
+            low_confidence_reasons.append(f"{key.lower()} disagreement_or_missing_data")
+
+    summary = llm_result.get("Expected_Trend_1_to_6_Months", "")
+    if not summary:
+        expected_direction = "upside bias" if score >= 70 else ("downside risk" if score < 45 else "range-bound setup")
+        summary = f"The calibrated signal suggests a {expected_direction} over the next 1-6 months, with confidence driven primarily by the current fundamental/technical alignment."
+
+    return {
+        "sub_scores": calibrated_sub_scores,
+        "llm_sub_scores": {key: _clamp_score(value) for key, value in llm_sub_scores.items()},
+        "domain_confidence": domain_confidence,
+        "score": score,
+        "recommendation": _classify_score(score),
+        "analysis_confidence": analysis_confidence,
+        "low_confidence_reasons": low_confidence_reasons,
+        "summary": summary,
+    }
 
 # ─── Agent Prompts ────────────────────────────────────────────────────────────
 
@@ -343,368 +344,538 @@ CIO_RESULT_SCHEMA = {
 }
 
 
+# Bump a role's version whenever its template changes, so cached responses are not reused.
+PROMPT_TEMPLATE_VERSIONS = {"bull": 1, "bear": 1, "quant": 1, "cio": 1}
+
+# Shorter, still self-explanatory keys for the data embedded in prompts.
+PROMPT_KEY_ALIASES = {
+    "P_E_Ratio": "PE",
+    "Sector_P_E_Median": "Sector_PE_Median",
+    "P_B_Ratio": "PB",
+    "PEG_Ratio": "PEG",
+    "Debt_to_Equity": "D_E",
+    "Free_Cash_Flow_Yield_pct": "FCF_Yield_pct",
+    "5Y_EPS_Growth_Rate_pct": "EPS_Growth_5Y_pct",
+    "Recent_EPS_Revision_Trend": "EPS_Revision",
+    "Current_Price": "Price",
+    "Volume_Momentum": "Vol_Momentum",
+    "FinBERT_News_Score_Approx": "News_Score",
+    "Recent_Headlines": "Headlines",
+    "Overnight_Social_Sentiment": "Social_Sentiment",
+    "Federal_Funds_Rate_Trend": "Fed_Rate_Trend",
+    "US_GDP_Expectation_pct": "GDP_Exp_pct",
+    "Valuation_vs_Sector": "Valuation",
+    "P_E_Premium_pct": "PE_Premium_pct",
+    "Fundamentals_Valuation": "Multiples",
+    "Macro_and_Risk": "Macro_Risk",
+}
+
+
+def _prompt_json(payload) -> str:
+    return compact_json(payload, PROMPT_KEY_ALIASES)
+
+
+def _render_prompt(role: str, template: str, **fields) -> str:
+    prompt = template.format(**fields)
+    prompt_metrics.record_prompt(role, prompt)
+    return prompt
+
+
 # ─── Async Agent Runner with Retry ────────────────────────────────────────────
 
-async def _call_agent_async(prompt: str, use_json: bool = False, max_retries: int = 3) -> str:
-    """Calls Gemini asynchronously with retry on transient provider errors."""
-    return await generate_text(
+def _response_cache_key(role: str, prompt: str) -> Optional[str]:
+    if role not in PROMPT_TEMPLATE_VERSIONS:
+        return None
+    return llm_response_cache.key(route_for(role).model, PROMPT_TEMPLATE_VERSIONS[role], prompt)
+
+
+async def _call_agent_async(prompt: str, role: str, use_json: bool = False, max_retries: int = 3) -> str:
+    """Calls the model routed for `role` with retry on transient provider errors.
+
+    Responses for templated agent prompts are served from the response cache when the exact
+    same prompt was answered recently.
+    """
+    cache_key = _response_cache_key(role, prompt)
+    if cache_key:
+        cached = llm_response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    text = await generate_text(
         prompt,
+        role=role,
         use_json=use_json,
         response_json_schema=CIO_RESULT_SCHEMA if use_json else None,
         max_retries=max_retries,
     )
+    if cache_key and text:
+        try:
+            if use_json:
+                json.loads(text)
+            llm_response_cache.set(cache_key, text)
+        except json.JSONDecodeError:
+            pass
+    return text
+
+
+async def _stream_agent_async(prompt: str, role: str, max_retries: int = 3) -> AsyncGenerator[str, None]:
+    """Streams a debate agent's reply as text deltas; retries only before the first delta.
+
+    A cached reply is replayed as a single delta.
+    """
+    cache_key = _response_cache_key(role, prompt)
+    if cache_key:
+        cached = llm_response_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+    parts = []
+    async for delta in stream_text(prompt, role=role, max_retries=max_retries):
+        parts.append(delta)
+        yield delta
+    text = "".join(parts).strip()
+    if cache_key and text:
+        llm_response_cache.set(cache_key, text)
+
+
+# ─── Live Data Fetchers ───────────────────────────────────────────────────────
+
+# Bounded pool for the blocking yfinance calls so they never run on the event loop.
+_FETCH_EXECUTOR = ThreadPoolExecutor(
+    max_workers=max(1, settings.analysis_fetch_workers),
+    thread_name_prefix="analysis-fetch",
+)
+
+
+def _fetch_headlines(ticker: str) -> list:
+    try:
+        news = yf.Ticker(ticker).news or []
+        return [n['title'] for n in news[:5]]
+    except Exception:
+        return []
+
+
+def _get_headlines(ticker: str) -> list:
+    headlines, _ = swr_cache.get_or_fetch(
+        f"news:{ticker.upper()}",
+        lambda: _fetch_headlines(ticker),
+        ttl_seconds=settings.cache_ttl_seconds_news,
+        swr_seconds=settings.cache_swr_seconds_news,
+    )
+    return headlines
+
+
+def _history_end_date(target_date: Optional[str]) -> Optional[datetime]:
+    if not target_date:
+        return None
+    try:
+        # Add 1 day to end_date to ensure the target_date is included in yfinance history
+        return datetime.strptime(target_date, "%Y-%m-%d") + timedelta(days=1)
+    except ValueError:
+        raise ValueError(f"Invalid date format: {target_date}")
+
+
+async def _fetch_sources(ticker: str, end_date: Optional[datetime] = None) -> AsyncGenerator[tuple, None]:
+    """Fans the blocking provider calls out to the fetch pool and yields (name, value) as each lands."""
+    fetchers = {
+        "market data": lambda: get_market_snapshot(ticker)[0],
+        "macro snapshot": get_macro_snapshot,
+        "news": lambda: _get_headlines(ticker),
+    }
+    if end_date:
+        fetchers["price history"] = lambda: _daily_bars(ticker, end_date - timedelta(days=365), end_date)
+
+    loop = asyncio.get_running_loop()
+
+    async def run_fetch(name, fetcher):
+        return name, await loop.run_in_executor(_FETCH_EXECUTOR, fetcher)
+
+    for coro in asyncio.as_completed([run_fetch(name, fetcher) for name, fetcher in fetchers.items()]):
+        yield await coro
+
+
+def _sanitize(val):
+    try:
+        return None if (val is None or (isinstance(val, float) and np.isnan(val))) else val
+    except Exception:
+        return val
+
+
+def _change_percent(info, hist, current_price):
+    change_pct = info.get("regularMarketChangePercent", None)
+    if change_pct is not None:
+        change_pct = change_pct * 100
+        # Sanity check: if result is unreasonably large, recalculate from price history
+        if abs(change_pct) > 25:
+            if len(hist) > 1:
+                prev = hist['Close'].iloc[-2]
+                change_pct = ((current_price - prev) / prev) * 100
+            else:
+                change_pct = 0.0
+    elif len(hist) > 1:
+        prev = hist['Close'].iloc[-2]
+        change_pct = ((current_price - prev) / prev) * 100
+    else:
+        change_pct = 0.0
+    return _sanitize(change_pct)
+
+
+def _prepare_inputs(ticker: str, target_date: Optional[str], sources: dict) -> Optional[dict]:
+    """Turns the fetched sources into the per-agent payload segments, or None without price history."""
+    snapshot = sources["market data"]
+    info = snapshot.info
+    # Without a target date the shared snapshot already holds the trailing year of daily bars.
+    hist = sources["price history"] if target_date else snapshot.history
+    macro_snapshot, macro_cache_meta = sources["macro snapshot"]
+    recent_headlines = sources["news"]
+
+    if hist.empty:
+        return None
+
+    current_price = info.get("currentPrice", 0) or hist['Close'].iloc[-1]
+
+    # ── Build Payload Segments (each agent gets only what it needs) ───────────
+    fundamentals = scoring.fundamentals_from_info(info)
+    raw_pe = fundamentals["P_E_Ratio"]
+
+    # Technicals (hist may be a shared snapshot frame, so read its columns without copying).
+    # Live analyses advance the persisted per-ticker state by the newly completed bars only.
+    if target_date:
+        latest = indicators.latest_technicals(
+            hist['Close'].to_numpy(), hist['High'].to_numpy(), hist['Low'].to_numpy(), hist['Volume'].to_numpy()
+        )
+    else:
+        latest = indicator_states.technicals(ticker, hist)
+    sma50 = float(latest.sma50)
+    sma200 = float(latest.sma200)
+    rsi_val = round(float(latest.rsi14), 2)
+    vol_momentum = "Expanding" if latest.volume > latest.volume_avg20 else "Contracting"
+
+    # Williams %R (using past 14 days high/low)
+    williams_r = float(latest.williams_r(current_price))
+    williams_r = round(williams_r, 2) if not np.isnan(williams_r) else None
+
+    technicals = {
+        "Current_Price": round(current_price, 2),
+        "SMA_50": round(sma50, 2) if not np.isnan(sma50) else None,
+        "SMA_200": round(sma200, 2) if not np.isnan(sma200) else None,
+        "RSI_14": rsi_val if not np.isnan(rsi_val) else None,
+        "MACD_Signal": "Bullish Crossover" if latest.macd > latest.macd_signal else "Bearish Crossover",
+        "Williams_R": williams_r,
+        "Volume_Momentum": vol_momentum,
+    }
+
+    sentiment = {
+        "FinBERT_News_Score_Approx": 0.5 if recent_headlines else 0.1,
+        "Recent_Headlines": recent_headlines,
+        "Overnight_Social_Sentiment": "Neutral",
+    }
+
+    macro_risk = {
+        **macro_snapshot.to_payload(),
+        "Stock_Beta": info.get("beta", 1.0),
+        "Valuation_vs_Sector": {
+            "P_E_Ratio": raw_pe,
+            "Sector_P_E_Median": 25.0,
+            "P_E_Premium_pct": round((raw_pe - 25.0) / 25.0 * 100, 1) if raw_pe else None,
+        }
+    }
+
+    return {
+        "info": info,
+        "hist": hist,
+        "current_price": current_price,
+        "change_percent": _change_percent(info, hist, current_price),
+        "market_cap_bucket": _bucket_market_cap(info.get("marketCap")),
+        "macro_snapshot": macro_snapshot,
+        "macro_cache_meta": macro_cache_meta,
+        "fundamentals": fundamentals,
+        "technicals": technicals,
+        "sentiment": sentiment,
+        "macro_risk": macro_risk,
+    }
+
+
+def _price_free_bases(info: dict, fundamentals: dict, macro_risk: dict) -> dict:
+    """Fingerprint bases for the fundamentals and macro stages, without the multiples repriced per quote.
+
+    `priced_info` re-derives trailingPE and marketCap from the live price, so P/E, PEG, FCF yield
+    and the sector P/E premium move on every tick. Keying on the stored inputs behind them (EPS,
+    shares, free cash flow, sector median) lets a price-only move reuse the Bull and Bear reports.
+    """
+    eps = info.get("trailingEps")
+    shares = info.get("sharesOutstanding")
+    repriced_pe = bool(eps and eps > 0)
+    pe_basis = {"trailingEps": eps} if repriced_pe else fundamentals["P_E_Ratio"]
+    fundamentals_basis = {**fundamentals, "P_E_Ratio": pe_basis}
+    if repriced_pe and info.get("pegRatio") is None:
+        # Derived from P/E and EPS growth, both already in the basis.
+        fundamentals_basis["PEG_Ratio"] = None
+    if shares:
+        fundamentals_basis["Free_Cash_Flow_Yield_pct"] = {
+            "freeCashflow": info.get("freeCashflow"),
+            "sharesOutstanding": shares,
+        }
+    valuation = macro_risk.get("Valuation_vs_Sector") or {}
+    macro_basis = {
+        **macro_risk,
+        "Valuation_vs_Sector": {"P_E_Ratio": pe_basis, "Sector_P_E_Median": valuation.get("Sector_P_E_Median")},
+    }
+    return {"fundamentals": fundamentals_basis, "macro": macro_basis}
+
+
+# ─── Pipeline Stages ──────────────────────────────────────────────────────────
+
+DEBATE_ROLES = ("bull", "bear", "quant")
+
+# fetch → features → debate → CIO → calibration. Only the LLM stages are memoized: a stage is
+# reused when the fingerprints of its direct inputs match a previous run of the same ticker.
+# Fundamentals and macro are fingerprinted on their price-free bases (`_price_free_bases`),
+# so a price-only move re-runs Quant and the CIO but keeps the Bull and Bear reports.
+ANALYSIS_GRAPH = StageGraph([
+    Stage("fetch"),
+    Stage("profile", ("fetch",)),
+    Stage("fundamentals", ("fetch",)),
+    Stage("technicals", ("fetch",)),
+    Stage("sentiment", ("fetch",)),
+    Stage("macro", ("fetch",)),
+    Stage("bull", ("fundamentals",), memoize=True),
+    Stage("bear", ("fundamentals", "macro"), memoize=True),
+    Stage("quant", ("technicals", "sentiment"), memoize=True),
+    Stage("cio", ("profile", "fundamentals", "technicals", "sentiment", "macro", "bull", "bear", "quant"), memoize=True),
+    Stage("calibration", ("cio", "fundamentals", "technicals", "sentiment", "macro")),
+])
+
+
+def _stage_salts() -> dict:
+    # A template or model change must invalidate the memoized output even if the data did not move.
+    return {role: [PROMPT_TEMPLATE_VERSIONS[role], route_for(role).model] for role in (*DEBATE_ROLES, "cio")}
 
 
 # ─── Main Analysis Function (SSE Stream) ──────────────────────────────────────
 
+def sse(payload: dict) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+
 async def analyze_stock_stream(ticker: str, target_date: str = None) -> AsyncGenerator[str, None]:
     """
     Hybrid RAG + Adversarial Multi-Agent Debate architecture as an Async Generator.
     Yields SSE-formatted data chunks:
     - data: {"type": "status", "message": "..."}
+    - data: {"type": "provisional", "data": {"score": ..., "sub_scores": {...}, ...}}
+    - data: {"type": "agent_delta", "agent": "bull", "text": "..."}
     - data: {"type": "agent_done", "agent": "bull", "text": "..."}
     - data: {"type": "complete", "data": {...}}
     - data: {"type": "error", "message": "..."}
     """
-    def sse(payload: dict) -> str:
-        return f"data: {json.dumps(payload)}\n\n"
+    async for event in analysis_events(ticker, target_date):
+        yield sse(event)
+
+
+async def analysis_events(
+    ticker: str,
+    target_date: str = None,
+    agent_limiter: Optional[asyncio.Semaphore] = None,
+) -> AsyncGenerator[dict, None]:
+    """The analysis pipeline as plain event dicts; `agent_limiter` caps concurrent LLM calls."""
+    limiter = agent_limiter or nullcontext()
 
     try:
         if not api_key:
-            yield sse({"type": "error", "message": "GEMINI_API_KEY is not set."})
+            yield {"type": "error", "message": "GEMINI_API_KEY is not set."}
             return
 
         ticker = ticker.upper()
 
         # ── 0. Check Cache ────────────────────────────────────────────────────
-        cache_key = f"{ticker}_{target_date}" if target_date else ticker
-        cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
-        
-        if os.path.exists(cache_file):
-            file_mtime = os.path.getmtime(cache_file)
-            file_date = datetime.fromtimestamp(file_mtime).date()
-            today = datetime.now().date()
-            
-            # Cache is valid if it's for a past date, or if it's today's analysis
-            if target_date or file_date == today:
-                yield sse({"type": "status", "message": f"Cache hit for {ticker}. Loading..."})
-                with open(cache_file, "r") as f:
-                    cache_data = json.load(f)
-                
-                if "metadata" not in cache_data:
-                    cache_data["metadata"] = {}
-                cache_data["metadata"]["is_cached"] = True
-                cache_data["metadata"]["generated_at"] = datetime.fromtimestamp(file_mtime).isoformat()
-                    
-                yield sse({"type": "complete", "data": cache_data})
-                return
-
-        yield sse({"type": "status", "message": f"Fetching live market data for {ticker}..."})
-
-        # ── 1. Fetch Live Data ────────────────────────────────────────────────
-        stock = yf.Ticker(ticker)
-        info = stock.info
-        
-        if target_date:
-            try:
-                # Add 1 day to end_date to ensure the target_date is included in yfinance history
-                end_date = datetime.strptime(target_date, "%Y-%m-%d") + timedelta(days=1)
-            except ValueError:
-                yield sse({"type": "error", "message": f"Invalid date format: {target_date}"})
-                return
-        else:
-            end_date = datetime.now()
-            
-        hist = stock.history(start=end_date - timedelta(days=365), end=end_date)
-        
-        if hist.empty:
-            yield sse({"type": "error", "message": f"Could not retrieve historical data for {ticker}."})
+        # Dated analyses never go stale; undated ones are reused for the rest of the day.
+        cached = await asyncio.to_thread(analysis_store.get_fresh, ticker, target_date)
+        if cached is not None:
+            yield {"type": "status", "message": f"Cache hit for {ticker}. Loading..."}
+            cache_data = {**cached, "metadata": {**(cached.get("metadata") or {}), "is_cached": True}}
+            yield {"type": "complete", "data": cache_data}
             return
 
-        current_price = info.get("currentPrice", 0) or hist['Close'].iloc[-1]
-
-        # ── 2. Sanitize Fundamentals ──────────────────────────────────────────
-        raw_pe = info.get("trailingPE", None)
-        raw_peg = info.get("pegRatio", None)
-        raw_eps_growth = info.get("earningsQuarterlyGrowth", None)
-        raw_dte = info.get("debtToEquity", None)
-
-        # PEG: dynamically calculate if missing
-        peg_ratio = raw_peg
-        if peg_ratio is None or (isinstance(peg_ratio, float) and np.isnan(peg_ratio)):
-            eps_growth_pct = round(raw_eps_growth * 100, 2) if raw_eps_growth else None
-            if raw_pe and eps_growth_pct and eps_growth_pct != 0:
-                peg_ratio = round(raw_pe / eps_growth_pct, 2)
-            else:
-                peg_ratio = 2.0  # Sector fallback
-
-        # D/E: normalize if yfinance returns it as a percentage (>10 heuristic)
-        dte_normalized = None
-        if raw_dte is not None:
-            dte_normalized = round(raw_dte / 100, 2) if abs(raw_dte) > 10 else round(raw_dte, 2)
+        yield {"type": "status", "message": f"Fetching live market data for {ticker}..."}
 
-        # ── 3. Build Payload Segments (each agent gets only what it needs) ────
-        fundamentals = {
-            "P_E_Ratio": raw_pe,
-            "Sector_P_E_Median": 25.0,
-            "P_B_Ratio": info.get("priceToBook", None),
-            "PEG_Ratio": peg_ratio,
-            "ROE_pct": round(info.get("returnOnEquity", 0) * 100, 2) if info.get("returnOnEquity") else None,
-            "Debt_to_Equity": dte_normalized,
-            "Free_Cash_Flow_Yield_pct": round(info.get("freeCashflow", 0) / info.get("marketCap", 1) * 100, 2) if info.get("freeCashflow") and info.get("marketCap") else None,
-            "5Y_EPS_Growth_Rate_pct": round(raw_eps_growth * 100, 2) if raw_eps_growth else None,
-            "Recent_EPS_Revision_Trend": "Neutral"
-        }
-
-        # Technicals
-        hist['SMA50'] = hist['Close'].rolling(50).mean()
-        hist['SMA200'] = hist['Close'].rolling(200).mean()
-        sma50 = hist['SMA50'].iloc[-1]
-        sma200 = hist['SMA200'].iloc[-1]
-        delta = hist['Close'].diff()
-        gain = delta.where(delta > 0, 0).rolling(14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-        rsi = 100 - (100 / (1 + gain / loss))
-        rsi_val = round(rsi.iloc[-1], 2)
-        ema12 = hist['Close'].ewm(span=12, adjust=False).mean()
-        ema26 = hist['Close'].ewm(span=26, adjust=False).mean()
-        macd = ema12 - ema26
-        macd_sig = macd.ewm(span=9, adjust=False).mean()
-        vol_avg_20 = hist['Volume'].rolling(20).mean().iloc[-1]
-        vol_momentum = "Expanding" if hist['Volume'].iloc[-1] > vol_avg_20 else "Contracting"
-
-        # Williams %R (using past 14 days high/low)
-        h14 = hist['High'].rolling(14).max().iloc[-1]
-        l14 = hist['Low'].rolling(14).min().iloc[-1]
-        williams_r = round(((h14 - current_price) / (h14 - l14)) * -100, 2) if (h14 - l14) != 0 else None
-
-        technicals = {
-            "Current_Price": round(current_price, 2),
-            "SMA_50": round(sma50, 2) if not np.isnan(sma50) else None,
-            "SMA_200": round(sma200, 2) if not np.isnan(sma200) else None,
-            "RSI_14": rsi_val if not np.isnan(rsi_val) else None,
-            "MACD_Signal": "Bullish Crossover" if macd.iloc[-1] > macd_sig.iloc[-1] else "Bearish Crossover",
-            "Williams_R": williams_r,
-            "Volume_Momentum": vol_momentum,
-        }
-
-        # VIX & News
+        # ── 1. Fetch Live Data (parallel fan-out off the event loop) ─────────
         try:
-            vix_hist = yf.Ticker("^VIX").history(period="5d")
-            vix_level = round(vix_hist['Close'].iloc[-1], 2) if not vix_hist.empty else 15.0
-        except Exception:
-            vix_level = 15.0
+            end_date = _history_end_date(target_date)
+        except ValueError as exc:
+            yield {"type": "error", "message": str(exc)}
+            return
 
-        try:
-            news = stock.news or []
-            recent_headlines = [n['title'] for n in news[:5]]
-        except Exception:
-            recent_headlines = []
-
-        sentiment = {
-            "FinBERT_News_Score_Approx": 0.5 if recent_headlines else 0.1,
-            "Recent_Headlines": recent_headlines,
-            "Overnight_Social_Sentiment": "Neutral",
-        }
+        sources = {}
+        async for name, value in _fetch_sources(ticker, end_date):
+            sources[name] = value
+            yield {"type": "status", "message": f"Received {name} for {ticker}."}
+
+        # ── 2. Build Payload Segments ─────────────────────────────────────────
+        # Advancing the persisted indicator state reads and writes files; keep it off the event loop.
+        inputs = await asyncio.to_thread(_prepare_inputs, ticker, target_date, sources)
+        if inputs is None:
+            yield {"type": "error", "message": f"Could not retrieve historical data for {ticker}."}
+            return
 
-        macro_risk = {
-            "VIX_Level": vix_level,
-            "Federal_Funds_Rate_Trend": "Stable",
-            "US_GDP_Expectation_pct": 2.0,
-            "Stock_Beta": info.get("beta", 1.0),
-            "Valuation_vs_Sector": {
-                "P_E_Ratio": raw_pe,
-                "Sector_P_E_Median": 25.0,
-                "P_E_Premium_pct": round((raw_pe - 25.0) / 25.0 * 100, 1) if raw_pe else None,
-            }
+        info = inputs["info"]
+        hist = inputs["hist"]
+        current_price = inputs["current_price"]
+        macro_snapshot = inputs["macro_snapshot"]
+        vix_level = macro_snapshot.vix_level
+        fundamentals = inputs["fundamentals"]
+        technicals = inputs["technicals"]
+        sentiment = inputs["sentiment"]
+        macro_risk = inputs["macro_risk"]
+
+        # The feature stages are cheap and always recomputed; their outputs are what the
+        # memoized agent stages below are fingerprinted against.
+        run = StageRun(ANALYSIS_GRAPH, stage_memo, scope=ticker, salts=_stage_salts())
+        run.put("fetch", sources)
+        run.put("profile", {"Ticker": ticker, "Sector": info.get("sector", "Unknown")})
+        bases = _price_free_bases(info, fundamentals, macro_risk)
+        run.put("fundamentals", fundamentals, basis=bases["fundamentals"])
+        run.put("technicals", technicals)
+        run.put("sentiment", sentiment)
+        run.put("macro", macro_risk, basis=bases["macro"])
+
+        # ── 3. Provisional Score (deterministic, before any agent runs) ───────
+        composite = _deterministic_composite(inputs)
+        yield {
+            "type": "provisional",
+            "data": {**composite, "price": current_price, "changePercent": inputs["change_percent"]},
         }
 
         full_payload = {
-            "Ticker": ticker.upper(),
-            "Sector": info.get("sector", "Unknown"),
+            **run.outputs["profile"],
             "Fundamentals": fundamentals,
             "Technicals": technicals,
             "Sentiment": sentiment,
             "Macro_and_Risk": macro_risk,
         }
 
-        # ── 4. Build Per-Agent Prompts ────────────────────────────────────────
-        bull_p = BULL_PROMPT.format(
-            fundamentals_json=json.dumps(fundamentals, indent=2)
-        )
-        bear_p = BEAR_PROMPT.format(
-            macro_risk_json=json.dumps({**macro_risk, "Fundamentals_Valuation": {
-                "P_E_Ratio": fundamentals["P_E_Ratio"],
-                "P_B_Ratio": fundamentals["P_B_Ratio"],
-                "PEG_Ratio": fundamentals["PEG_Ratio"],
-                "Debt_to_Equity": fundamentals["Debt_to_Equity"],
-            }}, indent=2)
-        )
-        quant_p = QUANT_PROMPT.format(
-            technicals_sentiment_json=json.dumps({**technicals, **sentiment}, indent=2)
-        )
-
-        yield sse({"type": "status", "message": "Starting 3-Agent Parallel Debate..."})
+        # ── 4. Reuse Debate Agents Whose Inputs Did Not Change ────────────────
+        debate_results = {}
+        for name in DEBATE_ROLES:
+            reused = run.recall(name)
+            if reused is not None:
+                debate_results[name] = reused
+                yield {"type": "agent_done", "agent": name, "text": reused, "reused": True}
+        if debate_results:
+            yield {"type": "status", "message": f"Reusing unchanged {', '.join(debate_results)} analysis."}
+
+        # ── 5. Build Per-Agent Prompts for the Stale Ones ─────────────────────
+        prompts = {}
+        if "bull" not in debate_results:
+            prompts["bull"] = _render_prompt("bull", BULL_PROMPT, fundamentals_json=_prompt_json(fundamentals))
+        if "bear" not in debate_results:
+            prompts["bear"] = _render_prompt(
+                "bear",
+                BEAR_PROMPT,
+                macro_risk_json=_prompt_json({**macro_risk, "Fundamentals_Valuation": {
+                    "P_E_Ratio": fundamentals["P_E_Ratio"],
+                    "P_B_Ratio": fundamentals["P_B_Ratio"],
+                    "PEG_Ratio": fundamentals["PEG_Ratio"],
+                    "Debt_to_Equity": fundamentals["Debt_to_Equity"],
+                }}),
+            )
+        if "quant" not in debate_results:
+            prompts["quant"] = _render_prompt(
+                "quant", QUANT_PROMPT, technicals_sentiment_json=_prompt_json({**technicals, **sentiment})
+            )
+
+        # ── 6. Run the Stale Agents in Parallel & Stream their tokens ─────────
+        # Deltas from the agents are interleaved through one queue; each agent
+        # still ends with a full `agent_done` event for clients that ignore deltas.
+        if prompts:
+            yield {"type": "status", "message": f"Starting {len(prompts)}-Agent Parallel Debate..."}
+
+        queue: asyncio.Queue = asyncio.Queue()
 
-        # ── 5. Run Agents 1, 2, 3 in Parallel & Yield as they finish ──────────
         async def run_agent(name, prompt):
-            text = await _call_agent_async(prompt)
-            return name, text
+            parts = []
+            try:
+                async with limiter:
+                    async for delta in _stream_agent_async(prompt, role=name):
+                        parts.append(delta)
+                        await queue.put({"type": "agent_delta", "agent": name, "text": delta})
+                await queue.put({"type": "agent_done", "agent": name, "text": "".join(parts).strip()})
+            except Exception as exc:
+                await queue.put(exc)
 
-        pending = [
-            run_agent("bull", bull_p),
-            run_agent("bear", bear_p),
-            run_agent("quant", quant_p)
-        ]
+        tasks = [asyncio.create_task(run_agent(name, prompt)) for name, prompt in prompts.items()]
 
-        debate_results = {}
-        for coro in asyncio.as_completed(pending):
-            name, out = await coro
-            debate_results[name] = out
-            yield sse({"type": "agent_done", "agent": name, "text": out})
+        try:
+            while len(debate_results) < len(DEBATE_ROLES):
+                event = await queue.get()
+                if isinstance(event, Exception):
+                    raise event
+                if event["type"] == "agent_done":
+                    debate_results[event["agent"]] = event["text"]
+                    if event["text"]:
+                        run.remember(event["agent"], event["text"])
+                    else:
+                        run.put(event["agent"], event["text"])
+                yield event
+        finally:
+            for task in tasks:
+                task.cancel()
 
         bull_out = debate_results.get("bull", "")
         bear_out = debate_results.get("bear", "")
         quant_out = debate_results.get("quant", "")
 
-        yield sse({"type": "status", "message": "Synthesizing debate (CIO Agent)..."})
-
-        # ── 6. Agent 4 (CIO) — Sequential, reads the debate ──────────────────
-        cio_p = CIO_PROMPT.format(
-            ticker=ticker,
-            raw_data_json=json.dumps(full_payload, indent=2),
-            bull_output=bull_out,
-            bear_output=bear_out,
-            quant_output=quant_out,
-        )
-        cio_raw = await _call_agent_async(cio_p, use_json=True)
+        # ── 7. Agent 4 (CIO) — Sequential, reads the debate ──────────────────
+        llm_result = run.recall("cio")
+        if llm_result is None:
+            yield {"type": "status", "message": "Synthesizing debate (CIO Agent)..."}
+            cio_p = _render_prompt(
+                "cio",
+                CIO_PROMPT,
+                ticker=ticker,
+                raw_data_json=_prompt_json(full_payload),
+                bull_output=bull_out,
+                bear_output=bear_out,
+                quant_output=quant_out,
+            )
+            async with limiter:
+                cio_raw = await _call_agent_async(cio_p, role="cio", use_json=True)
 
-        # ── 7. Parse CIO Verdict ──────────────────────────────────────────────
-        try:
-            llm_result = json.loads(cio_raw)
-        except json.JSONDecodeError:
-            raise ValueError(f"CIO Agent returned invalid JSON. Raw output: {cio_raw[:300]}")
-
-        summary = llm_result.get("Expected_Trend_1_to_6_Months", "")
-        llm_sub_scores = llm_result.get("Sub_Scores", {}) or {}
-        market_cap_bucket = _bucket_market_cap(info.get("marketCap"))
-        completeness = {
-            "Fundamental": _completeness_ratio(
-                [
-                    fundamentals.get("P_E_Ratio"),
-                    fundamentals.get("P_B_Ratio"),
-                    fundamentals.get("PEG_Ratio"),
-                    fundamentals.get("ROE_pct"),
-                    fundamentals.get("Debt_to_Equity"),
-                    fundamentals.get("Free_Cash_Flow_Yield_pct"),
-                    fundamentals.get("5Y_EPS_Growth_Rate_pct"),
-                ]
-            ),
-            "Technical": _completeness_ratio(
-                [
-                    technicals.get("Current_Price"),
-                    technicals.get("SMA_50"),
-                    technicals.get("SMA_200"),
-                    technicals.get("RSI_14"),
-                    technicals.get("Williams_R"),
-                ]
-            ),
-            "Sentiment": _completeness_ratio(
-                [
-                    sentiment.get("FinBERT_News_Score_Approx"),
-                    len(sentiment.get("Recent_Headlines") or []),
-                ]
-            ),
-            "Macro_Risk": _completeness_ratio(
-                [
-                    macro_risk.get("VIX_Level"),
-                    macro_risk.get("Stock_Beta"),
-                    (macro_risk.get("Valuation_vs_Sector") or {}).get("P_E_Premium_pct"),
-                ]
-            ),
-        }
-
-        deterministic_sub_scores = {
-            "Fundamental": _fundamental_signal(fundamentals),
-            "Technical": _technical_signal(technicals),
-            "Sentiment": _sentiment_signal(sentiment),
-            "Macro_Risk": _macro_signal(macro_risk, market_cap_bucket),
-        }
-
-        calibrated_sub_scores = {}
-        domain_confidence = {}
-        deltas = []
-        for key, deterministic_score in deterministic_sub_scores.items():
-            llm_score = _clamp_score(llm_sub_scores.get(key), deterministic_score)
-            completeness_ratio = completeness.get(key, 0.5)
-            llm_weight = 0.5 + (completeness_ratio * 0.2)
-            deterministic_weight = 1.0 - llm_weight
-            calibrated_score = round((llm_score * llm_weight) + (deterministic_score * deterministic_weight))
-            calibrated_sub_scores[key] = _clamp_score(calibrated_score, deterministic_score)
-
-            delta = abs(llm_score - deterministic_score)
-            deltas.append(delta)
-            domain_confidence[key] = max(35, min(99, int((completeness_ratio * 100) - (delta * 0.45) + 28)))
-
-        score_weights = {
-            "mega_cap": {"Fundamental": 0.42, "Technical": 0.26, "Sentiment": 0.12, "Macro_Risk": 0.20},
-            "large_cap": {"Fundamental": 0.40, "Technical": 0.28, "Sentiment": 0.14, "Macro_Risk": 0.18},
-            "mid_cap": {"Fundamental": 0.37, "Technical": 0.30, "Sentiment": 0.15, "Macro_Risk": 0.18},
-            "small_cap": {"Fundamental": 0.32, "Technical": 0.28, "Sentiment": 0.18, "Macro_Risk": 0.22},
-        }[market_cap_bucket]
-
-        score = round(
-            sum(calibrated_sub_scores[key] * weight for key, weight in score_weights.items())
-        )
-        recommendation = _classify_score(score)
-
-        avg_delta = sum(deltas) / len(deltas) if deltas else 18
-        avg_completeness = sum(completeness.values()) / len(completeness) if completeness else 0.5
-        analysis_confidence = max(40, min(98, int((avg_completeness * 100) - (avg_delta * 0.55) + 35)))
-
-        low_confidence_reasons = []
-        for key, confidence_value in domain_confidence.items():
-            if confidence_value < 60:
-                low_confidence_reasons.append(f"{key.lower()} disagreement_or_missing_data")
-
-        if not summary:
-            expected_direction = "upside bias" if score >= 70 else ("downside risk" if score < 45 else "range-bound setup")
-            summary = f"The calibrated signal suggests a {expected_direction} over the next 1-6 months, with confidence driven primarily by the current fundamental/technical alignment."
-
-        # ── 8. Compute Change % ───────────────────────────────────────────────
-        def sanitize(val):
             try:
-                return None if (val is None or (isinstance(val, float) and np.isnan(val))) else val
-            except Exception:
-                return val
-
-        change_pct = info.get("regularMarketChangePercent", None)
-        if change_pct is not None:
-            change_pct = change_pct * 100
-            # Sanity check: if result is unreasonably large, recalculate from price history
-            if abs(change_pct) > 25:
-                if len(hist) > 1:
-                    prev = hist['Close'].iloc[-2]
-                    change_pct = ((current_price - prev) / prev) * 100
-                else:
-                    change_pct = 0.0
-        elif len(hist) > 1:
-            prev = hist['Close'].iloc[-2]
-            change_pct = ((current_price - prev) / prev) * 100
+                llm_result = json.loads(cio_raw)
+            except json.JSONDecodeError:
+                raise ValueError(f"CIO Agent returned invalid JSON. Raw output: {cio_raw[:300]}")
+            run.remember("cio", llm_result)
         else:
-            change_pct = 0.0
+            yield {"type": "status", "message": "Reusing unchanged CIO verdict."}
+
+        # ── 8. Calibrate the CIO Verdict Against the Deterministic Signals ────
+        completeness = _completeness(fundamentals, technicals, sentiment, macro_risk)
+        calibration = run.put("calibration", _calibrate(llm_result, composite, completeness))
+        market_cap_bucket = composite["stockProfile"]
+        deterministic_sub_scores = composite["sub_scores"]
+        score_weights = composite["score_weights"]
+        calibrated_sub_scores = calibration["sub_scores"]
+        score = calibration["score"]
+        recommendation = calibration["recommendation"]
+        summary = calibration["summary"]
 
         # ── 9. Return Final Unified Payload ──────────────────────────────────
         final_payload = {
             "metadata": {
                 "generated_at": datetime.now().isoformat(),
                 "is_cached": False,
-                "analysisConfidenceScore": analysis_confidence,
+                "analysisConfidenceScore": calibration["analysis_confidence"],
                 "inputHistoryPoints": int(len(hist)),
-                "model": MODEL_NAME,
+                "fundamentalsAsOf": info.get("fundamentalsAsOf"),
+                "model": route_for("cio").model,
+                "models": {role: route_for(role).model for role in ("bull", "bear", "quant", "cio")},
                 "stockProfile": market_cap_bucket,
-                "domainConfidence": domain_confidence,
-                "lowConfidenceReasons": low_confidence_reasons,
+                "domainConfidence": calibration["domain_confidence"],
+                "lowConfidenceReasons": calibration["low_confidence_reasons"],
+                "reusedStages": run.reused,
+                "macro": macro_snapshot.staleness(inputs["macro_cache_meta"]),
             },
             "ticker": ticker,
             "name": info.get("shortName", info.get("longName", ticker)),
@@ -712,7 +883,7 @@ async def analyze_stock_stream(ticker: str, target_date: str = None) -> AsyncGen
             "recommendation": recommendation,
             "summary": summary,
             "price": current_price,
-            "changePercent": sanitize(change_pct),
+            "changePercent": inputs["change_percent"],
             "market_cap": info.get("marketCap", 0),
             "breakdown": {
                 "technicals": "Bullish" if (technicals.get("RSI_14") or 50) > 50 else "Bearish",
@@ -720,12 +891,12 @@ async def analyze_stock_stream(ticker: str, target_date: str = None) -> AsyncGen
                 "valuation": "Premium" if (fundamentals.get("P_E_Ratio") or 0) > 25 else "Value",
                 "risk": "High" if (macro_risk.get("Stock_Beta", 1) > 1.2 or vix_level > 20) else "Low",
             },
-            "metrics": {k: sanitize(v) for k, v in fundamentals.items()},
-            "technicals": {k: sanitize(v) for k, v in technicals.items()},
+            "metrics": {k: _sanitize(v) for k, v in fundamentals.items()},
+            "technicals": {k: _sanitize(v) for k, v in technicals.items()},
             "ai_analysis": {
                 "xai_rationale": llm_result.get("XAI_Rationale", {}),
                 "sub_scores": calibrated_sub_scores,
-                "llm_sub_scores": {key: _clamp_score(value) for key, value in llm_sub_scores.items()},
+                "llm_sub_scores": calibration["llm_sub_scores"],
                 "deterministic_sub_scores": deterministic_sub_scores,
                 "score_weights": score_weights,
                 "debate": {
@@ -747,64 +918,275 @@ async def analyze_stock_stream(ticker: str, target_date: str = None) -> AsyncGen
             ]
         }
 
-        # Save to cache
-        with open(cache_file, "w") as f:
-            json.dump(final_payload, f)
+        # Atomic write, rename and index rewrite are blocking file I/O; keep them off the event loop.
+        await asyncio.to_thread(analysis_store.save, ticker, target_date, final_payload)
 
-        yield sse({"type": "complete", "data": final_payload})
+        yield {"type": "complete", "data": final_payload}
 
     except Exception as e:
-        yield sse({"type": "error", "message": str(e)})
+        if isinstance(e, ApiError):
+            yield {"type": "error", "message": e.message, "code": e.code}
+        else:
+            yield {"type": "error", "message": str(e)}
 
 
-# ─── Historical Data (unchanged) ─────────────────────────────────────────────
+# ─── Deterministic Fast Mode ─────────────────────────────────────────────────
 
-def get_historical_data(ticker: str, period: str = "1mo", interval: str = "1d") -> list:
-    """Fetches raw OHLC data for a dynamic timeframe to feed into trading charts using yfinance."""
+async def fast_analysis(ticker: str, target_date: str = None) -> dict:
+    """The deterministic composite on the same inputs as the full pipeline, without any LLM call."""
+    ticker = ticker.upper()
     try:
-        stock = yf.Ticker(ticker)
-        hist = stock.history(period=period, interval=interval)
-        if hist.empty:
-            return []
-
-        hist = hist.reset_index()
-        time_col = 'Datetime' if 'Datetime' in hist.columns else 'Date'
-
-        chart_data = []
-        for _, row in hist.iterrows():
-            if interval in ['1m', '2m', '5m', '15m', '30m', '60m', '90m', '1h']:
-                time_val = int(row[time_col].timestamp())
-            else:
-                time_val = row[time_col].strftime('%Y-%m-%d')
-
-            chart_data.append({
-                "time": time_val,
-                "open": round(row['Open'], 2),
-                "high": round(row['High'], 2),
-                "low": round(row['Low'], 2),
-                "close": round(row['Close'], 2),
-                "value": round(row['Close'], 2),
-                "volume": int(row['Volume']) if 'Volume' in row else 0,
-            })
-
-        return chart_data
-    except Exception as e:
-        return {"error": str(e)}
+        end_date = _history_end_date(target_date)
+    except ValueError as exc:
+        raise ApiError(status_code=400, code="INVALID_DATE", message=str(exc), details={"date": target_date})
+
+    sources = {name: value async for name, value in _fetch_sources(ticker, end_date)}
+    inputs = await asyncio.to_thread(_prepare_inputs, ticker, target_date, sources)
+    if inputs is None:
+        raise ApiError(
+            status_code=404,
+            code="NO_MARKET_DATA",
+            message=f"Could not retrieve historical data for {ticker}.",
+            details={"ticker": ticker},
+        )
+
+    composite = _deterministic_composite(inputs)
+    info = inputs["info"]
+    return {
+        "metadata": {
+            "generated_at": datetime.now().isoformat(),
+            "mode": "fast",
+            "inputHistoryPoints": int(len(inputs["hist"])),
+            "stockProfile": composite["stockProfile"],
+            "macro": inputs["macro_snapshot"].staleness(inputs["macro_cache_meta"]),
+        },
+        "ticker": ticker,
+        "name": info.get("shortName", info.get("longName", ticker)),
+        "score": composite["score"],
+        "recommendation": composite["recommendation"],
+        "price": inputs["current_price"],
+        "changePercent": inputs["change_percent"],
+        "market_cap": info.get("marketCap", 0),
+        "metrics": {k: _sanitize(v) for k, v in inputs["fundamentals"].items()},
+        "technicals": {k: _sanitize(v) for k, v in inputs["technicals"].items()},
+        "sub_scores": composite["sub_scores"],
+        "score_weights": composite["score_weights"],
+    }
+
+
+# ─── Deterministic Score History ──────────────────────────────────────────────
+
+SCORE_HISTORY_MAX_DAYS = 5 * 366
+# Calendar days fetched before `start` so SMA-200 and the MACD signal are warm on the first day.
+SCORE_HISTORY_WARMUP_DAYS = 400
+
+
+def _history_range(start: Optional[str], end: Optional[str]):
+    try:
+        end_day = datetime.strptime(end, "%Y-%m-%d") if end else datetime.combine(datetime.now().date(), datetime.min.time())
+        start_day = datetime.strptime(start, "%Y-%m-%d") if start else end_day - timedelta(days=365)
+    except ValueError:
+        raise ApiError(
+            status_code=400,
+            code="INVALID_DATE",
+            message="Dates must use the YYYY-MM-DD format",
+            details={"start": start, "end": end},
+        )
+    if start_day > end_day or (end_day - start_day).days > SCORE_HISTORY_MAX_DAYS:
+        raise ApiError(
+            status_code=400,
+            code="INVALID_RANGE",
+            message=f"start must not be after end, and the range may span at most {SCORE_HISTORY_MAX_DAYS} days",
+            details={"start": start, "end": end},
+        )
+    return start_day, end_day
+
+
+def _trading_days(index) -> pd.DatetimeIndex:
+    days = pd.DatetimeIndex(index)
+    if days.tz is not None:
+        days = days.tz_localize(None)
+    return days.normalize()
+
+
+def _daily_bars(ticker: str, start, end) -> pd.DataFrame:
+    """Stored daily bars in [start, end), the window `Ticker.history(start=, end=)` would return."""
+    hist = ohlcv_store.daily(ticker, start)
+    if hist.empty:
+        return hist
+    return hist[_trading_days(hist.index) < pd.Timestamp(end).normalize()]
+
+
+def score_history(ticker: str, start: Optional[str] = None, end: Optional[str] = None) -> dict:
+    """The deterministic sub-scores and cap-weighted composite for every trading day in [start, end].
+
+    Price-driven inputs (technicals, valuation multiples, VIX) are recomputed per day. Reported
+    fundamentals, beta and the cap bucket have no point-in-time history at the provider, so
+    their latest values are held constant and sentiment is neutral.
+    """
+    ticker = ticker.upper()
+    start_day, end_day = _history_range(start, end)
+    fetch_start = start_day - timedelta(days=SCORE_HISTORY_WARMUP_DAYS)
+    fetch_end = end_day + timedelta(days=1)
+
+    info = get_market_snapshot(ticker)[0].info
+    hist = _daily_bars(ticker, fetch_start, fetch_end)
+    if hist.empty:
+        raise ApiError(
+            status_code=404,
+            code="NO_MARKET_DATA",
+            message=f"Could not retrieve historical data for {ticker}.",
+            details={"ticker": ticker},
+        )
+    vix = fetch_vix_history(fetch_start, fetch_end)
+
+    days = _trading_days(hist.index)
+    close = hist["Close"].to_numpy(dtype=np.float64)
+    high = hist["High"].to_numpy(dtype=np.float64)
+    low = hist["Low"].to_numpy(dtype=np.float64)
+    volume = hist["Volume"].to_numpy(dtype=np.float64)
+
+    # ── Technicals (same rounding as the live payload) ───────────────────────
+    macd_line, signal_line = indicators.macd(close)
+    technical = scoring.technical_points(
+        np.round(close, 2),
+        np.round(indicators.sma(close, 50), 2),
+        np.round(indicators.sma(close, 200), 2),
+        np.round(indicators.rsi(close, 14), 2),
+        np.round(indicators.williams_r(high, low, close), 2),
+        np.where(macd_line > signal_line, 1, -1),
+        np.where(volume > indicators.sma(volume, 20), 1, -1),
+    )
+
+    # ── Fundamentals, repriced: multiples move with the close, reports do not ──
+    current_price = _safe_number(info.get("currentPrice")) or close[-1]
+    reprice = close / current_price
+    raw_pe = _safe_number(info.get("trailingPE"))
+    raw_peg = _safe_number(info.get("pegRatio"))
+    raw_eps_growth = _safe_number(info.get("earningsQuarterlyGrowth"))
+    raw_dte = _safe_number(info.get("debtToEquity"))
+    market_cap = _safe_number(info.get("marketCap"))
+    free_cash_flow = _safe_number(info.get("freeCashflow"))
+    roe = _safe_number(info.get("returnOnEquity"))
+
+    pe = scoring.as_array(raw_pe) * reprice
+    eps_growth_pct = round(raw_eps_growth * 100, 2) if raw_eps_growth else None
+    if raw_peg is not None:
+        peg = raw_peg * reprice
+    elif raw_pe and eps_growth_pct:
+        peg = np.round(pe / eps_growth_pct, 2)
+    else:
+        peg = np.full(close.shape, 2.0)  # Sector fallback, as in the live payload
+    dte = None
+    if raw_dte is not None:
+        dte = round(raw_dte / 100, 2) if abs(raw_dte) > 10 else round(raw_dte, 2)
+    fcf_yield = np.full(close.shape, np.nan)
+    if free_cash_flow and market_cap:
+        fcf_yield = np.round(free_cash_flow / (market_cap * reprice) * 100, 2)
+
+    fundamental = scoring.fundamental_points(
+        pe, scoring.SECTOR_PE_MEDIAN, peg, round(roe * 100, 2) if roe else None, dte, fcf_yield, eps_growth_pct
+    )
+
+    # ── Macro: daily VIX, forward-filled over market holidays ────────────────
+    vix_by_day = pd.Series(vix.to_numpy(dtype=np.float64), index=_trading_days(vix.index))
+    vix_by_day = vix_by_day[~vix_by_day.index.duplicated(keep="last")].sort_index()
+    vix_levels = np.round(vix_by_day.reindex(days, method="ffill").to_numpy(), 2)
+    vix_levels = np.where(np.isnan(vix_levels), DEFAULT_VIX_LEVEL, vix_levels)
+    market_cap_bucket = _bucket_market_cap(info.get("marketCap"))
+    macro = scoring.macro_points(
+        vix_levels,
+        info.get("beta", 1.0),
+        np.round((pe - scoring.SECTOR_PE_MEDIAN) / scoring.SECTOR_PE_MEDIAN * 100, 1),
+        scoring.is_large_cap(market_cap_bucket),
+    )
+
+    sub_scores = {
+        "Fundamental": fundamental,
+        "Technical": technical,
+        "Sentiment": np.full(close.shape, 50),
+        "Macro_Risk": macro,
+    }
+    score_weights = scoring.SCORE_WEIGHTS[market_cap_bucket]
+    scores = scoring.weighted_scores(sub_scores, market_cap_bucket)
+    recommendations = scoring.classify_scores(scores)
+
+    in_range = (days >= start_day) & (days <= end_day)
+    columns = [
+        days[in_range].strftime("%Y-%m-%d").tolist(),
+        np.round(close[in_range], 2).tolist(),
+        scores[in_range].tolist(),
+        recommendations[in_range].tolist(),
+        *(sub_scores[key][in_range].tolist() for key in score_weights),
+    ]
+    series = [
+        {
+            "date": date,
+            "price": price,
+            "score": score,
+            "recommendation": recommendation,
+            "sub_scores": dict(zip(score_weights, day_sub_scores)),
+        }
+        for date, price, score, recommendation, *day_sub_scores in zip(*columns)
+    ]
+
+    return {
+        "metadata": {
+            "generated_at": datetime.now().isoformat(),
+            "mode": "score_history",
+            "start": start_day.strftime("%Y-%m-%d"),
+            "end": end_day.strftime("%Y-%m-%d"),
+            "points": len(series),
+            "stockProfile": market_cap_bucket,
+            "heldConstant": ["fundamentals", "beta", "stockProfile"],
+            "sentiment": "neutral",
+            "vixSource": "yfinance" if len(vix) else "fallback",
+        },
+        "ticker": ticker,
+        "name": info.get("shortName", info.get("longName", ticker)),
+        "score_weights": score_weights,
+        "series": series,
+    }
+
+
+# ─── Historical Data ─────────────────────────────────────────────────────────
+
+def chart_points(hist: pd.DataFrame, interval: str) -> list:
+    """Chart points for OHLCV bars: unix seconds for intraday intervals, ISO dates otherwise."""
+    if hist is None or hist.empty:
+        return []
+
+    hist = hist.reset_index()
+    time_col = 'Datetime' if 'Datetime' in hist.columns else 'Date'
+
+    chart_data = []
+    for _, row in hist.iterrows():
+        if interval in UNIX_TIME_INTERVALS:
+            time_val = int(row[time_col].timestamp())
+        else:
+            time_val = row[time_col].strftime('%Y-%m-%d')
+
+        chart_data.append({
+            "time": time_val,
+            "open": round(row['Open'], 2),
+            "high": round(row['High'], 2),
+            "low": round(row['Low'], 2),
+            "close": round(row['Close'], 2),
+            "value": round(row['Close'], 2),
+            "volume": int(row['Volume']) if 'Volume' in row else 0,
+        })
+
+    return chart_data
+
 
 async def chat_with_agent(ticker: str, user_message: str, target_agent: str, context_score: int = None) -> str:
     """Invokes a standalone LLM call simulating an agent's response to a user."""
     ticker = ticker.upper()
-    cache_file = os.path.join(CACHE_DIR, f"{ticker}.json")
     context_str = "No recent context available."
-    
-    if os.path.exists(cache_file):
-        try:
-            with open(cache_file, "r") as f:
-                data = json.load(f)
-                ai_data = data.get("ai_analysis", {})
-                context_str = json.dumps(ai_data, indent=2)
-        except Exception as e:
-            print(f"Error reading cache for chat: {e}")
+
+    cached = await asyncio.to_thread(analysis_store.get, ticker)
+    if cached is not None:
+        context_str = _prompt_json(cached.get("ai_analysis", {}))
 
     prompt = f"""You are the '{target_agent}' AI agent in a high-stakes financial debate room.
 You are currently analyzing {ticker}.
@@ -824,8 +1206,11 @@ Respond DIRECTLY to the user in your unique persona:
 
 Keep your response concise (2-4 sentences max), punchy, and highly insightful. Rely on the numeric context provided above where possible. Do not output markdown asterisks or quotes around your response.
 """
+    prompt_metrics.record_prompt("chat", prompt)
     try:
-        response = await _call_agent_async(prompt)
+        response = await _call_agent_async(prompt, role="chat")
         return response.strip()
+    except ApiError:
+        raise
     except Exception as e:
         return f"Agent {target_agent} failed to respond: {str(e)}"
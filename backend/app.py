@@ -1,3 +1,5 @@
+import asyncio
+import threading
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
@@ -15,6 +17,8 @@ from routers.stocks import router as stocks_router
 from routers.system import router as system_router
 from routers.telemetry import router as telemetry_router
 from routers.users import router as users_router
+from services.analysis_store import analysis_store
+from services.fundamentals_store import fundamentals_store, run_refresh_loop
 
 
 @asynccontextmanager
@@ -27,7 +31,15 @@ async def lifespan(_app: FastAPI):
         corsOrigins=settings.cors_origins,
         adminClaimKey=settings.admin_claim_key,
     )
+    await asyncio.to_thread(analysis_store.load)
+    stop_refresh = threading.Event()
+    refresh_task = None
+    if settings.fundamentals_refresh_enabled:
+        refresh_task = asyncio.create_task(run_refresh_loop(fundamentals_store, stop_refresh))
     yield
+    stop_refresh.set()
+    if refresh_task is not None:
+        refresh_task.cancel()
 
 
 def create_app() -> FastAPI:
@@ -47,7 +59,14 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
-        expose_headers=["X-Request-ID", "X-Response-Time-Ms", "X-Cache-Status", "X-Cache-Stale"],
+        expose_headers=[
+            "X-Request-ID",
+            "X-Response-Time-Ms",
+            "X-Cache-Status",
+            "X-Cache-Stale",
+            "X-Chart-Cursor",
+            "ETag",
+        ],
     )
 
     register_exception_handlers(app)
@@ -0,0 +1,73 @@
+"""Compares the NumPy indicator engine with the pandas formulas it replaced.
+
+Run from backend/:  python -m benchmarks.bench_indicators [--tickers 500] [--bars 252]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from services import indicators
+
+
+def _pandas_latest(close, high, low, volume):
+    hist = pd.DataFrame({"Close": close, "High": high, "Low": low, "Volume": volume})
+    sma50 = hist["Close"].rolling(50).mean().iloc[-1]
+    sma200 = hist["Close"].rolling(200).mean().iloc[-1]
+    delta = hist["Close"].diff()
+    gain = delta.where(delta > 0, 0).rolling(14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+    rsi = (100 - (100 / (1 + gain / loss))).iloc[-1]
+    macd = hist["Close"].ewm(span=12, adjust=False).mean() - hist["Close"].ewm(span=26, adjust=False).mean()
+    macd_sig = macd.ewm(span=9, adjust=False).mean()
+    vol_avg_20 = hist["Volume"].rolling(20).mean().iloc[-1]
+    h14 = hist["High"].rolling(14).max().iloc[-1]
+    l14 = hist["Low"].rolling(14).min().iloc[-1]
+    return sma50, sma200, rsi, macd.iloc[-1], macd_sig.iloc[-1], vol_avg_20, h14, l14
+
+
+def _timed(label, fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<40} {best * 1000:9.3f} ms")
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--bars", type=int, default=252)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    close = 100 + np.cumsum(rng.normal(0, 1.5, (args.tickers, args.bars)), axis=1)
+    high = close + rng.uniform(0.1, 2.0, close.shape)
+    low = close - rng.uniform(0.1, 2.0, close.shape)
+    volume = rng.integers(1_000_000, 5_000_000, close.shape).astype(float)
+
+    print(f"{args.tickers} tickers x {args.bars} bars (best of {args.repeat})")
+    single_pandas = _timed("pandas, one ticker", lambda: _pandas_latest(close[0], high[0], low[0], volume[0]), args.repeat)
+    single_numpy = _timed(
+        "numpy, one ticker",
+        lambda: indicators.latest_technicals(close[0], high[0], low[0], volume[0]),
+        args.repeat,
+    )
+    loop_pandas = _timed(
+        "pandas, per-ticker loop",
+        lambda: [_pandas_latest(close[i], high[i], low[i], volume[i]) for i in range(args.tickers)],
+        args.repeat,
+    )
+    batch_numpy = _timed("numpy, 2-D batch", lambda: indicators.latest_technicals(close, high, low, volume), args.repeat)
+
+    print(f"single-ticker speedup: {single_pandas / single_numpy:6.1f}x")
+    print(f"batch speedup:         {loop_pandas / batch_numpy:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,12 @@ def _parse_int(value: str, default: int) -> int:
         return default
 
 
+def _parse_bool(value: str, default: bool) -> bool:
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
 def _parse_float(value: str, default: float) -> float:
     try:
         return float(value)
@@ -36,6 +42,26 @@ class Settings:
     admin_emails: Set[str]
     admin_claim_key: str
     gemini_model: str
+    gemini_model_fast: str
+    gemini_model_strong: str
+    llm_timeout_seconds_default: float
+    llm_timeout_seconds_debate: float
+    llm_timeout_seconds_cio: float
+    llm_timeout_seconds_chat: float
+    llm_max_output_tokens_debate: int
+    llm_max_output_tokens_cio: int
+    llm_max_output_tokens_chat: int
+    llm_max_concurrency: int
+    llm_max_queue_depth: int
+    llm_hedge_enabled: bool
+    llm_cache_max_entries: int
+    llm_cache_ttl_seconds: int
+    llm_latency_window: int
+    llm_latency_min_samples: int
+    llm_attempt_timeout_floor_seconds: float
+    llm_attempt_timeout_p99_multiplier: float
+    llm_retry_backoff_base_seconds: float
+    llm_retry_backoff_max_seconds: float
     firebase_credentials_file: str
     request_timeout_seconds: float
     search_timeout_seconds: float
@@ -45,14 +71,43 @@ class Settings:
     rate_limit_analyze: int
     rate_limit_chat: int
     rate_limit_portfolio_doctor: int
+    rate_limit_analyze_batch: int
     cache_ttl_seconds_quick_stats: int
     cache_ttl_seconds_chart: int
     cache_ttl_seconds_search: int
     cache_swr_seconds_quick_stats: int
     cache_swr_seconds_chart: int
     cache_swr_seconds_search: int
+    cache_ttl_seconds_snapshot: int
+    cache_swr_seconds_snapshot: int
+    cache_ttl_seconds_macro: int
+    cache_swr_seconds_macro: int
+    cache_ttl_seconds_news: int
+    cache_swr_seconds_news: int
+    cache_ttl_seconds_score_history: int
+    cache_swr_seconds_score_history: int
     provider_budget_calls_per_minute: int
     llm_budget_calls_per_minute: int
+    analysis_fetch_workers: int
+    macro_gdp_expectation_pct: float
+    analysis_store_lru_size: int
+    analysis_store_max_dated_per_ticker: int
+    analysis_batch_max_tickers: int
+    analysis_batch_llm_concurrency: int
+    analysis_stage_memo_max_entries: int
+    analysis_stage_memo_ttl_seconds: int
+    screener_universe: List[str]
+    cache_ttl_seconds_screener: int
+    cache_swr_seconds_screener: int
+    fundamentals_refresh_enabled: bool
+    fundamentals_refresh_batch_size: int
+    fundamentals_refresh_batch_pause_seconds: float
+    fundamentals_refresh_initial_delay_seconds: float
+    fundamentals_refresh_check_seconds: float
+    fundamentals_store_max_versions: int
+    fundamentals_max_age_days: int
+    ohlcv_backfill_days: int
+    ohlcv_session_refresh_seconds: float
 
 
 def _build_settings() -> Settings:
@@ -68,12 +123,41 @@ def _build_settings() -> Settings:
         )
     )
 
+    gemini_model = os.getenv("GEMINI_MODEL", "gemini-2.5-pro")
+
+    # Largest US listings; set SCREENER_UNIVERSE to screen a full index such as the S&P 500.
+    default_screener_universe = [
+        "AAPL", "MSFT", "NVDA", "AMZN", "GOOGL", "META", "BRK-B", "AVGO", "TSLA", "LLY",
+        "JPM", "V", "WMT", "XOM", "UNH", "MA", "ORCL", "COST", "HD", "PG",
+        "JNJ", "NFLX", "BAC", "ABBV", "CRM", "KO", "CVX", "AMD", "MRK", "PEP",
+    ]
+
     return Settings(
         env=os.getenv("APP_ENV", "development"),
         cors_origins=_parse_csv(os.getenv("ALLOWED_ORIGINS", ""), default_origins),
         admin_emails=admin_emails,
         admin_claim_key=os.getenv("ADMIN_CLAIM_KEY", "admin"),
-        gemini_model=os.getenv("GEMINI_MODEL", "gemini-2.5-pro"),
+        gemini_model=gemini_model,
+        gemini_model_fast=os.getenv("GEMINI_MODEL_FAST", "gemini-2.5-flash"),
+        gemini_model_strong=os.getenv("GEMINI_MODEL_STRONG", gemini_model),
+        llm_timeout_seconds_default=_parse_float(os.getenv("LLM_TIMEOUT_DEFAULT_SECONDS"), 60.0),
+        llm_timeout_seconds_debate=_parse_float(os.getenv("LLM_TIMEOUT_DEBATE_SECONDS"), 25.0),
+        llm_timeout_seconds_cio=_parse_float(os.getenv("LLM_TIMEOUT_CIO_SECONDS"), 60.0),
+        llm_timeout_seconds_chat=_parse_float(os.getenv("LLM_TIMEOUT_CHAT_SECONDS"), 15.0),
+        llm_max_output_tokens_debate=_parse_int(os.getenv("LLM_MAX_OUTPUT_TOKENS_DEBATE"), 2048),
+        llm_max_output_tokens_cio=_parse_int(os.getenv("LLM_MAX_OUTPUT_TOKENS_CIO"), 8192),
+        llm_max_output_tokens_chat=_parse_int(os.getenv("LLM_MAX_OUTPUT_TOKENS_CHAT"), 1024),
+        llm_max_concurrency=_parse_int(os.getenv("LLM_MAX_CONCURRENCY"), 8),
+        llm_max_queue_depth=_parse_int(os.getenv("LLM_MAX_QUEUE_DEPTH"), 32),
+        llm_hedge_enabled=_parse_bool(os.getenv("LLM_HEDGE_ENABLED"), True),
+        llm_cache_max_entries=_parse_int(os.getenv("LLM_CACHE_MAX_ENTRIES"), 512),
+        llm_cache_ttl_seconds=_parse_int(os.getenv("LLM_CACHE_TTL_SECONDS"), 21600),
+        llm_latency_window=_parse_int(os.getenv("LLM_LATENCY_WINDOW"), 200),
+        llm_latency_min_samples=_parse_int(os.getenv("LLM_LATENCY_MIN_SAMPLES"), 20),
+        llm_attempt_timeout_floor_seconds=_parse_float(os.getenv("LLM_ATTEMPT_TIMEOUT_FLOOR_SECONDS"), 5.0),
+        llm_attempt_timeout_p99_multiplier=_parse_float(os.getenv("LLM_ATTEMPT_TIMEOUT_P99_MULTIPLIER"), 2.0),
+        llm_retry_backoff_base_seconds=_parse_float(os.getenv("LLM_RETRY_BACKOFF_BASE_SECONDS"), 0.5),
+        llm_retry_backoff_max_seconds=_parse_float(os.getenv("LLM_RETRY_BACKOFF_MAX_SECONDS"), 8.0),
         firebase_credentials_file=os.getenv("FIREBASE_CREDENTIALS_FILE", "firebase-credentials.json"),
         request_timeout_seconds=_parse_float(os.getenv("REQUEST_TIMEOUT_SECONDS"), 20.0),
         search_timeout_seconds=_parse_float(os.getenv("SEARCH_TIMEOUT_SECONDS"), 7.5),
@@ -83,14 +167,43 @@ def _build_settings() -> Settings:
         rate_limit_analyze=_parse_int(os.getenv("RATE_LIMIT_ANALYZE_PER_WINDOW"), 6),
         rate_limit_chat=_parse_int(os.getenv("RATE_LIMIT_CHAT_PER_WINDOW"), 20),
         rate_limit_portfolio_doctor=_parse_int(os.getenv("RATE_LIMIT_PORTFOLIO_DOCTOR_PER_WINDOW"), 12),
+        rate_limit_analyze_batch=_parse_int(os.getenv("RATE_LIMIT_ANALYZE_BATCH_PER_WINDOW"), 2),
         cache_ttl_seconds_quick_stats=_parse_int(os.getenv("CACHE_TTL_QUICK_STATS_SECONDS"), 60),
         cache_ttl_seconds_chart=_parse_int(os.getenv("CACHE_TTL_CHART_SECONDS"), 45),
         cache_ttl_seconds_search=_parse_int(os.getenv("CACHE_TTL_SEARCH_SECONDS"), 120),
         cache_swr_seconds_quick_stats=_parse_int(os.getenv("CACHE_SWR_QUICK_STATS_SECONDS"), 240),
         cache_swr_seconds_chart=_parse_int(os.getenv("CACHE_SWR_CHART_SECONDS"), 180),
         cache_swr_seconds_search=_parse_int(os.getenv("CACHE_SWR_SEARCH_SECONDS"), 300),
+        cache_ttl_seconds_snapshot=_parse_int(os.getenv("CACHE_TTL_SNAPSHOT_SECONDS"), 60),
+        cache_swr_seconds_snapshot=_parse_int(os.getenv("CACHE_SWR_SNAPSHOT_SECONDS"), 120),
+        cache_ttl_seconds_macro=_parse_int(os.getenv("CACHE_TTL_MACRO_SECONDS"), 60),
+        cache_swr_seconds_macro=_parse_int(os.getenv("CACHE_SWR_MACRO_SECONDS"), 600),
+        cache_ttl_seconds_news=_parse_int(os.getenv("CACHE_TTL_NEWS_SECONDS"), 300),
+        cache_swr_seconds_news=_parse_int(os.getenv("CACHE_SWR_NEWS_SECONDS"), 900),
+        cache_ttl_seconds_score_history=_parse_int(os.getenv("CACHE_TTL_SCORE_HISTORY_SECONDS"), 900),
+        cache_swr_seconds_score_history=_parse_int(os.getenv("CACHE_SWR_SCORE_HISTORY_SECONDS"), 3600),
         provider_budget_calls_per_minute=_parse_int(os.getenv("PROVIDER_BUDGET_CALLS_PER_MINUTE"), 600),
         llm_budget_calls_per_minute=_parse_int(os.getenv("LLM_BUDGET_CALLS_PER_MINUTE"), 120),
+        analysis_fetch_workers=_parse_int(os.getenv("ANALYSIS_FETCH_WORKERS"), 8),
+        macro_gdp_expectation_pct=_parse_float(os.getenv("MACRO_GDP_EXPECTATION_PCT"), 2.0),
+        analysis_store_lru_size=_parse_int(os.getenv("ANALYSIS_STORE_LRU_SIZE"), 128),
+        analysis_store_max_dated_per_ticker=_parse_int(os.getenv("ANALYSIS_STORE_MAX_DATED_PER_TICKER"), 30),
+        analysis_batch_max_tickers=_parse_int(os.getenv("ANALYSIS_BATCH_MAX_TICKERS"), 25),
+        analysis_batch_llm_concurrency=_parse_int(os.getenv("ANALYSIS_BATCH_LLM_CONCURRENCY"), 4),
+        analysis_stage_memo_max_entries=_parse_int(os.getenv("ANALYSIS_STAGE_MEMO_MAX_ENTRIES"), 2048),
+        analysis_stage_memo_ttl_seconds=_parse_int(os.getenv("ANALYSIS_STAGE_MEMO_TTL_SECONDS"), 172800),
+        screener_universe=[ticker.upper() for ticker in _parse_csv(os.getenv("SCREENER_UNIVERSE", ""), default_screener_universe)],
+        cache_ttl_seconds_screener=_parse_int(os.getenv("CACHE_TTL_SCREENER_SECONDS"), 900),
+        cache_swr_seconds_screener=_parse_int(os.getenv("CACHE_SWR_SCREENER_SECONDS"), 3600),
+        fundamentals_refresh_enabled=_parse_bool(os.getenv("FUNDAMENTALS_REFRESH_ENABLED"), True),
+        fundamentals_refresh_batch_size=_parse_int(os.getenv("FUNDAMENTALS_REFRESH_BATCH_SIZE"), 10),
+        fundamentals_refresh_batch_pause_seconds=_parse_float(os.getenv("FUNDAMENTALS_REFRESH_BATCH_PAUSE_SECONDS"), 2.0),
+        fundamentals_refresh_initial_delay_seconds=_parse_float(os.getenv("FUNDAMENTALS_REFRESH_INITIAL_DELAY_SECONDS"), 60.0),
+        fundamentals_refresh_check_seconds=_parse_float(os.getenv("FUNDAMENTALS_REFRESH_CHECK_SECONDS"), 3600.0),
+        fundamentals_store_max_versions=_parse_int(os.getenv("FUNDAMENTALS_STORE_MAX_VERSIONS"), 7),
+        fundamentals_max_age_days=_parse_int(os.getenv("FUNDAMENTALS_MAX_AGE_DAYS"), 3),
+        ohlcv_backfill_days=_parse_int(os.getenv("OHLCV_BACKFILL_DAYS"), 1830),
+        ohlcv_session_refresh_seconds=_parse_float(os.getenv("OHLCV_SESSION_REFRESH_SECONDS"), 900.0),
     )
 
 
@@ -0,0 +1,88 @@
+"""Immutable response bodies, serialized and compressed once when a cache entry is filled.
+
+A cache hit then answers with stored bytes in the variant the client accepts, instead of
+re-encoding the same objects on every request. Brotli variants are produced only when the
+optional `brotli` package is installed; gzip is always available.
+"""
+
+import gzip
+import json
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+JSON_MEDIA_TYPE = "application/json"
+# Below this, compression saves less than the header overhead it adds.
+MIN_COMPRESS_BYTES = 500
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 9
+# Server preference when the client accepts several codings with the same q-value.
+_PREFERRED_CODINGS = ("br", "gzip")
+
+
+@dataclass(frozen=True)
+class EncodedBody:
+    media_type: str
+    # Content-Coding -> bytes; "identity" is always present.
+    variants: Mapping[str, bytes]
+
+    @classmethod
+    def from_bytes(cls, data: bytes, media_type: str) -> "EncodedBody":
+        variants = {"identity": data}
+        if len(data) >= MIN_COMPRESS_BYTES:
+            variants["gzip"] = gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+            if brotli is not None:
+                variants["br"] = brotli.compress(data, quality=BROTLI_QUALITY)
+        return cls(media_type=media_type, variants=MappingProxyType(variants))
+
+    @classmethod
+    def from_json(cls, payload: Any) -> "EncodedBody":
+        """Same bytes FastAPI's default JSONResponse would render for `payload`."""
+        data = json.dumps(
+            jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+        ).encode("utf-8")
+        return cls.from_bytes(data, JSON_MEDIA_TYPE)
+
+    def negotiate(self, accept_encoding: Optional[str]) -> str:
+        """The stored coding to send for an Accept-Encoding header; "identity" if none is acceptable."""
+        accepted = _accepted_codings(accept_encoding)
+        candidates = [
+            (accepted.get(coding, accepted.get("*", 0.0)), -rank, coding)
+            for rank, coding in enumerate(_PREFERRED_CODINGS)
+            if coding in self.variants
+        ]
+        best = max(candidates, default=None)
+        return best[2] if best and best[0] > 0 else "identity"
+
+    def response(self, coding: str, headers: Mapping[str, str]) -> Response:
+        out = dict(headers)
+        if coding != "identity":
+            out["Content-Encoding"] = coding
+        return Response(content=self.variants[coding], media_type=self.media_type, headers=out)
+
+
+def _accepted_codings(accept_encoding: Optional[str]) -> Dict[str, float]:
+    accepted: Dict[str, float] = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
@@ -1,12 +1,20 @@
 import asyncio
 import os
+import random
+import time
+from dataclasses import dataclass
 from functools import lru_cache
-from typing import Any, Iterable, List, Optional, Sequence, Union
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, List, Optional, Sequence, Tuple, Union
 
 from google import genai
 from google.genai import types
 
 from core.config import settings
+from core.errors import ApiError
+from core.llm_latency import llm_latency
+from core.llm_scheduler import LLMPriority, llm_scheduler
+from core.logger import log_event
+from core.prompt_format import prompt_metrics
 
 
 api_key = os.getenv("GEMINI_API_KEY")
@@ -16,6 +24,16 @@ MODEL_NAME = settings.gemini_model
 ContentInput = Union[str, Sequence[types.Content]]
 
 
+@dataclass(frozen=True)
+class ModelRoute:
+    """Model, total time budget (retries included) and output cap used for one agent role."""
+
+    role: str
+    model: str
+    timeout_seconds: float
+    max_output_tokens: Optional[int] = None
+
+
 def has_api_key() -> bool:
     return bool(api_key)
 
@@ -24,6 +42,32 @@ def get_model_name() -> str:
     return MODEL_NAME
 
 
+def route_for(role: Optional[str]) -> ModelRoute:
+    """Debate agents and chat go to the fast model, the CIO synthesis to the strong one."""
+    if role in ("bull", "bear", "quant"):
+        return ModelRoute(
+            role=role,
+            model=settings.gemini_model_fast,
+            timeout_seconds=settings.llm_timeout_seconds_debate,
+            max_output_tokens=settings.llm_max_output_tokens_debate,
+        )
+    if role == "chat":
+        return ModelRoute(
+            role=role,
+            model=settings.gemini_model_fast,
+            timeout_seconds=settings.llm_timeout_seconds_chat,
+            max_output_tokens=settings.llm_max_output_tokens_chat,
+        )
+    if role == "cio":
+        return ModelRoute(
+            role=role,
+            model=settings.gemini_model_strong,
+            timeout_seconds=settings.llm_timeout_seconds_cio,
+            max_output_tokens=settings.llm_max_output_tokens_cio,
+        )
+    return ModelRoute(role=role or "default", model=MODEL_NAME, timeout_seconds=settings.llm_timeout_seconds_default)
+
+
 @lru_cache(maxsize=1)
 def get_client() -> genai.Client:
     if not api_key:
@@ -54,6 +98,7 @@ def build_generate_config(
     tools: Optional[Sequence[types.Tool]] = None,
     response_json_schema: Optional[dict[str, Any]] = None,
     disable_automatic_function_calling: bool = False,
+    max_output_tokens: Optional[int] = None,
 ) -> types.GenerateContentConfig:
     kwargs: dict[str, Any] = {"temperature": temperature}
     if use_json:
@@ -66,18 +111,137 @@ def build_generate_config(
         kwargs["response_json_schema"] = response_json_schema
     if disable_automatic_function_calling:
         kwargs["automatic_function_calling"] = types.AutomaticFunctionCallingConfig(disable=True)
+    if max_output_tokens:
+        kwargs["max_output_tokens"] = max_output_tokens
     return types.GenerateContentConfig(**kwargs)
 
 
 def _is_retryable_error(exc: Exception) -> bool:
+    if isinstance(exc, ApiError):
+        # Shed by our own scheduler; retrying would only add to the queue.
+        return False
+    if isinstance(exc, asyncio.TimeoutError):
+        return True
     message = str(exc).lower()
     return any(token in message for token in ("429", "quota", "rate", "timed out", "deadline exceeded", "503"))
 
 
+def _record_usage(route: ModelRoute, usage_metadata: Any) -> None:
+    if usage_metadata is None:
+        return
+    prompt_metrics.record_usage(
+        route.role,
+        getattr(usage_metadata, "prompt_token_count", None),
+        getattr(usage_metadata, "candidates_token_count", None),
+    )
+
+
+def _timeout_error(route: ModelRoute) -> TimeoutError:
+    return TimeoutError(f"{route.model} did not answer the {route.role} call within {route.timeout_seconds:g}s")
+
+
+def _latency_key(route: ModelRoute, phase: str = "response") -> str:
+    return f"{route.role}:{route.model}:{phase}"
+
+
+def _backoff_delay(attempt: int, remaining: float) -> Optional[float]:
+    """Full-jitter exponential backoff, or None when no useful attempt fits in the remaining budget."""
+    cap = min(settings.llm_retry_backoff_max_seconds, settings.llm_retry_backoff_base_seconds * (2 ** attempt))
+    delay = random.uniform(0, cap)
+    if remaining - delay < min(settings.llm_attempt_timeout_floor_seconds, remaining / 2):
+        return None
+    return delay
+
+
+def _record_llm_latency(
+    route: ModelRoute,
+    started: float,
+    attempt: int,
+    outcome: str,
+    first_token_started: Optional[float] = None,
+    hedged: bool = False,
+) -> None:
+    fields: dict[str, Any] = {
+        "role": route.role,
+        "model": route.model,
+        "attempt": attempt + 1,
+        "outcome": outcome,
+        "hedged": hedged,
+        "latencyMs": round((time.perf_counter() - started) * 1000, 2),
+    }
+    if first_token_started is not None:
+        fields["firstTokenMs"] = round((first_token_started - started) * 1000, 2)
+    log_event("info" if outcome == "ok" else "warning", "llm.call", **fields)
+
+
+async def _race_with_hedge(
+    call: Callable[[], Awaitable[Any]],
+    timeout: float,
+    hedge_after: Optional[float],
+    hedge_allowed: Callable[[], bool] = lambda: True,
+    hedge_call: Optional[Callable[[], Awaitable[Any]]] = None,
+) -> Tuple[Any, bool]:
+    """Runs `call`; if it has not answered after `hedge_after` seconds, starts a duplicate.
+
+    The duplicate runs `hedge_call` when given (e.g. one that takes its own scheduler slot).
+    The first successful answer wins and the other request is cancelled. A failure of one
+    request only propagates once no other request is still in flight.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    hedge_at = loop.time() + hedge_after if hedge_after is not None else None
+    tasks = {asyncio.create_task(call())}
+    hedge_window_passed = False
+    # Only true once a duplicate request was actually started.
+    hedged = False
+    last_error: Optional[BaseException] = None
+    try:
+        while tasks:
+            now = loop.time()
+            if now >= deadline:
+                raise asyncio.TimeoutError()
+            if not hedge_window_passed and hedge_at is not None and hedge_at <= now < deadline:
+                hedge_window_passed = True
+                if hedge_allowed():
+                    hedged = True
+                    tasks.add(asyncio.create_task((hedge_call or call)()))
+            wait_seconds = deadline - now
+            if not hedge_window_passed and hedge_at is not None:
+                wait_seconds = min(wait_seconds, max(0.0, hedge_at - now))
+            done, _ = await asyncio.wait(tasks, timeout=wait_seconds, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                tasks.discard(task)
+                if task.exception() is None:
+                    return task.result(), hedged
+                last_error = task.exception()
+            if last_error is not None and not tasks:
+                raise last_error
+        raise last_error or asyncio.TimeoutError()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _acquire_slot(route: ModelRoute, priority: Optional[LLMPriority], budget_deadline: float) -> Callable[[], None]:
+    """Waits for a scheduler slot, bounded only by the overall budget.
+
+    Runs before an attempt's latency-derived deadline starts, since those latencies leave out
+    queue time. Running out of budget in the queue is final: retrying would only requeue.
+    """
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    try:
+        return await asyncio.wait_for(llm_scheduler.acquire(priority), timeout=max(0.0, budget_deadline - loop.time()))
+    except asyncio.TimeoutError:
+        _record_llm_latency(route, started, 0, "queue_timeout")
+        raise _timeout_error(route)
+
+
 async def generate_text(
     contents: ContentInput,
     *,
     model: Optional[str] = None,
+    role: Optional[str] = None,
     use_json: bool = False,
     temperature: float = 0.0,
     system_instruction: Optional[str] = None,
@@ -85,7 +249,17 @@ async def generate_text(
     response_json_schema: Optional[dict[str, Any]] = None,
     disable_automatic_function_calling: bool = False,
     max_retries: int = 3,
+    priority: Optional[LLMPriority] = None,
 ) -> str:
+    """One-shot generation within the role's time budget.
+
+    Each attempt gets a deadline derived from the observed p99 latency, and a hedged
+    duplicate is sent once the attempt outlives the observed p90. Retries back off with
+    jitter and never start unless a useful attempt still fits in the remaining budget.
+    """
+    route = route_for(role)
+    if model:
+        route = ModelRoute(route.role, model, route.timeout_seconds, route.max_output_tokens)
     config = build_generate_config(
         temperature=temperature,
         use_json=use_json,
@@ -93,22 +267,61 @@ async def generate_text(
         tools=tools,
         response_json_schema=response_json_schema,
         disable_automatic_function_calling=disable_automatic_function_calling,
+        max_output_tokens=route.max_output_tokens,
     )
+    latency_key = _latency_key(route)
+
+    async def call_once() -> str:
+        started = time.perf_counter()
+        response = await get_client().aio.models.generate_content(
+            model=route.model,
+            contents=contents,
+            config=config,
+        )
+        llm_latency.observe(latency_key, time.perf_counter() - started)
+        _record_usage(route, getattr(response, "usage_metadata", None))
+        return (response.text or "").strip()
 
+    async def call_hedge() -> str:
+        release = await llm_scheduler.acquire(priority)
+        try:
+            return await call_once()
+        finally:
+            release()
+
+    loop = asyncio.get_running_loop()
+    budget_deadline = loop.time() + route.timeout_seconds
+    last_error: Optional[Exception] = None
     for attempt in range(max_retries):
+        release = await _acquire_slot(route, priority, budget_deadline)
+        remaining = budget_deadline - loop.time()
+        started = time.perf_counter()
         try:
-            response = await get_client().aio.models.generate_content(
-                model=model or MODEL_NAME,
-                contents=contents,
-                config=config,
+            text, hedged = await _race_with_hedge(
+                call_once,
+                timeout=llm_latency.attempt_timeout(latency_key, remaining),
+                hedge_after=llm_latency.hedge_delay(latency_key),
+                hedge_allowed=llm_scheduler.has_idle_slot,
+                hedge_call=call_hedge,
             )
-            return (response.text or "").strip()
+            _record_llm_latency(route, started, attempt, "ok", hedged=hedged)
+            return text
         except Exception as exc:
+            # Free the slot before backing off, so the wait does not hold capacity.
+            release()
+            timed_out = isinstance(exc, asyncio.TimeoutError)
+            _record_llm_latency(route, started, attempt, "timeout" if timed_out else "error")
+            last_error = _timeout_error(route) if timed_out else exc
             if attempt == max_retries - 1 or not _is_retryable_error(exc):
-                raise
-            await asyncio.sleep((2 ** attempt) * 5)
+                raise last_error
+            delay = _backoff_delay(attempt, budget_deadline - loop.time())
+            if delay is None:
+                raise last_error
+            await asyncio.sleep(delay)
+        finally:
+            release()
 
-    raise RuntimeError(f"Gemini request failed after {max_retries} retries.")
+    raise last_error or RuntimeError(f"Gemini request failed after {max_retries} retries.")
 
 
 async def stream_content(
@@ -119,15 +332,117 @@ async def stream_content(
     system_instruction: Optional[str] = None,
     tools: Optional[Sequence[types.Tool]] = None,
     disable_automatic_function_calling: bool = False,
+    max_output_tokens: Optional[int] = None,
+    priority: Optional[LLMPriority] = None,
 ):
+    """Starts a streamed generation; the scheduler slot is held until the stream is exhausted or closed."""
     config = build_generate_config(
         temperature=temperature,
         system_instruction=system_instruction,
         tools=tools,
         disable_automatic_function_calling=disable_automatic_function_calling,
+        max_output_tokens=max_output_tokens,
     )
-    return await get_client().aio.models.generate_content_stream(
-        model=model or MODEL_NAME,
-        contents=list(contents),
-        config=config,
+    release = await llm_scheduler.acquire(priority)
+    return await _open_stream(contents, model or MODEL_NAME, config, release)
+
+
+async def _open_stream(contents: Sequence[types.Content], model: str, config, release: Callable[[], None]):
+    """Starts a streamed generation on an already acquired scheduler slot."""
+    try:
+        response_stream = await get_client().aio.models.generate_content_stream(
+            model=model,
+            contents=list(contents),
+            config=config,
+        )
+    except BaseException:
+        release()
+        raise
+    return _release_when_exhausted(response_stream, release)
+
+
+async def _release_when_exhausted(response_stream, release: Callable[[], None]):
+    try:
+        async for chunk in response_stream:
+            yield chunk
+    finally:
+        release()
+
+
+async def stream_text(
+    contents: ContentInput,
+    *,
+    model: Optional[str] = None,
+    role: Optional[str] = None,
+    temperature: float = 0.0,
+    system_instruction: Optional[str] = None,
+    max_retries: int = 3,
+    priority: Optional[LLMPriority] = None,
+) -> AsyncIterator[str]:
+    """Yields the text of a streamed response as it arrives, within the role's time budget.
+
+    The first chunk must arrive within an adaptive deadline derived from the observed
+    first-token p99. Retryable errors are retried with jittered backoff only until the first
+    chunk has been yielded; after that the caller has already forwarded partial text, so the
+    error propagates.
+    """
+    if isinstance(contents, str):
+        contents = [build_content("user", [contents])]
+    route = route_for(role)
+    if model:
+        route = ModelRoute(route.role, model, route.timeout_seconds, route.max_output_tokens)
+    latency_key = _latency_key(route, "first_token")
+    loop = asyncio.get_running_loop()
+    budget_deadline = loop.time() + route.timeout_seconds
+
+    config = build_generate_config(
+        temperature=temperature,
+        system_instruction=system_instruction,
+        max_output_tokens=route.max_output_tokens,
     )
+
+    for attempt in range(max_retries):
+        release = await _acquire_slot(route, priority, budget_deadline)
+        started = time.perf_counter()
+        first_token_deadline = loop.time() + llm_latency.attempt_timeout(latency_key, budget_deadline - loop.time())
+        first_token_at: Optional[float] = None
+        usage_metadata = None
+        try:
+            response_stream = await asyncio.wait_for(
+                _open_stream(contents, route.model, config, release),
+                timeout=max(0.0, first_token_deadline - loop.time()),
+            )
+            try:
+                while True:
+                    deadline = budget_deadline if first_token_at is not None else first_token_deadline
+                    try:
+                        chunk = await asyncio.wait_for(
+                            response_stream.__anext__(), timeout=max(0.0, deadline - loop.time())
+                        )
+                    except StopAsyncIteration:
+                        break
+                    usage_metadata = getattr(chunk, "usage_metadata", None) or usage_metadata
+                    text = chunk.text or ""
+                    if text:
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                            llm_latency.observe(latency_key, first_token_at - started)
+                        yield text
+            finally:
+                # Frees the scheduler slot even when the caller stops consuming early.
+                await response_stream.aclose()
+            _record_llm_latency(route, started, attempt, "ok", first_token_at)
+            _record_usage(route, usage_metadata)
+            return
+        except Exception as exc:
+            # Idempotent; covers an open that was cancelled before it could release the slot.
+            release()
+            timed_out = isinstance(exc, asyncio.TimeoutError)
+            _record_llm_latency(route, started, attempt, "timeout" if timed_out else "error", first_token_at)
+            error = _timeout_error(route) if timed_out else exc
+            if first_token_at is not None or attempt == max_retries - 1 or not _is_retryable_error(exc):
+                raise error
+            delay = _backoff_delay(attempt, budget_deadline - loop.time())
+            if delay is None:
+                raise error
+            await asyncio.sleep(delay)
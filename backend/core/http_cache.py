@@ -0,0 +1,81 @@
+import hashlib
+from typing import Any, Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from .encoded_body import EncodedBody
+
+
+CACHE_HEADER_NAMES = ("X-Cache-Status", "X-Cache-Stale", "ETag", "Cache-Control", "Vary")
+
+
+def entity_tag(request: Request, cache_meta: Dict[str, Any], coding: str = "identity") -> Optional[str]:
+    """Strong ETag for a response built from one cache entry version; the URL and coding cover the variant served."""
+    version = cache_meta.get("version")
+    if version is None:
+        return None
+    digest = hashlib.sha1(f"{request.url.path}?{request.url.query}|{version}|{coding}".encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def cache_control(ttl_seconds: int, swr_seconds: int, stale: bool = False) -> str:
+    # A stale entry is already being refreshed; let clients and CDNs revalidate right away.
+    max_age = 0 if stale else ttl_seconds
+    return f"public, max-age={max_age}, stale-while-revalidate={swr_seconds}"
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # If-None-Match uses weak comparison, so W/"x" matches "x".
+    return "*" in candidates or etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+def apply_cache_headers(
+    request: Request,
+    response: Response,
+    cache_meta: Dict[str, Any],
+    ttl_seconds: int,
+    swr_seconds: int,
+    coding: Optional[str] = None,
+) -> bool:
+    """Sets cache status, ETag and Cache-Control headers; True if the client's copy is still current.
+
+    Pass the negotiated `coding` when the body is sent in a content coding picked from Accept-Encoding.
+    """
+    stale = bool(cache_meta.get("stale"))
+    response.headers["X-Cache-Status"] = "HIT" if cache_meta.get("cached") else "MISS"
+    response.headers["X-Cache-Stale"] = str(stale).lower()
+    response.headers["Cache-Control"] = cache_control(ttl_seconds, swr_seconds, stale)
+    if coding is not None:
+        response.headers["Vary"] = "Accept-Encoding"
+    etag = entity_tag(request, cache_meta, coding or "identity")
+    if etag is None:
+        return False
+    response.headers["ETag"] = etag
+    return _matches(request.headers.get("If-None-Match"), etag)
+
+
+def not_modified(response: Response, extra_header_names=()) -> Response:
+    """An empty 304 carrying the validators and cache headers already set on `response`."""
+    names = (*CACHE_HEADER_NAMES, *extra_header_names)
+    return Response(status_code=304, headers={name: response.headers[name] for name in names if name in response.headers})
+
+
+def body_response(
+    request: Request,
+    response: Response,
+    cache_meta: Dict[str, Any],
+    body: EncodedBody,
+    ttl_seconds: int,
+    swr_seconds: int,
+    extra_header_names=(),
+) -> Response:
+    """Sends a pre-encoded body in the coding the client accepts, or a 304 if its copy is current."""
+    coding = body.negotiate(request.headers.get("Accept-Encoding"))
+    if apply_cache_headers(request, response, cache_meta, ttl_seconds, swr_seconds, coding):
+        return not_modified(response, extra_header_names)
+    names = (*CACHE_HEADER_NAMES, *extra_header_names)
+    return body.response(coding, {name: response.headers[name] for name in names if name in response.headers})
@@ -0,0 +1,59 @@
+import math
+import threading
+from collections import defaultdict, deque
+from typing import Deque, Dict, Optional
+
+from .config import settings
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies per key, used to derive deadlines and hedge delays."""
+
+    def __init__(self, window: int, min_samples: int) -> None:
+        self.window = max(1, window)
+        self.min_samples = max(1, min_samples)
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def observe(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._samples[key].append(seconds)
+
+    def percentile(self, key: str, quantile: float) -> Optional[float]:
+        """Nearest-rank percentile, or None until `min_samples` latencies have been seen."""
+        with self._lock:
+            samples = sorted(self._samples.get(key) or ())
+        if len(samples) < self.min_samples:
+            return None
+        rank = max(1, math.ceil(quantile * len(samples)))
+        return samples[rank - 1]
+
+    def attempt_timeout(self, key: str, remaining: float) -> float:
+        """Per-attempt deadline: a multiple of the observed p99, never below the floor or above `remaining`."""
+        p99 = self.percentile(key, 0.99)
+        if p99 is None:
+            return remaining
+        adaptive = max(settings.llm_attempt_timeout_floor_seconds, p99 * settings.llm_attempt_timeout_p99_multiplier)
+        return min(remaining, adaptive)
+
+    def hedge_delay(self, key: str) -> Optional[float]:
+        """How long to wait for the first request before sending a hedge, or None to never hedge."""
+        if not settings.llm_hedge_enabled:
+            return None
+        return self.percentile(key, 0.9)
+
+    def snapshot(self) -> Dict[str, Dict[str, Optional[float]]]:
+        with self._lock:
+            keys = list(self._samples)
+        return {
+            key: {
+                "samples": len(self._samples[key]),
+                "p50": self.percentile(key, 0.5),
+                "p90": self.percentile(key, 0.9),
+                "p99": self.percentile(key, 0.99),
+            }
+            for key in keys
+        }
+
+
+llm_latency = LatencyTracker(settings.llm_latency_window, settings.llm_latency_min_samples)
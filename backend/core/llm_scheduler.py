@@ -0,0 +1,169 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .config import settings
+from .errors import ApiError
+from .llm_latency import LatencyTracker
+from .logger import log_event
+
+
+class LLMPriority(IntEnum):
+    """Lower value is served first."""
+
+    CHAT = 0
+    LIVE = 1
+    BATCH = 2
+
+
+_current_priority: ContextVar[LLMPriority] = ContextVar("llm_priority", default=LLMPriority.LIVE)
+
+
+@contextmanager
+def llm_priority(priority: LLMPriority) -> Iterator[None]:
+    """Runs the enclosed LLM calls (including tasks created inside the block) at `priority`."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority() -> LLMPriority:
+    return _current_priority.get()
+
+
+_Waiter = Tuple[int, int, asyncio.Future]
+
+
+class LLMScheduler:
+    """Process-wide admission control for Gemini requests.
+
+    At most `max_concurrency` requests are in flight; the rest wait in a priority queue of at
+    most `max_queue_depth` entries (chat before live analysis before batch, FIFO within a
+    class). When the queue is full, a new request either displaces the newest waiter of a
+    lower priority class or is shed with `LLM_OVERLOADED`.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue_depth: int) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue_depth = max(0, max_queue_depth)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._active = 0
+        self._waiters: List[_Waiter] = []
+        self._sequence = itertools.count()
+        self._wait_times = LatencyTracker(window=500, min_samples=1)
+        self._counters: Dict[str, int] = {"admitted": 0, "queued": 0, "shed": 0, "displaced": 0}
+
+    def _bind_loop(self) -> None:
+        # asyncio futures belong to one loop; a new loop (tests, worker restart) starts clean.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._active = 0
+            self._waiters = []
+
+    def _overloaded(self, priority: LLMPriority) -> ApiError:
+        self._counters["shed"] += 1
+        log_event(
+            "warning",
+            "llm.scheduler_shed",
+            priority=priority.name.lower(),
+            active=self._active,
+            queueDepth=len(self._waiters),
+        )
+        return ApiError(
+            status_code=503,
+            code="LLM_OVERLOADED",
+            message="The AI service is at capacity. Please retry shortly.",
+            details={"priority": priority.name.lower(), "queueDepth": len(self._waiters)},
+        )
+
+    def has_idle_slot(self) -> bool:
+        return self._active < self.max_concurrency and not self._waiters
+
+    async def acquire(self, priority: Optional[LLMPriority] = None) -> Callable[[], None]:
+        """Waits for a slot and returns its release callback (idempotent)."""
+        self._bind_loop()
+        priority = LLMPriority(current_priority() if priority is None else priority)
+        started = time.perf_counter()
+
+        if self.has_idle_slot():
+            self._active += 1
+        else:
+            if len(self._waiters) >= self.max_queue_depth:
+                self._make_room(priority)
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (int(priority), next(self._sequence), future))
+            self._counters["queued"] += 1
+            try:
+                await future
+            except BaseException:
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    # The slot was handed over just as this waiter was cancelled.
+                    self._release()
+                else:
+                    self._remove_waiter(future)
+                raise
+
+        self._counters["admitted"] += 1
+        self._wait_times.observe(priority.name.lower(), time.perf_counter() - started)
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                self._release()
+
+        return release
+
+    def _make_room(self, priority: LLMPriority) -> None:
+        lowest = max(self._waiters, default=None, key=lambda waiter: (waiter[0], waiter[1]))
+        if lowest is None or lowest[0] <= int(priority):
+            raise self._overloaded(priority)
+        self._remove_waiter(lowest[2])
+        self._counters["displaced"] += 1
+        lowest[2].set_exception(self._overloaded(LLMPriority(lowest[0])))
+
+    def _remove_waiter(self, future: asyncio.Future) -> None:
+        for index, waiter in enumerate(self._waiters):
+            if waiter[2] is future:
+                self._waiters.pop(index)
+                heapq.heapify(self._waiters)
+                return
+
+    def _release(self) -> None:
+        self._active = max(0, self._active - 1)
+        while self._waiters and self._active < self.max_concurrency:
+            _priority, _sequence, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._active += 1
+            future.set_result(None)
+
+    def metrics(self) -> Dict[str, Any]:
+        depth_by_priority = {priority.name.lower(): 0 for priority in LLMPriority}
+        for priority, _sequence, _future in self._waiters:
+            depth_by_priority[LLMPriority(priority).name.lower()] += 1
+        wait_times = {
+            name: {key: (round(value * 1000, 2) if isinstance(value, float) else value) for key, value in stats.items()}
+            for name, stats in self._wait_times.snapshot().items()
+        }
+        return {
+            "maxConcurrency": self.max_concurrency,
+            "maxQueueDepth": self.max_queue_depth,
+            "active": self._active,
+            "queueDepth": len(self._waiters),
+            "queueDepthByPriority": depth_by_priority,
+            "waitMs": wait_times,
+            **self._counters,
+        }
+
+
+llm_scheduler = LLMScheduler(settings.llm_max_concurrency, settings.llm_max_queue_depth)
@@ -0,0 +1,90 @@
+import json
+import math
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Mapping, Optional
+
+# Gemini tokenizes English prose and JSON at roughly four characters per token.
+_CHARS_PER_TOKEN = 4
+
+
+def _compact(value: Any, aliases: Mapping[str, str], digits: int) -> Any:
+    if isinstance(value, Mapping):
+        compacted = {}
+        for key, item in value.items():
+            item = _compact(item, aliases, digits)
+            if item is not None:
+                compacted[aliases.get(key, key)] = item
+        return compacted
+    if isinstance(value, (list, tuple)):
+        return [item for item in (_compact(item, aliases, digits) for item in value) if item is not None]
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, float) or (hasattr(value, "dtype") and getattr(value, "ndim", None) == 0):
+        number = float(value)
+        if math.isnan(number) or math.isinf(number):
+            return None
+        rounded = round(number, digits)
+        return int(rounded) if rounded.is_integer() else rounded
+    return value
+
+
+def compact_json(payload: Any, aliases: Optional[Mapping[str, str]] = None, digits: int = 2) -> str:
+    """Renders prompt data as minified JSON: aliased keys, rounded floats, no null or NaN fields."""
+    return json.dumps(_compact(payload, aliases or {}, digits), separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / _CHARS_PER_TOKEN)
+
+
+class PromptMetrics:
+    """Per-role prompt size totals: characters and estimated tokens at build time, provider-reported usage after the call."""
+
+    def __init__(self) -> None:
+        self._built: Dict[str, Dict[str, int]] = defaultdict(lambda: {"prompts": 0, "chars": 0, "estimatedTokens": 0, "maxChars": 0})
+        self._usage: Dict[str, Dict[str, int]] = defaultdict(lambda: {"calls": 0, "promptTokens": 0, "outputTokens": 0})
+        self._lock = threading.Lock()
+
+    def record_prompt(self, role: str, prompt: str) -> None:
+        with self._lock:
+            entry = self._built[role]
+            entry["prompts"] += 1
+            entry["chars"] += len(prompt)
+            entry["estimatedTokens"] += estimate_tokens(prompt)
+            entry["maxChars"] = max(entry["maxChars"], len(prompt))
+
+    def record_usage(self, role: str, prompt_tokens: Optional[int], output_tokens: Optional[int]) -> None:
+        if prompt_tokens is None and output_tokens is None:
+            return
+        with self._lock:
+            entry = self._usage[role]
+            entry["calls"] += 1
+            entry["promptTokens"] += prompt_tokens or 0
+            entry["outputTokens"] += output_tokens or 0
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            roles = set(self._built) | set(self._usage)
+            report: Dict[str, Dict[str, Any]] = {}
+            for role in sorted(roles):
+                built = self._built.get(role)
+                usage = self._usage.get(role)
+                report[role] = {}
+                if built and built["prompts"]:
+                    report[role].update(
+                        prompts=built["prompts"],
+                        avgChars=round(built["chars"] / built["prompts"]),
+                        maxChars=built["maxChars"],
+                        avgEstimatedTokens=round(built["estimatedTokens"] / built["prompts"]),
+                    )
+                if usage and usage["calls"]:
+                    report[role].update(
+                        calls=usage["calls"],
+                        avgPromptTokens=round(usage["promptTokens"] / usage["calls"]),
+                        avgOutputTokens=round(usage["outputTokens"] / usage["calls"]),
+                    )
+            return report
+
+
+prompt_metrics = PromptMetrics()
@@ -4,6 +4,13 @@ from pydantic import BaseModel
 from core.auth import verify_admin
 from core.errors import ApiError
 from core.firebase_client import get_db
+from core.llm_cache import llm_response_cache
+from core.llm_latency import llm_latency
+from core.llm_scheduler import llm_scheduler
+from core.prompt_format import prompt_metrics
+from services.analysis_dag import stage_memo
+from services.fundamentals_store import fundamentals_store
+from services.ohlcv_store import ohlcv_store
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
@@ -40,3 +47,24 @@ def update_user(uid: str, body: AdminUserUpdate, admin=Depends(verify_admin)):
 
     user_ref.update({"isPro": body.isPro})
     return {"success": True, "uid": uid, "isPro": body.isPro}
+
+
+@router.get("/llm-metrics")
+def get_llm_metrics(admin=Depends(verify_admin)):
+    return {
+        "scheduler": llm_scheduler.metrics(),
+        "latency": llm_latency.snapshot(),
+        "responseCache": llm_response_cache.metrics(),
+        "prompts": prompt_metrics.snapshot(),
+        "stageMemo": stage_memo.metrics(),
+    }
+
+
+@router.get("/fundamentals")
+def get_fundamentals_store(admin=Depends(verify_admin)):
+    return fundamentals_store.metrics()
+
+
+@router.get("/ohlcv")
+def get_ohlcv_store(admin=Depends(verify_admin)):
+    return ohlcv_store.metrics()
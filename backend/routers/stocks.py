@@ -5,18 +5,26 @@ from fastapi import APIRouter, Depends, Query, Request, Response
 from fastapi.responses import StreamingResponse
 from firebase_admin import firestore
 
-from analysis_engine import analyze_stock_stream
+from analysis_engine import fast_analysis
 from core.auth import verify_token_and_check_limit
 from core.config import settings
 from core.errors import ApiError
+from core.encoded_body import EncodedBody
+from core.http_cache import body_response
 from core.logger import log_event
 from core.rate_limit import enforce_rate_limit
+from services.analysis_broker import analysis_broker
+from services.batch_analysis import BatchAnalysisRequest, analyze_batch_stream, normalize_batch_tickers
+from services.chart_encoding import CHART_FORMATS, UNIX_TIME_INTERVALS
 from services.market_service import (
-    get_chart_cached,
+    get_chart_body,
     get_quick_stats_cached,
+    get_score_history_cached,
     search_tickers_cached,
 )
 from services.portfolio_service import ChatAgentRequest, chat_with_selected_agent
+from services.scoring import CLASSIFICATIONS, MARKET_CAP_BUCKETS
+from services.screener import run_screener
 
 router = APIRouter(tags=["stocks"])
 
@@ -26,11 +34,19 @@ async def get_stock_analysis(
     ticker: str,
     request: Request,
     date: Optional[str] = Query(default=None),
+    mode: str = Query(default="full"),
     user_data: dict = Depends(verify_token_and_check_limit),
 ):
     started = time.perf_counter()
     if not ticker or len(ticker) > 10:
         raise ApiError(status_code=400, code="INVALID_TICKER", message="Invalid ticker symbol provided")
+    if mode not in ("full", "fast"):
+        raise ApiError(
+            status_code=400,
+            code="INVALID_MODE",
+            message="Analysis mode must be 'full' or 'fast'",
+            details={"mode": mode},
+        )
 
     enforce_rate_limit(
         key=f"analyze:{user_data['uid']}",
@@ -39,6 +55,20 @@ async def get_stock_analysis(
         scope="analyze",
     )
 
+    if mode == "fast":
+        # Deterministic scorers only: no LLM spend, so it does not use up the free analysis.
+        result = await fast_analysis(ticker, date)
+        log_event(
+            "info",
+            "analysis.fast_completed",
+            endpoint="/api/analyze/{ticker}",
+            userId=user_data.get("uid"),
+            ticker=ticker.upper(),
+            provider="yfinance",
+            latencyMs=round((time.perf_counter() - started) * 1000, 2),
+        )
+        return result
+
     if not user_data.get("isPro"):
         user_data["user_ref"].update({"analysisCount": firestore.Increment(1)})
 
@@ -51,24 +81,91 @@ async def get_stock_analysis(
         provider="gemini+yfinance",
         latencyMs=round((time.perf_counter() - started) * 1000, 2),
     )
-    stream = analyze_stock_stream(ticker, date)
+    stream = analysis_broker.subscribe(ticker, date)
+    return StreamingResponse(stream, media_type="text/event-stream")
+
+
+@router.post("/api/analyze/batch")
+async def analyze_batch(
+    request_body: BatchAnalysisRequest,
+    request: Request,
+    user_data: dict = Depends(verify_token_and_check_limit),
+):
+    started = time.perf_counter()
+    symbols = normalize_batch_tickers(request_body.tickers)
+    enforce_rate_limit(
+        key=f"analyze_batch:{user_data['uid']}",
+        limit=settings.rate_limit_analyze_batch,
+        window_seconds=settings.rate_limit_window_seconds,
+        scope="analyze_batch",
+    )
+
+    if not user_data.get("isPro"):
+        user_data["user_ref"].update({"analysisCount": firestore.Increment(len(symbols))})
+
+    log_event(
+        "info",
+        "analysis_batch.started",
+        endpoint="/api/analyze/batch",
+        userId=user_data.get("uid"),
+        tickers=symbols,
+        provider="gemini+yfinance",
+        latencyMs=round((time.perf_counter() - started) * 1000, 2),
+    )
+    stream = analyze_batch_stream(symbols)
     return StreamingResponse(stream, media_type="text/event-stream")
 
 
 @router.get("/api/chart/{ticker}")
 def get_chart(
     ticker: str,
+    request: Request,
     response: Response,
     period: str = Query("1mo"),
     interval: str = Query("1d"),
+    format: str = Query("points"),
+    since: Optional[str] = Query(default=None),
 ):
     started = time.perf_counter()
     if not ticker or len(ticker) > 10:
         raise ApiError(status_code=400, code="INVALID_TICKER", message="Invalid ticker symbol provided")
+    if format not in CHART_FORMATS:
+        raise ApiError(
+            status_code=400,
+            code="INVALID_FORMAT",
+            message=f"format must be one of: {', '.join(CHART_FORMATS)}",
+            details={"format": format},
+        )
+    if format == "binary" and interval not in UNIX_TIME_INTERVALS:
+        raise ApiError(
+            status_code=400,
+            code="INVALID_FORMAT",
+            message="The binary format is only available for intraday intervals",
+            details={"format": format, "interval": interval},
+        )
+    cursor = None
+    if since is not None:
+        if not since.isdigit():
+            raise ApiError(
+                status_code=400,
+                code="INVALID_CURSOR",
+                message="since must be a unix timestamp in seconds, as returned in X-Chart-Cursor",
+                details={"since": since},
+            )
+        cursor = int(since)
 
-    data, cache_meta = get_chart_cached(ticker, period, interval)
-    response.headers["X-Cache-Status"] = "HIT" if cache_meta.get("cached") else "MISS"
-    response.headers["X-Cache-Stale"] = str(bool(cache_meta.get("stale"))).lower()
+    body, cache_meta = get_chart_body(ticker, period, interval, format, cursor)
+    if cache_meta.get("cursor") is not None:
+        response.headers["X-Chart-Cursor"] = str(cache_meta["cursor"])
+    result = body_response(
+        request,
+        response,
+        cache_meta,
+        body,
+        settings.cache_ttl_seconds_chart,
+        settings.cache_swr_seconds_chart,
+        ("X-Chart-Cursor",),
+    )
     log_event(
         "info",
         "chart.fetched",
@@ -79,6 +176,97 @@ def get_chart(
         latencyMs=round((time.perf_counter() - started) * 1000, 2),
         cached=bool(cache_meta.get("cached")),
         stale=bool(cache_meta.get("stale")),
+        format=format,
+        since=cursor,
+        notModified=result.status_code == 304,
+        contentEncoding=result.headers.get("Content-Encoding", "identity"),
+    )
+    return result
+
+
+@router.get("/api/score-history/{ticker}")
+def get_score_history(
+    ticker: str,
+    response: Response,
+    start: Optional[str] = Query(default=None),
+    end: Optional[str] = Query(default=None),
+):
+    started = time.perf_counter()
+    if not ticker or len(ticker) > 10:
+        raise ApiError(status_code=400, code="INVALID_TICKER", message="Invalid ticker symbol provided")
+
+    data, cache_meta = get_score_history_cached(ticker, start, end)
+    response.headers["X-Cache-Status"] = "HIT" if cache_meta.get("cached") else "MISS"
+    response.headers["X-Cache-Stale"] = str(bool(cache_meta.get("stale"))).lower()
+    log_event(
+        "info",
+        "score_history.fetched",
+        endpoint="/api/score-history/{ticker}",
+        userId=None,
+        ticker=ticker.upper(),
+        provider="yfinance",
+        latencyMs=round((time.perf_counter() - started) * 1000, 2),
+        points=len(data.get("series") or []),
+        cached=bool(cache_meta.get("cached")),
+        stale=bool(cache_meta.get("stale")),
+    )
+    return data
+
+
+def _csv_filter(raw: Optional[str], allowed, name: str):
+    if not raw:
+        return None
+    values = {item.strip().upper().replace("_", " ") for item in raw.split(",") if item.strip()}
+    normalized = {value for value in allowed if value.upper().replace("_", " ") in values}
+    if len(normalized) != len(values):
+        raise ApiError(
+            status_code=400,
+            code="INVALID_FILTER",
+            message=f"Unknown {name} filter value",
+            details={name: raw, "allowed": list(allowed)},
+        )
+    return normalized
+
+
+@router.get("/api/screener")
+def get_screener(
+    response: Response,
+    min_score: Optional[int] = Query(default=None, ge=0, le=100),
+    min_fundamental: Optional[int] = Query(default=None, ge=0, le=100),
+    min_technical: Optional[int] = Query(default=None, ge=0, le=100),
+    min_sentiment: Optional[int] = Query(default=None, ge=0, le=100),
+    min_macro_risk: Optional[int] = Query(default=None, ge=0, le=100),
+    cap: Optional[str] = Query(default=None),
+    classification: Optional[str] = Query(default=None),
+    limit: int = Query(default=50, ge=1, le=500),
+):
+    started = time.perf_counter()
+    data, cache_meta = run_screener(
+        min_score=min_score,
+        min_sub_scores={
+            "Fundamental": min_fundamental,
+            "Technical": min_technical,
+            "Sentiment": min_sentiment,
+            "Macro_Risk": min_macro_risk,
+        },
+        caps=_csv_filter(cap, MARKET_CAP_BUCKETS, "cap"),
+        classifications=_csv_filter(classification, CLASSIFICATIONS, "classification"),
+        limit=limit,
+    )
+    response.headers["X-Cache-Status"] = "HIT" if cache_meta.get("cached") else "MISS"
+    response.headers["X-Cache-Stale"] = str(bool(cache_meta.get("stale"))).lower()
+    log_event(
+        "info",
+        "screener.completed",
+        endpoint="/api/screener",
+        userId=None,
+        provider="yfinance",
+        latencyMs=round((time.perf_counter() - started) * 1000, 2),
+        scoringMs=data["metadata"]["scoringMs"],
+        universe=data["metadata"]["universe"],
+        matched=data["metadata"]["matched"],
+        cached=bool(cache_meta.get("cached")),
+        stale=bool(cache_meta.get("stale")),
     )
     return data
 
@@ -106,12 +294,13 @@ async def chat_agent(request_body: ChatAgentRequest, request: Request, user_data
 
 
 @router.get("/api/search")
-def search_tickers(q: str = Query(..., min_length=1), response: Response = None):
+def search_tickers(request: Request, response: Response, q: str = Query(..., min_length=1)):
     started = time.perf_counter()
     data, cache_meta = search_tickers_cached(q)
-    if response is not None:
-        response.headers["X-Cache-Status"] = "HIT" if cache_meta.get("cached") else "MISS"
-        response.headers["X-Cache-Stale"] = str(bool(cache_meta.get("stale"))).lower()
+    body = cache_meta.get("encoded") or EncodedBody.from_json(data)
+    result = body_response(
+        request, response, cache_meta, body, settings.cache_ttl_seconds_search, settings.cache_swr_seconds_search
+    )
     log_event(
         "info",
         "search.completed",
@@ -122,29 +311,39 @@ def search_tickers(q: str = Query(..., min_length=1), response: Response = None)
         latencyMs=round((time.perf_counter() - started) * 1000, 2),
         cached=bool(cache_meta.get("cached")),
         stale=bool(cache_meta.get("stale")),
+        notModified=result.status_code == 304,
     )
-    return data
+    return result
 
 
 @router.get("/api/quick-stats/{ticker}")
-def get_quick_stats(ticker: str):
+def get_quick_stats(ticker: str, request: Request, response: Response):
     if not ticker or len(ticker) > 10:
         raise ApiError(status_code=400, code="INVALID_TICKER", message="Invalid ticker symbol provided")
 
     started = time.perf_counter()
     payload, cache_meta = get_quick_stats_cached(ticker)
     latency_ms = round((time.perf_counter() - started) * 1000, 2)
-
     if isinstance(payload, dict):
+        # The cached payload is shared between requests; per-request fields go on a copy.
         metadata = payload.get("metadata") if isinstance(payload.get("metadata"), dict) else {}
-        metadata.update(
-            {
+        payload = {
+            **payload,
+            "metadata": {
+                **metadata,
                 "cached": bool(cache_meta.get("cached")),
                 "stale": bool(cache_meta.get("stale")),
                 "latencyMs": latency_ms,
-            }
-        )
-        payload["metadata"] = metadata
+            },
+        }
+    result = body_response(
+        request,
+        response,
+        cache_meta,
+        EncodedBody.from_json(payload),
+        settings.cache_ttl_seconds_quick_stats,
+        settings.cache_swr_seconds_quick_stats,
+    )
     log_event(
         "info",
         "quick_stats.completed",
@@ -155,5 +354,6 @@ def get_quick_stats(ticker: str):
         latencyMs=latency_ms,
         cached=bool(cache_meta.get("cached")),
         stale=bool(cache_meta.get("stale")),
+        notModified=result.status_code == 304,
     )
-    return payload
+    return result
@@ -0,0 +1,108 @@
+import asyncio
+import json
+from typing import AsyncGenerator, Callable, Dict, List, Optional, Tuple
+
+from analysis_engine import analyze_stock_stream
+from core.logger import log_event
+
+
+RunKey = Tuple[str, Optional[str]]
+StreamFactory = Callable[[str, Optional[str]], AsyncGenerator[str, None]]
+
+
+class AnalysisRun:
+    """One in-flight analysis pipeline whose SSE chunks are replayed to every subscriber."""
+
+    def __init__(self, key: RunKey) -> None:
+        self.key = key
+        self.events: List[str] = []
+        self.finished = False
+        # Streams currently attached; a client that disconnects closes its stream and drops out.
+        self.subscribers = 0
+        self.loop = asyncio.get_running_loop()
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Condition()
+
+    async def publish(self, chunk: str) -> None:
+        async with self._changed:
+            self.events.append(chunk)
+            self._changed.notify_all()
+
+    async def finish(self) -> None:
+        async with self._changed:
+            self.finished = True
+            self._changed.notify_all()
+
+    async def stream(self) -> AsyncGenerator[str, None]:
+        index = 0
+        self.subscribers += 1
+        try:
+            while True:
+                async with self._changed:
+                    await self._changed.wait_for(lambda: index < len(self.events) or self.finished)
+                    pending = self.events[index:]
+                    finished = self.finished
+                index += len(pending)
+                for chunk in pending:
+                    yield chunk
+                if finished:
+                    return
+        finally:
+            self.subscribers -= 1
+
+
+class AnalysisBroker:
+    """Coalesces concurrent analyses of the same (ticker, target_date) into a single pipeline run.
+
+    The first subscriber starts the pipeline as a background task, so it keeps running for
+    the other subscribers even if the original client disconnects. Late subscribers get a
+    replay of everything emitted so far, followed by the live events.
+    """
+
+    def __init__(self, stream_factory: StreamFactory = analyze_stock_stream) -> None:
+        self._stream_factory = stream_factory
+        self._runs: Dict[RunKey, AnalysisRun] = {}
+
+    def active_runs(self) -> int:
+        return len(self._runs)
+
+    def subscribe(self, ticker: str, target_date: Optional[str] = None) -> AsyncGenerator[str, None]:
+        key = (ticker.upper(), target_date or None)
+        run = self._runs.get(key)
+        if run is None or run.loop is not asyncio.get_running_loop():
+            run = AnalysisRun(key)
+            self._runs[key] = run
+            run.task = asyncio.create_task(self._drive(run))
+        else:
+            log_event(
+                "info",
+                "analysis.coalesced",
+                ticker=key[0],
+                targetDate=key[1],
+                subscribers=run.subscribers + 1,
+                replayedEvents=len(run.events),
+            )
+        return run.stream()
+
+    async def _drive(self, run: AnalysisRun) -> None:
+        ticker, target_date = run.key
+        try:
+            async for chunk in self._stream_factory(ticker, target_date):
+                await run.publish(chunk)
+        except Exception as exc:
+            log_event(
+                "error",
+                "analysis.broker_run_failed",
+                ticker=ticker,
+                targetDate=target_date,
+                errorType=type(exc).__name__,
+                errorMessage=str(exc),
+            )
+            await run.publish(f"data: {json.dumps({'type': 'error', 'message': str(exc)})}\n\n")
+        finally:
+            await run.finish()
+            if self._runs.get(run.key) is run:
+                self._runs.pop(run.key, None)
+
+
+analysis_broker = AnalysisBroker()
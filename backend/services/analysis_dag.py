@@ -0,0 +1,170 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.config import settings
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    deps: Tuple[str, ...] = ()
+    # Only stages that are expensive to recompute (LLM calls) are worth a memo entry.
+    memoize: bool = False
+
+
+class StageGraph:
+    """A static DAG of named pipeline stages, validated once at import time."""
+
+    def __init__(self, stages: Iterable[Stage]) -> None:
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage: {stage.name}")
+            self.stages[stage.name] = stage
+        for stage in self.stages.values():
+            missing = [dep for dep in stage.deps if dep not in self.stages]
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on unknown stages: {missing}")
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        pending = {name: set(stage.deps) for name, stage in self.stages.items()}
+        order: List[str] = []
+        while pending:
+            ready = [name for name, deps in pending.items() if not deps]
+            if not ready:
+                raise ValueError(f"Stage graph has a cycle among: {sorted(pending)}")
+            for name in ready:
+                order.append(name)
+                del pending[name]
+            for deps in pending.values():
+                deps.difference_update(ready)
+        return order
+
+    def __getitem__(self, name: str) -> Stage:
+        return self.stages[name]
+
+
+def fingerprint(value: Any) -> str:
+    """Stable content hash of a JSON-like value (key order does not matter)."""
+    material = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class StageMemo:
+    """Process-wide LRU of memoized stage outputs, keyed by the fingerprint of the stage inputs."""
+
+    def __init__(self, max_entries: int, ttl_seconds: int) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+        self._evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, stage: str, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._counters[stage]["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters[stage]["hits"] += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any) -> None:
+        if not self.enabled or value is None:
+            return
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "ttlSeconds": self.ttl_seconds,
+                "evictions": self._evictions,
+                "stages": {stage: dict(counters) for stage, counters in sorted(self._counters.items())},
+            }
+
+
+class StageRun:
+    """One pass over a StageGraph: the outputs resolved so far and which memoized stages were reused.
+
+    A memoized stage's key hashes its `scope` (e.g. the ticker), its `salt` (template version,
+    model) and the fingerprints of its direct inputs. Upstream stages are always recomputed but
+    only fingerprinted on demand, so an input that recomputes to the same value still lets every
+    stage below it be reused. An output put with a `basis` is fingerprinted by that basis instead,
+    e.g. the inputs behind multiples that are repriced on every tick.
+    """
+
+    def __init__(self, graph: StageGraph, memo: StageMemo, scope: str, salts: Optional[Dict[str, Any]] = None) -> None:
+        self.graph = graph
+        self.memo = memo
+        self.scope = scope
+        self.salts = salts or {}
+        self.outputs: Dict[str, Any] = {}
+        self.reused: List[str] = []
+        self._fingerprints: Dict[str, str] = {}
+        self._bases: Dict[str, Any] = {}
+
+    def put(self, name: str, value: Any, basis: Any = None) -> Any:
+        self.graph[name]  # unknown stages fail loudly
+        self.outputs[name] = value
+        self._fingerprints.pop(name, None)
+        if basis is None:
+            self._bases.pop(name, None)
+        else:
+            self._bases[name] = basis
+        return value
+
+    def _fingerprint(self, name: str) -> str:
+        if name not in self.outputs:
+            raise RuntimeError(f"Stage {name} has not been resolved yet")
+        if name not in self._fingerprints:
+            self._fingerprints[name] = fingerprint(self._bases.get(name, self.outputs[name]))
+        return self._fingerprints[name]
+
+    def key(self, name: str) -> str:
+        stage = self.graph[name]
+        inputs = [[dep, self._fingerprint(dep)] for dep in stage.deps]
+        return fingerprint([self.scope, name, self.salts.get(name), inputs])
+
+    def recall(self, name: str) -> Optional[Any]:
+        """The memoized output for `name` if its inputs are unchanged, recorded as this run's output."""
+        if not self.graph[name].memoize:
+            return None
+        value = self.memo.get(name, self.key(name))
+        if value is None:
+            return None
+        self.reused.append(name)
+        return self.put(name, value)
+
+    def remember(self, name: str, value: Any) -> Any:
+        self.put(name, value)
+        if self.graph[name].memoize:
+            self.memo.set(self.key(name), value)
+        return value
+
+
+stage_memo = StageMemo(settings.analysis_stage_memo_max_entries, settings.analysis_stage_memo_ttl_seconds)
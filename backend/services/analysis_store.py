@@ -0,0 +1,214 @@
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.config import settings
+from core.logger import log_event
+from services.storage import atomic_write_json
+
+
+ANALYSIS_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+INDEX_FILENAME = "_index.json"
+
+_DATED_KEY = re.compile(r"^(?P<ticker>[A-Z0-9.\-^=]+)_(?P<date>\d{4}-\d{2}-\d{2})$")
+
+
+def _store_key(ticker: str, target_date: Optional[str]) -> str:
+    ticker = ticker.upper()
+    return f"{ticker}_{target_date}" if target_date else ticker
+
+
+class AnalysisStore:
+    """Analysis results on disk, fronted by an LRU of parsed payloads and a per-ticker score index.
+
+    Files keep the historical `{ticker}[_{date}].json` layout. Writes go through a temp file and
+    `os.replace` so readers never see a partially written result. Freshness comes from the
+    payload's `metadata.generated_at`, falling back to file mtime for results written before
+    the store existed. Nothing touches disk until first use (or `load()` at startup).
+    """
+
+    def __init__(self, root: str, max_entries: int = 128, max_dated_per_ticker: int = 30) -> None:
+        self.root = root
+        self.max_entries = max(1, max_entries)
+        self.max_dated_per_ticker = max(1, max_dated_per_ticker)
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    # ── Paths / index ─────────────────────────────────────────────────────────
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.json")
+
+    def _summarize(self, payload: Dict[str, Any], generated_at: str) -> Dict[str, Any]:
+        return {
+            "score": payload.get("score"),
+            "recommendation": payload.get("recommendation"),
+            "generated_at": generated_at,
+        }
+
+    def load(self) -> None:
+        """Reads (or rebuilds) the score index ahead of the first request."""
+        with self._lock:
+            self._ensure_index()
+
+    def _ensure_index(self) -> None:
+        # Callers hold self._lock.
+        if not self._loaded:
+            self._load_index()
+            self._loaded = True
+
+    def _load_index(self) -> None:
+        index_path = os.path.join(self.root, INDEX_FILENAME)
+        try:
+            with open(index_path, "r", encoding="utf-8") as handle:
+                self._index = json.load(handle)
+            return
+        except FileNotFoundError:
+            pass
+        except Exception as exc:
+            log_event("warning", "analysis_store.index_corrupt", errorType=type(exc).__name__, errorMessage=str(exc))
+
+        # Rebuild from the undated results once, then persist for the next start.
+        os.makedirs(self.root, exist_ok=True)
+        for filename in os.listdir(self.root):
+            key, ext = os.path.splitext(filename)
+            if ext != ".json" or key.startswith((".", "_")) or _DATED_KEY.match(key):
+                continue
+            payload = self._read_file(key)
+            if payload is not None:
+                self._index[key] = self._summarize(payload, self._generated_at(key, payload))
+        self._persist_index()
+
+    def _persist_index(self) -> None:
+        try:
+            atomic_write_json(os.path.join(self.root, INDEX_FILENAME), self._index)
+        except Exception as exc:
+            log_event("warning", "analysis_store.index_write_failed", errorType=type(exc).__name__, errorMessage=str(exc))
+
+    # ── Reads ─────────────────────────────────────────────────────────────────
+
+    def _read_file(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return None
+        except Exception as exc:
+            log_event(
+                "warning",
+                "analysis_store.read_failed",
+                cacheKey=key,
+                errorType=type(exc).__name__,
+                errorMessage=str(exc),
+            )
+            return None
+
+    def _generated_at(self, key: str, payload: Dict[str, Any]) -> str:
+        generated_at = (payload.get("metadata") or {}).get("generated_at")
+        if generated_at:
+            return generated_at
+        try:
+            return datetime.fromtimestamp(os.path.getmtime(self._path(key))).isoformat()
+        except OSError:
+            return datetime.now().isoformat()
+
+    def _remember(self, key: str, payload: Dict[str, Any]) -> None:
+        self._entries[key] = payload
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, ticker: str, target_date: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Returns the stored analysis. The payload is shared with the LRU; treat it as read-only."""
+        key = _store_key(ticker, target_date)
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                return payload
+
+        payload = self._read_file(key)
+        if payload is None:
+            return None
+        payload.setdefault("metadata", {})
+        payload["metadata"].setdefault("generated_at", self._generated_at(key, payload))
+        with self._lock:
+            self._remember(key, payload)
+        return payload
+
+    def get_fresh(self, ticker: str, target_date: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Returns a reusable analysis: any dated result, or an undated one generated today."""
+        payload = self.get(ticker, target_date)
+        if payload is None or target_date:
+            return payload
+        try:
+            generated = datetime.fromisoformat(payload["metadata"]["generated_at"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        return payload if generated.date() == datetime.now().date() else None
+
+    def summary(self, ticker: str) -> Optional[Dict[str, Any]]:
+        """Score, recommendation and generated_at for the latest undated analysis, without disk access."""
+        with self._lock:
+            self._ensure_index()
+            entry = self._index.get(ticker.upper())
+        return dict(entry) if entry else None
+
+    # ── Writes / retention ────────────────────────────────────────────────────
+
+    def save(self, ticker: str, target_date: Optional[str], payload: Dict[str, Any]) -> None:
+        key = _store_key(ticker, target_date)
+        os.makedirs(self.root, exist_ok=True)
+        atomic_write_json(self._path(key), payload)
+        with self._lock:
+            self._ensure_index()
+            self._remember(key, payload)
+            if not target_date:
+                self._index[key] = self._summarize(payload, self._generated_at(key, payload))
+                self._persist_index()
+        if target_date:
+            self.compact(ticker)
+
+    def _dated_keys(self, ticker: Optional[str] = None) -> Dict[str, List[Tuple[str, str]]]:
+        grouped: Dict[str, List[Tuple[str, str]]] = {}
+        try:
+            filenames = os.listdir(self.root)
+        except FileNotFoundError:
+            return grouped
+        for filename in filenames:
+            key, ext = os.path.splitext(filename)
+            match = _DATED_KEY.match(key) if ext == ".json" else None
+            if not match or (ticker and match.group("ticker") != ticker.upper()):
+                continue
+            grouped.setdefault(match.group("ticker"), []).append((match.group("date"), key))
+        return grouped
+
+    def compact(self, ticker: Optional[str] = None) -> int:
+        """Keeps the newest `max_dated_per_ticker` dated results per ticker and deletes the rest."""
+        removed = 0
+        for symbol, dated in self._dated_keys(ticker).items():
+            dated.sort(reverse=True)
+            for _date, key in dated[self.max_dated_per_ticker:]:
+                try:
+                    os.unlink(self._path(key))
+                    removed += 1
+                except OSError:
+                    continue
+                with self._lock:
+                    self._entries.pop(key, None)
+        if removed:
+            log_event("info", "analysis_store.compacted", ticker=ticker, removed=removed)
+        return removed
+
+
+analysis_store = AnalysisStore(
+    ANALYSIS_CACHE_DIR,
+    max_entries=settings.analysis_store_lru_size,
+    max_dated_per_ticker=settings.analysis_store_max_dated_per_ticker,
+)
@@ -0,0 +1,116 @@
+import asyncio
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from analysis_engine import analysis_events, sse
+from core.config import settings
+from core.errors import ApiError
+from core.llm_scheduler import LLMPriority, llm_priority
+from core.logger import log_event
+from services.macro_service import get_macro_snapshot
+from services.market_data import prime_market_snapshots
+
+
+class BatchAnalysisRequest(BaseModel):
+    tickers: List[str]
+
+
+_limiter: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+
+
+def _batch_agent_limiter() -> asyncio.Semaphore:
+    """Process-wide cap on concurrent agent calls made on behalf of batch analyses."""
+    global _limiter
+    loop = asyncio.get_running_loop()
+    if _limiter is None or _limiter[0] is not loop:
+        _limiter = (loop, asyncio.Semaphore(max(1, settings.analysis_batch_llm_concurrency)))
+    return _limiter[1]
+
+
+def normalize_batch_tickers(tickers: List[str]) -> List[str]:
+    symbols: List[str] = []
+    for ticker in tickers:
+        symbol = (ticker or "").strip().upper()
+        if not symbol or len(symbol) > 10:
+            raise ApiError(
+                status_code=400,
+                code="INVALID_TICKER",
+                message="Invalid ticker symbol provided",
+                details={"ticker": ticker},
+            )
+        if symbol not in symbols:
+            symbols.append(symbol)
+
+    if not symbols:
+        raise ApiError(status_code=400, code="BATCH_EMPTY", message="At least one ticker is required")
+    if len(symbols) > settings.analysis_batch_max_tickers:
+        raise ApiError(
+            status_code=400,
+            code="BATCH_TOO_LARGE",
+            message="Too many tickers in one batch",
+            details={"maxTickers": settings.analysis_batch_max_tickers, "requested": len(symbols)},
+        )
+    return symbols
+
+
+async def analyze_batch_stream(symbols: List[str]) -> AsyncGenerator[str, None]:
+    """Runs the analysis pipeline for many tickers and multiplexes their events into one SSE stream.
+
+    Every event carries a `ticker` field. History is bulk-downloaded once up front, the macro
+    snapshot is warmed once, and all agent calls share the batch concurrency cap.
+    """
+    loop = asyncio.get_running_loop()
+    yield sse({"type": "batch_started", "tickers": symbols})
+
+    try:
+        primed = await loop.run_in_executor(None, prime_market_snapshots, symbols)
+        await loop.run_in_executor(None, get_macro_snapshot)
+        yield sse({"type": "status", "message": f"Prefetched market data for {len(primed)}/{len(symbols)} tickers."})
+    except Exception as exc:
+        log_event(
+            "warning",
+            "analysis_batch.prefetch_failed",
+            tickers=symbols,
+            errorType=type(exc).__name__,
+            errorMessage=str(exc),
+        )
+        yield sse({"type": "status", "message": "Bulk prefetch failed; fetching tickers individually."})
+
+    limiter = _batch_agent_limiter()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump(symbol: str) -> None:
+        try:
+            # Batch work queues behind chat and live analyses for the global LLM slots.
+            with llm_priority(LLMPriority.BATCH):
+                async for event in analysis_events(symbol, agent_limiter=limiter):
+                    await queue.put({**event, "ticker": symbol})
+        except Exception as exc:
+            await queue.put({"type": "error", "message": str(exc), "ticker": symbol})
+        finally:
+            await queue.put(None)
+
+    tasks = [asyncio.create_task(pump(symbol)) for symbol in symbols]
+    outcomes: Dict[str, str] = {}
+    try:
+        remaining = len(tasks)
+        while remaining:
+            event = await queue.get()
+            if event is None:
+                remaining -= 1
+                continue
+            if event["type"] in ("complete", "error"):
+                outcomes[event["ticker"]] = event["type"]
+            yield sse(event)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    yield sse(
+        {
+            "type": "batch_complete",
+            "completed": [symbol for symbol in symbols if outcomes.get(symbol) == "complete"],
+            "failed": [symbol for symbol in symbols if outcomes.get(symbol) != "complete"],
+        }
+    )
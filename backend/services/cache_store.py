@@ -11,6 +11,16 @@ class CacheEntry:
     value: Any
     fresh_until: float
     stale_until: float
+    # Changes on every fill, so responses built from the entry can be validated with ETags.
+    version: int = 0
+    # Optional immutable representation (e.g. an EncodedBody) built once when the entry is filled.
+    encoded: Any = None
+
+    def meta(self, cached: bool, stale: bool, **extra: Any) -> Dict[str, Any]:
+        meta = {"cached": cached, "stale": stale, "version": self.version, **extra}
+        if self.encoded is not None:
+            meta["encoded"] = self.encoded
+        return meta
 
 
 class SWRCache:
@@ -18,21 +28,36 @@ class SWRCache:
         self._entries: Dict[str, CacheEntry] = {}
         self._inflight: Dict[str, threading.Event] = {}
         self._lock = threading.Lock()
+        self._version = 0
 
-    def _set_entry(self, key: str, value: Any, ttl_seconds: int, swr_seconds: int) -> None:
+    def _set_entry(self, key: str, value: Any, ttl_seconds: int, swr_seconds: int, encoded: Any = None) -> CacheEntry:
         now = time.time()
-        self._entries[key] = CacheEntry(
+        # Seeded from the clock so versions are not reused across restarts or between workers.
+        self._version = max(self._version + 1, time.time_ns())
+        entry = CacheEntry(
             value=value,
             fresh_until=now + max(1, ttl_seconds),
             stale_until=now + max(1, ttl_seconds + swr_seconds),
+            version=self._version,
+            encoded=encoded,
         )
+        self._entries[key] = entry
+        return entry
 
-    def _refresh_in_background(self, key: str, fetcher: Callable[[], Any], ttl_seconds: int, swr_seconds: int) -> None:
+    def _refresh_in_background(
+        self,
+        key: str,
+        fetcher: Callable[[], Any],
+        ttl_seconds: int,
+        swr_seconds: int,
+        encoder: Optional[Callable[[Any], Any]],
+    ) -> None:
         def _worker() -> None:
             try:
                 value = fetcher()
+                encoded = encoder(value) if encoder else None
                 with self._lock:
-                    self._set_entry(key, value, ttl_seconds, swr_seconds)
+                    self._set_entry(key, value, ttl_seconds, swr_seconds, encoded)
                 log_event("info", "cache.background_refresh_ok", cacheKey=key)
             except Exception as exc:
                 log_event(
@@ -51,13 +76,27 @@ class SWRCache:
         thread = threading.Thread(target=_worker, daemon=True)
         thread.start()
 
+    def set(self, key: str, value: Any, ttl_seconds: int, swr_seconds: int) -> int:
+        """Seeds an entry directly, e.g. from a bulk fetch that covered many keys at once; returns its version."""
+        with self._lock:
+            return self._set_entry(key, value, ttl_seconds, swr_seconds).version
+
+    def peek(self, key: str) -> Any:
+        """The last value stored under `key`, however stale, without triggering a fetch."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.value if entry else None
+
     def get_or_fetch(
         self,
         key: str,
         fetcher: Callable[[], Any],
         ttl_seconds: int,
         swr_seconds: int,
+        wait_timeout_seconds: float = 5,
+        encoder: Optional[Callable[[Any], Any]] = None,
     ) -> Tuple[Any, Dict[str, Any]]:
+        """The value and cache metadata; with `encoder`, the metadata's "encoded" holds encoder(value) from fill time."""
         now = time.time()
         wait_event: Optional[threading.Event] = None
         refresh_in_background = False
@@ -65,14 +104,14 @@ class SWRCache:
         with self._lock:
             entry = self._entries.get(key)
             if entry and entry.fresh_until > now:
-                return entry.value, {"cached": True, "stale": False}
+                return entry.value, entry.meta(cached=True, stale=False)
 
             if entry and entry.stale_until > now:
                 # Return stale immediately and refresh in background once.
                 if key not in self._inflight:
                     self._inflight[key] = threading.Event()
                     refresh_in_background = True
-                return entry.value, {"cached": True, "stale": True}
+                return entry.value, entry.meta(cached=True, stale=True)
 
             # No usable cache; dedupe in-flight requests.
             if key in self._inflight:
@@ -81,29 +120,32 @@ class SWRCache:
                 self._inflight[key] = threading.Event()
 
         if refresh_in_background:
-            self._refresh_in_background(key, fetcher, ttl_seconds, swr_seconds)
+            self._refresh_in_background(key, fetcher, ttl_seconds, swr_seconds, encoder)
             with self._lock:
                 stale_entry = self._entries.get(key)
-                return stale_entry.value if stale_entry else None, {"cached": True, "stale": True}
+                if stale_entry is None:
+                    return None, {"cached": True, "stale": True}
+                return stale_entry.value, stale_entry.meta(cached=True, stale=True)
 
         if wait_event is not None:
-            wait_event.wait(timeout=5)
+            wait_event.wait(timeout=wait_timeout_seconds)
             with self._lock:
                 entry = self._entries.get(key)
                 if entry:
                     now = time.time()
-                    return entry.value, {"cached": True, "stale": entry.fresh_until <= now}
+                    return entry.value, entry.meta(cached=True, stale=entry.fresh_until <= now)
 
         try:
             value = fetcher()
+            encoded = encoder(value) if encoder else None
             with self._lock:
-                self._set_entry(key, value, ttl_seconds, swr_seconds)
-            return value, {"cached": False, "stale": False}
+                entry = self._set_entry(key, value, ttl_seconds, swr_seconds, encoded)
+            return value, entry.meta(cached=False, stale=False)
         except Exception:
             with self._lock:
                 stale_entry = self._entries.get(key)
             if stale_entry and stale_entry.stale_until > time.time():
-                return stale_entry.value, {"cached": True, "stale": True, "fallback": "stale_on_error"}
+                return stale_entry.value, stale_entry.meta(cached=True, stale=True, fallback="stale_on_error")
             raise
         finally:
             with self._lock:
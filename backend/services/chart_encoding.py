@@ -0,0 +1,99 @@
+"""Columnar and binary chart encodings built straight from OHLCV NumPy columns.
+
+The default chart payload is a list of per-bar dicts. These encodings skip that
+intermediate and produce the same sanitized values (prices rounded to 2 decimals,
+bars without a close dropped) as parallel arrays or as one packed buffer.
+
+Binary layout (little-endian), intraday intervals only:
+
+    header   magic b"OHLC", u8 version, u8 reserved, u16 reserved, u32 count, u32 reserved, i64 base time
+    open     f64[count]
+    high     f64[count]
+    low      f64[count]
+    close    f64[count]
+    volume   u64[count]
+    time     u32[count]   seconds since the base time (the first bar)
+
+Prices are f64 so every rounded cent survives (f32 loses cents above ~$65k). The 24-byte
+header keeps all 8-byte columns aligned for typed-array views.
+"""
+
+import struct
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+
+CHART_FORMATS = ("points", "columnar", "binary")
+BINARY_MEDIA_TYPE = "application/octet-stream"
+BINARY_MAGIC = b"OHLC"
+BINARY_VERSION = 2
+_HEADER = struct.Struct("<4sBBHIIq")
+_PRICE_COLUMNS = ("open", "high", "low", "close")
+
+# Intervals whose chart times are unix seconds; all others use YYYY-MM-DD dates.
+UNIX_TIME_INTERVALS = frozenset({"1m", "2m", "5m", "15m", "30m", "60m", "90m", "1h"})
+
+
+def _prices(frame: pd.DataFrame, column: str, size: int) -> np.ndarray:
+    if column not in frame.columns:
+        return np.full(size, np.nan)
+    return frame[column].to_numpy(dtype=np.float64)
+
+
+def chart_columns(frame: pd.DataFrame, interval: str) -> Dict[str, np.ndarray]:
+    """Sanitized chart columns; missing open/high/low fall back to the close like the points format."""
+    if frame is None or frame.empty:
+        return {name: np.empty(0) for name in ("time", "open", "high", "low", "close", "volume")}
+    size = len(frame)
+    close = np.round(_prices(frame, "Close", size), 2)
+    keep = ~np.isnan(close)
+    close = close[keep]
+    open_ = np.round(_prices(frame, "Open", size), 2)[keep]
+    open_ = np.where(np.isnan(open_), close, open_)
+    high = np.round(_prices(frame, "High", size), 2)[keep]
+    high = np.where(np.isnan(high), np.maximum(open_, close), high)
+    low = np.round(_prices(frame, "Low", size), 2)[keep]
+    low = np.where(np.isnan(low), np.minimum(open_, close), low)
+    volume = np.nan_to_num(_prices(frame, "Volume", size)[keep], nan=0.0).astype(np.int64)
+
+    index = frame.index[keep]
+    if interval in UNIX_TIME_INTERVALS:
+        time = np.asarray((index - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1), dtype=np.int64)
+    else:
+        time = np.asarray(index.strftime("%Y-%m-%d"), dtype=object)
+    return {"time": time, "open": open_, "high": high, "low": low, "close": close, "volume": volume}
+
+
+def encode_columnar(columns: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    return {"format": "columnar", "count": int(len(columns["close"])), **{name: values.tolist() for name, values in columns.items()}}
+
+
+def encode_binary(columns: Dict[str, np.ndarray]) -> bytes:
+    count = len(columns["close"])
+    base = int(columns["time"][0]) if count else 0
+    header = _HEADER.pack(BINARY_MAGIC, BINARY_VERSION, 0, 0, count, 0, base)
+    return b"".join(
+        [
+            header,
+            *(columns[name].astype("<f8").tobytes() for name in _PRICE_COLUMNS),
+            columns["volume"].astype("<u8").tobytes(),
+            (columns["time"] - base).astype("<u4").tobytes(),
+        ]
+    )
+
+
+def decode_binary(data: bytes) -> Dict[str, np.ndarray]:
+    """Inverse of `encode_binary`, for tests and Python clients."""
+    magic, version, _, _, count, _, base = _HEADER.unpack_from(data)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError(f"Not a version {BINARY_VERSION} OHLC chart buffer")
+    offset = _HEADER.size
+    columns = {}
+    for name, dtype in (*((name, "<f8") for name in _PRICE_COLUMNS), ("volume", "<u8"), ("time", "<u4")):
+        values = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+        offset += values.nbytes
+        columns[name] = values
+    columns["time"] = columns["time"].astype(np.int64) + base
+    return columns
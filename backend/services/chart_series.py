@@ -0,0 +1,217 @@
+"""Chart bars derived from one canonical daily and one canonical intraday series per ticker.
+
+Every (period, interval) chart is a slice of a canonical series, resampled server-side
+when the interval is coarser than the series, so the chart cache and provider traffic
+grow with the number of tickers rather than with ticker x timeframe combinations.
+
+The intraday series is appended to rather than refetched: a refresh asks the provider
+only for bars from the last stored one onwards, which replaces the in-progress bar and
+adds any newer ones. Clients can do the same with a `since` cursor (see `bars_since`).
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+import yfinance as yf
+
+from core.budget import record_provider_call
+from core.config import settings
+from services.cache_store import swr_cache
+from services.ohlcv_store import ohlcv_frame, ohlcv_store
+
+
+INTRADAY_BASE_INTERVAL = "5m"
+INTRADAY_BASE_PERIOD = "5d"
+# A stored intraday series older than this is refetched in full instead of appended to.
+INTRADAY_APPEND_MAX_GAP = pd.Timedelta(days=7)
+MAX_HISTORY_START = "1900-01-01"
+
+PERIOD_OFFSETS = {
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+DAILY_PERIODS = frozenset({"1d", "5d", "ytd", "max", *PERIOD_OFFSETS})
+INTRADAY_PERIODS = frozenset({"1d", "5d"})
+
+# (pandas rule, resample kwargs) per interval; None means the canonical series as is.
+# Weekly and monthly bins are labelled by their first day, like Yahoo's own bars.
+DAILY_INTERVALS = {
+    "1d": None,
+    "1wk": ("W-MON", {"label": "left", "closed": "left"}),
+    "1mo": ("MS", {}),
+    "3mo": ("QS", {}),
+}
+# Intraday bins are anchored at the 9:30 open (offset from midnight), so 60m bars start at :30.
+INTRADAY_INTERVALS = {
+    "5m": None,
+    "15m": ("15min", {"offset": "30min"}),
+    "30m": ("30min", {"offset": "30min"}),
+    "60m": ("60min", {"offset": "30min"}),
+    "1h": ("60min", {"offset": "30min"}),
+    "90m": ("90min", {"offset": "30min"}),
+}
+_AGGREGATIONS = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+
+
+@dataclass(frozen=True)
+class DailySeries:
+    frame: pd.DataFrame
+    # Earliest date the series was requested from; longer periods extend it.
+    start: str
+
+
+def is_intraday(interval: str) -> bool:
+    return interval in INTRADAY_INTERVALS
+
+
+def supports(period: str, interval: str) -> bool:
+    """True if the chart can be derived from a canonical series; finer bars (1m, 2m) cannot."""
+    if is_intraday(interval):
+        return period in INTRADAY_PERIODS
+    return interval in DAILY_INTERVALS and period in DAILY_PERIODS
+
+
+def bar_times(index: pd.DatetimeIndex) -> pd.Index:
+    """Unix seconds of each bar's start; daily bars start at midnight exchange time."""
+    return (index - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+
+
+def bars_since(frame: pd.DataFrame, since: Optional[int]) -> pd.DataFrame:
+    """Bars starting at or after the `since` cursor (unix seconds), so the bar at the cursor is re-sent."""
+    if since is None or frame is None or frame.empty:
+        return frame
+    return frame.iloc[frame.index.searchsorted(pd.Timestamp(since, unit="s", tz="UTC")):]
+
+
+def chart_cursor(frame: pd.DataFrame, since: Optional[int] = None) -> Optional[int]:
+    """The cursor for the next delta request: the start of the last (possibly still forming) bar."""
+    if frame is None or frame.empty:
+        return since
+    return int(bar_times(frame.index[-1:])[0])
+
+
+def append_bars(stored: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    """Stored bars before the first delta bar, then the delta; the overlapping in-progress bar is replaced."""
+    if delta.empty:
+        return stored
+    if stored.empty:
+        return delta
+    return pd.concat([stored.iloc[: stored.index.searchsorted(delta.index[0])], delta])
+
+
+def slice_period(frame: pd.DataFrame, period: str) -> Optional[pd.DataFrame]:
+    """The trailing `period` of daily bars, relative to the last bar; None for unknown periods."""
+    if frame is None or frame.empty or period == "max":
+        return frame
+    if period == "1d":
+        return frame.tail(1)
+    if period == "5d":
+        return frame.tail(5)
+    if period == "ytd":
+        return frame[frame.index.year == frame.index[-1].year]
+    offset = PERIOD_OFFSETS.get(period)
+    if offset is None:
+        return None
+    return frame[frame.index > frame.index[-1] - offset]
+
+
+def slice_sessions(frame: pd.DataFrame, period: str) -> pd.DataFrame:
+    """The trailing `period` ("1d" or "5d") of intraday bars, by session date."""
+    if frame.empty:
+        return frame
+    sessions = frame.index.normalize()
+    keep = sessions.unique()[-(1 if period == "1d" else 5):]
+    return frame[sessions.isin(keep)]
+
+
+def resample(frame: pd.DataFrame, interval: str) -> pd.DataFrame:
+    rule = (INTRADAY_INTERVALS if is_intraday(interval) else DAILY_INTERVALS).get(interval)
+    if rule is None or frame.empty:
+        return frame
+    freq, options = rule
+    columns = {column: how for column, how in _AGGREGATIONS.items() if column in frame.columns}
+    return frame.resample(freq, **options).agg(columns).dropna(subset=["Close"])
+
+
+def _daily_start(period: str) -> str:
+    if period == "max":
+        return MAX_HISTORY_START
+    return ohlcv_store.backfill_start(days=3653 if period == "10y" else None)
+
+
+def _fetch_daily(ticker: str, start: str) -> DailySeries:
+    return DailySeries(frame=ohlcv_store.daily(ticker, start), start=start)
+
+
+def _daily_base(ticker: str, start: str) -> Tuple[DailySeries, Dict[str, Any]]:
+    key = f"chart:{ticker}:daily"
+    series, cache_meta = swr_cache.get_or_fetch(
+        key,
+        lambda: _fetch_daily(ticker, start),
+        ttl_seconds=settings.cache_ttl_seconds_chart,
+        swr_seconds=settings.cache_swr_seconds_chart,
+    )
+    if start < series.start:
+        # A longer period than any served so far: extend the one entry instead of adding another.
+        series = _fetch_daily(ticker, start)
+        version = swr_cache.set(
+            key, series, ttl_seconds=settings.cache_ttl_seconds_chart, swr_seconds=settings.cache_swr_seconds_chart
+        )
+        cache_meta = {"cached": False, "stale": False, "version": version}
+    return series, cache_meta
+
+
+def _fetch_intraday(ticker: str, stored: Optional[pd.DataFrame]) -> pd.DataFrame:
+    record_provider_call("yfinance.chart_intraday")
+    stock = yf.Ticker(ticker)
+    if stored is None or stored.empty or stored.index[-1] < pd.Timestamp.now(tz="UTC") - INTRADAY_APPEND_MAX_GAP:
+        return ohlcv_frame(stock.history(period=INTRADAY_BASE_PERIOD, interval=INTRADAY_BASE_INTERVAL))
+    delta = ohlcv_frame(stock.history(start=stored.index[-1], interval=INTRADAY_BASE_INTERVAL))
+    return slice_sessions(append_bars(stored, delta), INTRADAY_BASE_PERIOD)
+
+
+def _intraday_base(ticker: str) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    key = f"chart:{ticker}:intraday"
+    return swr_cache.get_or_fetch(
+        key,
+        lambda: _fetch_intraday(ticker, swr_cache.peek(key)),
+        ttl_seconds=settings.cache_ttl_seconds_chart,
+        swr_seconds=settings.cache_swr_seconds_chart,
+    )
+
+
+def chart_base(ticker: str, period: str, interval: str) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """The canonical series a supported (period, interval) is derived from, and its cache metadata."""
+    symbol = ticker.upper()
+    if is_intraday(interval):
+        return _intraday_base(symbol)
+    series, cache_meta = _daily_base(symbol, _daily_start(period))
+    return series.frame, cache_meta
+
+
+def chart_frame(base: pd.DataFrame, period: str, interval: str, since: Optional[int] = None) -> pd.DataFrame:
+    """Chart bars sliced and resampled from a canonical series.
+
+    With `since`, the base series is cut at the cursor before slicing and resampling, so the
+    work is proportional to the bars returned. Resampled bins are anchored to calendar
+    boundaries, so the bin at the cursor is rebuilt whole.
+    """
+    if is_intraday(interval):
+        frame = slice_sessions(bars_since(base, since), period)
+    else:
+        frame = slice_period(bars_since(base, since), period)
+    return resample(frame, interval)
+
+
+def get_chart_frame(
+    ticker: str, period: str, interval: str, since: Optional[int] = None
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """OHLCV bars for a supported (period, interval), derived from the ticker's canonical series."""
+    base, cache_meta = chart_base(ticker, period, interval)
+    return chart_frame(base, period, interval, since), cache_meta
@@ -0,0 +1,490 @@
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import yfinance as yf
+
+from core.budget import record_provider_call
+from core.config import settings
+from core.logger import log_event
+from services.analysis_store import ANALYSIS_CACHE_DIR
+from services.storage import atomic_write_json
+
+
+STORE_VERSION = 1
+FUNDAMENTALS_DIR = os.path.join(ANALYSIS_CACHE_DIR, "fundamentals")
+
+# The `.info` fields the pipeline actually reads; everything else in that payload is dropped.
+FUNDAMENTAL_FIELDS = (
+    "shortName",
+    "longName",
+    "sector",
+    "industry",
+    "marketCap",
+    "sharesOutstanding",
+    "trailingPE",
+    "trailingEps",
+    "pegRatio",
+    "priceToBook",
+    "returnOnEquity",
+    "debtToEquity",
+    "freeCashflow",
+    "earningsQuarterlyGrowth",
+    "beta",
+)
+TEXT_FIELDS = frozenset({"shortName", "longName", "sector", "industry"})
+# Per-row date of the provider fetch; rows carried into a newer version keep their original date.
+REFRESHED_ON = "refreshedOn"
+
+# Doubling the pause after a batch with failures backs off from provider throttling.
+_MAX_BACKOFF_FACTOR = 8
+
+
+def _today() -> str:
+    return date.today().isoformat()
+
+
+def _clean(field: str, value: Any) -> Any:
+    if value is None:
+        return None
+    if field in TEXT_FIELDS:
+        return str(value) or None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def extract_fundamentals(info: Dict[str, Any]) -> Dict[str, Any]:
+    return {field: _clean(field, info.get(field)) for field in FUNDAMENTAL_FIELDS}
+
+
+def fetch_fundamentals(ticker: str) -> Dict[str, Any]:
+    """One live `.info` request, reduced to the stored fields."""
+    record_provider_call("yfinance.info")
+    info = yf.Ticker(ticker).info or {}
+    row = extract_fundamentals(info)
+    if all(value is None for value in row.values()):
+        raise ValueError(f"Provider returned no fundamentals for {ticker}")
+    return row
+
+
+def priced_info(row: Dict[str, Any], price: Optional[float], previous_close: Optional[float]) -> Dict[str, Any]:
+    """A provider-shaped `info` dict from a stored row, with price-dependent fields at `price`.
+
+    Missing fields are omitted rather than set to None, matching `.info`, so callers'
+    `info.get(key, default)` fallbacks keep working.
+    """
+    info = {field: row[field] for field in FUNDAMENTAL_FIELDS if row.get(field) is not None}
+    if row.get(REFRESHED_ON):
+        info["fundamentalsAsOf"] = row[REFRESHED_ON]
+    if price:
+        info["currentPrice"] = price
+        # Multiples are repriced so a day-old row does not lag the market.
+        eps = info.get("trailingEps")
+        if eps and eps > 0:
+            info["trailingPE"] = round(price / eps, 2)
+        shares = info.get("sharesOutstanding")
+        if shares:
+            info["marketCap"] = int(shares * price)
+    if previous_close:
+        info["regularMarketPreviousClose"] = previous_close
+    return info
+
+
+class FundamentalsTable:
+    """One as-of version of the store: entry i of every column belongs to tickers[i]."""
+
+    def __init__(
+        self,
+        as_of: str,
+        tickers: Optional[List[str]] = None,
+        columns: Optional[Dict[str, List[Any]]] = None,
+        complete: bool = False,
+    ) -> None:
+        self.as_of = as_of
+        self.tickers: List[str] = list(tickers or [])
+        self.columns: Dict[str, List[Any]] = {
+            field: list((columns or {}).get(field) or [None] * len(self.tickers))
+            for field in (*FUNDAMENTAL_FIELDS, REFRESHED_ON)
+        }
+        self.index = {ticker: position for position, ticker in enumerate(self.tickers)}
+        # True once a full background refresh has finished for this as-of date.
+        self.complete = complete
+
+    def row(self, ticker: str) -> Optional[Dict[str, Any]]:
+        position = self.index.get(ticker)
+        if position is None:
+            return None
+        return {field: column[position] for field, column in self.columns.items()}
+
+    def upsert(self, ticker: str, values: Dict[str, Any], refreshed_on: str) -> None:
+        position = self.index.get(ticker)
+        if position is None:
+            position = len(self.tickers)
+            self.tickers.append(ticker)
+            self.index[ticker] = position
+            for column in self.columns.values():
+                column.append(None)
+        for field in FUNDAMENTAL_FIELDS:
+            self.columns[field][position] = values.get(field)
+        self.columns[REFRESHED_ON][position] = refreshed_on
+
+    def carry_forward(self, as_of: str) -> "FundamentalsTable":
+        return FundamentalsTable(as_of, self.tickers, self.columns)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": STORE_VERSION,
+            "asOf": self.as_of,
+            "complete": self.complete,
+            "tickers": self.tickers,
+            "columns": self.columns,
+        }
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> "FundamentalsTable":
+        if payload.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported fundamentals store version: {payload.get('version')}")
+        return cls(payload["asOf"], payload["tickers"], payload["columns"], bool(payload.get("complete")))
+
+
+class FundamentalsStore:
+    """Fundamentals per ticker, persisted as one columnar JSON file per as-of date.
+
+    Reads are served from the newest version in memory. A ticker missing from it (or
+    older than `max_age_days`) is fetched live once and written into today's version,
+    which starts as a copy of the previous one, so a partial day never loses rows.
+    Concurrent misses for one ticker share a single fetch.
+    """
+
+    def __init__(self, root: str, max_versions: int, max_age_days: int) -> None:
+        self.root = root
+        self.max_versions = max_versions
+        self.max_age_days = max_age_days
+        self._latest: Optional[FundamentalsTable] = None
+        self._loaded = False
+        # Live rows upserted into today's table in memory but not yet written to disk.
+        self._dirty = False
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, as_of: str) -> str:
+        return os.path.join(self.root, f"{as_of}.json")
+
+    def versions(self) -> List[str]:
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-5] for name in names if name.endswith(".json") and not name.startswith("."))
+
+    def _load(self, as_of: str) -> Optional[FundamentalsTable]:
+        try:
+            with open(self._path(as_of), "r", encoding="utf-8") as handle:
+                return FundamentalsTable.from_dict(json.load(handle))
+        except FileNotFoundError:
+            return None
+        except Exception as exc:
+            log_event(
+                "warning",
+                "fundamentals_store.load_failed",
+                asOf=as_of,
+                errorType=type(exc).__name__,
+                errorMessage=str(exc),
+            )
+            return None
+
+    def _save(self, table: FundamentalsTable) -> None:
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            atomic_write_json(self._path(table.as_of), table.to_dict())
+        except Exception as exc:
+            log_event(
+                "warning",
+                "fundamentals_store.save_failed",
+                asOf=table.as_of,
+                errorType=type(exc).__name__,
+                errorMessage=str(exc),
+            )
+            return
+        if self.max_versions <= 0:
+            return
+        for as_of in self.versions()[: -self.max_versions]:
+            try:
+                os.unlink(self._path(as_of))
+            except OSError:
+                pass
+
+    def _latest_table(self) -> Optional[FundamentalsTable]:
+        # Callers hold self._lock.
+        if not self._loaded:
+            versions = self.versions()
+            self._latest = self._load(versions[-1]) if versions else None
+            self._loaded = True
+        return self._latest
+
+    def _writable_table(self) -> FundamentalsTable:
+        today = _today()
+        latest = self._latest_table()
+        if latest is None:
+            self._latest = FundamentalsTable(today)
+        elif latest.as_of != today:
+            self._latest = latest.carry_forward(today)
+        return self._latest
+
+    def latest_as_of(self) -> Optional[str]:
+        with self._lock:
+            latest = self._latest_table()
+            return latest.as_of if latest else None
+
+    def refreshed_today(self) -> bool:
+        with self._lock:
+            latest = self._latest_table()
+            return latest is not None and latest.as_of == _today() and latest.complete
+
+    def tickers(self) -> List[str]:
+        with self._lock:
+            latest = self._latest_table()
+            return list(latest.tickers) if latest else []
+
+    def get(self, ticker: str, as_of: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """The stored row for `ticker`, from the newest version on or before `as_of` if given."""
+        ticker = ticker.upper()
+        with self._lock:
+            latest = self._latest_table()
+            if as_of is None or (latest is not None and latest.as_of <= as_of):
+                return latest.row(ticker) if latest else None
+        eligible = [version for version in self.versions() if version <= as_of]
+        table = self._load(eligible[-1]) if eligible else None
+        return table.row(ticker) if table else None
+
+    def put(self, rows: Dict[str, Dict[str, Any]], complete: bool = False) -> None:
+        """Writes freshly fetched rows into today's version."""
+        if not rows and not complete:
+            return
+        today = _today()
+        with self._lock:
+            table = self._writable_table()
+            for ticker, values in rows.items():
+                table.upsert(ticker.upper(), values, today)
+            table.complete = table.complete or complete
+            self._save(table)
+            self._dirty = False
+
+    def flush(self) -> None:
+        """Writes rows fetched by `get_or_fetch` since the last save, in one table rewrite."""
+        with self._lock:
+            if self._dirty:
+                self._save(self._writable_table())
+                self._dirty = False
+
+    def _is_fresh(self, row: Dict[str, Any]) -> bool:
+        refreshed_on = row.get(REFRESHED_ON)
+        if not refreshed_on:
+            return False
+        cutoff = (date.fromisoformat(_today()) - timedelta(days=self.max_age_days)).isoformat()
+        return refreshed_on >= cutoff
+
+    def _fetch_shared(self, ticker: str, fetcher: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+        """Fetches `ticker` live, or waits for the fetch another thread already started.
+
+        The row goes into today's table in memory before other waiters are released, so a
+        later miss finds it; writing it to disk is left to `flush`.
+        """
+        with self._lock:
+            future = self._inflight.get(ticker)
+            owner = future is None
+            if owner:
+                future = self._inflight[ticker] = Future()
+        if not owner:
+            return future.result()
+        try:
+            values = fetcher(ticker)
+        except BaseException as exc:
+            with self._lock:
+                self._inflight.pop(ticker, None)
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            self._writable_table().upsert(ticker, values, _today())
+            self._dirty = True
+            self._inflight.pop(ticker, None)
+        future.set_result(values)
+        return values
+
+    def _resolve(self, ticker: str, fetcher: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+        row = self.get(ticker)
+        if row is not None and self._is_fresh(row):
+            return row
+        try:
+            values = self._fetch_shared(ticker, fetcher)
+        except Exception as exc:
+            if row is None:
+                raise
+            log_event(
+                "warning",
+                "fundamentals_store.stale_served",
+                ticker=ticker,
+                refreshedOn=row.get(REFRESHED_ON),
+                errorType=type(exc).__name__,
+                errorMessage=str(exc),
+            )
+            return row
+        return {**values, REFRESHED_ON: _today()}
+
+    def get_or_fetch(self, ticker: str, fetcher: Callable[[str], Dict[str, Any]] = fetch_fundamentals) -> Dict[str, Any]:
+        """Stored row for `ticker`, fetching it live only when missing or too old.
+
+        If the live fetch fails a stale row is still served; with no row at all the
+        provider error propagates.
+        """
+        row = self._resolve(ticker.upper(), fetcher)
+        self.flush()
+        return row
+
+    def get_or_fetch_many(
+        self,
+        tickers: Iterable[str],
+        fetcher: Callable[[str], Dict[str, Any]] = fetch_fundamentals,
+        max_workers: int = 1,
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """`get_or_fetch` for many tickers on a bounded pool, with one table write for all live rows.
+
+        A ticker whose fetch fails with no stored row maps to None.
+        """
+        symbols = list(dict.fromkeys(ticker.upper() for ticker in tickers if ticker))
+        if not symbols:
+            return {}
+
+        def _resolve_or_none(ticker: str) -> Optional[Dict[str, Any]]:
+            return _try_fetch(lambda symbol: self._resolve(symbol, fetcher), ticker)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(len(symbols), max_workers))) as pool:
+            rows = dict(zip(symbols, pool.map(_resolve_or_none, symbols)))
+        self.flush()
+        return rows
+
+    def refresh(
+        self,
+        tickers: Iterable[str],
+        fetcher: Callable[[str], Dict[str, Any]] = fetch_fundamentals,
+        batch_size: Optional[int] = None,
+        pause_seconds: Optional[float] = None,
+        stop_event: Optional[threading.Event] = None,
+    ) -> Dict[str, Any]:
+        """Refetches `tickers` in batches, persisting after each batch.
+
+        Tickers already refreshed today are skipped, so an interrupted refresh resumes
+        where it stopped. The pause between batches keeps the refresh under the provider
+        call budget and doubles after any batch with failures.
+        """
+        batch_size = max(1, batch_size or settings.fundamentals_refresh_batch_size)
+        if pause_seconds is None:
+            pause_seconds = _batch_pause_seconds(batch_size)
+        today = _today()
+        pending = []
+        for ticker in dict.fromkeys(ticker.upper() for ticker in tickers if ticker):
+            row = self.get(ticker)
+            if row is None or row.get(REFRESHED_ON) != today:
+                pending.append(ticker)
+
+        started = time.perf_counter()
+        refreshed, failed, backoff = 0, [], 1
+        for offset in range(0, len(pending), batch_size):
+            if stop_event is not None and stop_event.is_set():
+                break
+            if offset:
+                if stop_event is not None:
+                    if stop_event.wait(pause_seconds * backoff):
+                        break
+                else:
+                    time.sleep(pause_seconds * backoff)
+            batch = pending[offset: offset + batch_size]
+            with ThreadPoolExecutor(max_workers=len(batch)) as pool:
+                results = list(pool.map(lambda ticker: _try_fetch(fetcher, ticker), batch))
+            rows = {ticker: row for ticker, row in zip(batch, results) if row is not None}
+            self.put(rows)
+            refreshed += len(rows)
+            failed.extend(ticker for ticker, row in zip(batch, results) if row is None)
+            backoff = 1 if len(rows) == len(batch) else min(backoff * 2, _MAX_BACKOFF_FACTOR)
+
+        stopped = stop_event is not None and stop_event.is_set()
+        if not stopped:
+            self.put({}, complete=True)
+        summary = {
+            "requested": len(pending),
+            "refreshed": refreshed,
+            "failed": failed,
+            "stopped": stopped,
+            "latencyMs": round((time.perf_counter() - started) * 1000, 2),
+        }
+        log_event("info", "fundamentals_store.refreshed", asOf=today, **summary)
+        return summary
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            latest = self._latest_table()
+            return {
+                "asOf": latest.as_of if latest else None,
+                "complete": bool(latest and latest.complete),
+                "tickers": len(latest.tickers) if latest else 0,
+                "versions": self.versions(),
+            }
+
+
+def _try_fetch(fetcher: Callable[[str], Dict[str, Any]], ticker: str) -> Optional[Dict[str, Any]]:
+    try:
+        return fetcher(ticker)
+    except Exception as exc:
+        log_event(
+            "warning",
+            "fundamentals_store.fetch_failed",
+            ticker=ticker,
+            errorType=type(exc).__name__,
+            errorMessage=str(exc),
+        )
+        return None
+
+
+def _batch_pause_seconds(batch_size: int) -> float:
+    """Pause between batches: the configured floor, or longer if the call budget requires it."""
+    budget = settings.provider_budget_calls_per_minute
+    budget_pause = 60.0 * batch_size / budget if budget > 0 else 0.0
+    return max(settings.fundamentals_refresh_batch_pause_seconds, budget_pause)
+
+
+def refresh_tickers(store: "FundamentalsStore") -> List[str]:
+    """Everything already tracked plus the screener universe."""
+    return sorted(set(store.tickers()) | set(settings.screener_universe))
+
+
+async def run_refresh_loop(store: "FundamentalsStore", stop_event: threading.Event) -> None:
+    """Background job: refreshes the store once per day, checking on a fixed interval."""
+    await asyncio.sleep(settings.fundamentals_refresh_initial_delay_seconds)
+    while not stop_event.is_set():
+        if not store.refreshed_today():
+            try:
+                await asyncio.to_thread(store.refresh, refresh_tickers(store), stop_event=stop_event)
+            except Exception as exc:
+                log_event(
+                    "error",
+                    "fundamentals_store.refresh_failed",
+                    errorType=type(exc).__name__,
+                    errorMessage=str(exc),
+                )
+        await asyncio.sleep(settings.fundamentals_refresh_check_seconds)
+
+
+fundamentals_store = FundamentalsStore(
+    FUNDAMENTALS_DIR,
+    max_versions=settings.fundamentals_store_max_versions,
+    max_age_days=settings.fundamentals_max_age_days,
+)
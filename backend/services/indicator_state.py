@@ -0,0 +1,314 @@
+import json
+import math
+import os
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.logger import log_event
+from services.analysis_store import ANALYSIS_CACHE_DIR
+from services.indicators import TechnicalSnapshot
+from services.storage import atomic_write_json
+
+
+STATE_VERSION = 1
+INDICATOR_STATE_DIR = os.path.join(ANALYSIS_CACHE_DIR, "indicators")
+
+_EMA_FAST_ALPHA = 2.0 / 13.0
+_EMA_SLOW_ALPHA = 2.0 / 27.0
+_SIGNAL_ALPHA = 2.0 / 10.0
+# A state is (re)built from at most this many trailing completed bars, so the EMA/MACD seed
+# does not depend on how much history the process happened to see first. The slow EMA's
+# seed weight decays to (25/27)^300 ~ 1e-10 over the window, so the result matches
+# `indicators.latest_technicals` on any history at least this long.
+WARMUP_BARS = 300
+# Relative tolerance when checking that stored bars still match the provider's history.
+# A larger drift means a split or dividend re-adjusted the series and the state is rebuilt.
+_REPLAY_TOLERANCE = 1e-6
+
+
+class RollingWindow:
+    """Fixed-size window with a running sum, so the mean updates in O(1)."""
+
+    def __init__(self, size: int, values: Optional[List[float]] = None) -> None:
+        self.size = size
+        self.values: Deque[float] = deque(values or [], maxlen=size)
+        self.total = math.fsum(self.values)
+
+    def push(self, value: float) -> None:
+        if len(self.values) == self.size:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+
+    def mean(self, next_value: Optional[float] = None) -> float:
+        """Window mean, optionally as if `next_value` had been pushed."""
+        if next_value is None:
+            return self.total / self.size if len(self.values) == self.size else math.nan
+        if len(self.values) + 1 < self.size:
+            return math.nan
+        dropped = self.values[0] if len(self.values) == self.size else 0.0
+        return (self.total - dropped + next_value) / self.size
+
+
+class MonotonicWindow:
+    """Sliding max (or min) over the last `size` bars using a monotonic deque of (index, value)."""
+
+    def __init__(self, size: int, keep_max: bool, items: Optional[List[List[float]]] = None) -> None:
+        self.size = size
+        self.keep_max = keep_max
+        self.items: Deque[List[float]] = deque(items or [])
+
+    def _dominates(self, a: float, b: float) -> bool:
+        return a >= b if self.keep_max else a <= b
+
+    def push(self, index: int, value: float) -> None:
+        while self.items and self._dominates(value, self.items[-1][1]):
+            self.items.pop()
+        self.items.append([index, value])
+        while self.items[0][0] <= index - self.size:
+            self.items.popleft()
+
+    def extreme(self, index: int, next_value: Optional[float] = None) -> float:
+        """Extreme of the window ending at `index`, optionally including a pending bar at `index`."""
+        if index + 1 < self.size:
+            return math.nan
+        current = None
+        for item_index, item_value in self.items:
+            if item_index > index - self.size:
+                current = item_value
+                break
+        if next_value is None:
+            return current if current is not None else math.nan
+        if current is None:
+            return next_value
+        return next_value if self._dominates(next_value, current) else current
+
+
+def _rsi(avg_gain: float, avg_loss: float) -> float:
+    if math.isnan(avg_gain) or math.isnan(avg_loss):
+        return math.nan
+    if avg_loss == 0:
+        return math.nan if avg_gain == 0 else 100.0
+    return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+class IndicatorState:
+    """Running indicator state for one ticker's daily bars.
+
+    Mirrors `indicators.latest_technicals`: EMA12/EMA26/signal recurrences, running sums for
+    SMA50/SMA200, RSI14 gains/losses and the 20-bar volume average, and monotonic deques for
+    the 14-bar high/low range. Appending a bar is O(1); `preview` evaluates a pending bar
+    (such as today's still-open session) without committing it.
+    """
+
+    def __init__(self, ticker: str) -> None:
+        self.ticker = ticker
+        self.bars = 0
+        self.last_timestamp: Optional[int] = None
+        self.last_close: Optional[float] = None
+        self.ema_fast = math.nan
+        self.ema_slow = math.nan
+        self.signal = math.nan
+        self.last_volume = math.nan
+        self.closes_50 = RollingWindow(50)
+        self.closes_200 = RollingWindow(200)
+        self.gains_14 = RollingWindow(14)
+        self.losses_14 = RollingWindow(14)
+        self.volumes_20 = RollingWindow(20)
+        self.highs_14 = MonotonicWindow(14, keep_max=True)
+        self.lows_14 = MonotonicWindow(14, keep_max=False)
+
+    def _step(self, close: float):
+        if self.bars == 0:
+            return close, close, 0.0, 0.0, 0.0
+        ema_fast = (1 - _EMA_FAST_ALPHA) * self.ema_fast + _EMA_FAST_ALPHA * close
+        ema_slow = (1 - _EMA_SLOW_ALPHA) * self.ema_slow + _EMA_SLOW_ALPHA * close
+        signal = (1 - _SIGNAL_ALPHA) * self.signal + _SIGNAL_ALPHA * (ema_fast - ema_slow)
+        delta = close - self.last_close
+        return ema_fast, ema_slow, signal, max(delta, 0.0), max(-delta, 0.0)
+
+    def append(self, timestamp: int, high: float, low: float, close: float, volume: float) -> None:
+        ema_fast, ema_slow, signal, gain, loss = self._step(close)
+        self.ema_fast, self.ema_slow, self.signal = ema_fast, ema_slow, signal
+        self.closes_50.push(close)
+        self.closes_200.push(close)
+        self.gains_14.push(gain)
+        self.losses_14.push(loss)
+        self.volumes_20.push(volume)
+        self.highs_14.push(self.bars, high)
+        self.lows_14.push(self.bars, low)
+        self.bars += 1
+        self.last_timestamp = timestamp
+        self.last_close = close
+        self.last_volume = volume
+
+    def latest(self) -> TechnicalSnapshot:
+        index = self.bars - 1
+        return TechnicalSnapshot(
+            close=np.float64(self.last_close if self.last_close is not None else math.nan),
+            sma50=np.float64(self.closes_50.mean()),
+            sma200=np.float64(self.closes_200.mean()),
+            rsi14=np.float64(_rsi(self.gains_14.mean(), self.losses_14.mean())),
+            macd=np.float64(self.ema_fast - self.ema_slow),
+            macd_signal=np.float64(self.signal),
+            volume=np.float64(self.last_volume),
+            volume_avg20=np.float64(self.volumes_20.mean()),
+            high14=np.float64(self.highs_14.extreme(index)),
+            low14=np.float64(self.lows_14.extreme(index)),
+        )
+
+    def preview(self, high: float, low: float, close: float, volume: float) -> TechnicalSnapshot:
+        ema_fast, ema_slow, signal, gain, loss = self._step(close)
+        index = self.bars
+        return TechnicalSnapshot(
+            close=np.float64(close),
+            sma50=np.float64(self.closes_50.mean(close)),
+            sma200=np.float64(self.closes_200.mean(close)),
+            rsi14=np.float64(_rsi(self.gains_14.mean(gain), self.losses_14.mean(loss))),
+            macd=np.float64(ema_fast - ema_slow),
+            macd_signal=np.float64(signal),
+            volume=np.float64(volume),
+            volume_avg20=np.float64(self.volumes_20.mean(volume)),
+            high14=np.float64(self.highs_14.extreme(index, high)),
+            low14=np.float64(self.lows_14.extreme(index, low)),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": STATE_VERSION,
+            "ticker": self.ticker,
+            "bars": self.bars,
+            "lastTimestamp": self.last_timestamp,
+            "lastClose": self.last_close,
+            "lastVolume": self.last_volume,
+            "emaFast": self.ema_fast,
+            "emaSlow": self.ema_slow,
+            "signal": self.signal,
+            "closes200": list(self.closes_200.values),
+            "gains14": list(self.gains_14.values),
+            "losses14": list(self.losses_14.values),
+            "volumes20": list(self.volumes_20.values),
+            "highs14": [list(item) for item in self.highs_14.items],
+            "lows14": [list(item) for item in self.lows_14.items],
+        }
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> "IndicatorState":
+        if payload.get("version") != STATE_VERSION:
+            raise ValueError(f"Unsupported indicator state version: {payload.get('version')}")
+        state = cls(payload["ticker"])
+        state.bars = int(payload["bars"])
+        state.last_timestamp = payload["lastTimestamp"]
+        state.last_close = payload["lastClose"]
+        state.last_volume = payload["lastVolume"]
+        state.ema_fast = payload["emaFast"]
+        state.ema_slow = payload["emaSlow"]
+        state.signal = payload["signal"]
+        closes = payload["closes200"]
+        state.closes_200 = RollingWindow(200, closes)
+        state.closes_50 = RollingWindow(50, closes[-50:])
+        state.gains_14 = RollingWindow(14, payload["gains14"])
+        state.losses_14 = RollingWindow(14, payload["losses14"])
+        state.volumes_20 = RollingWindow(20, payload["volumes20"])
+        state.highs_14 = MonotonicWindow(14, keep_max=True, items=payload["highs14"])
+        state.lows_14 = MonotonicWindow(14, keep_max=False, items=payload["lows14"])
+        return state
+
+
+def _bar_timestamps(hist: pd.DataFrame) -> np.ndarray:
+    return np.asarray([int(ts.timestamp()) for ts in hist.index], dtype=np.int64)
+
+
+class IndicatorStateStore:
+    """Per-ticker `IndicatorState`s kept in memory and persisted as JSON across restarts."""
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self._states: Dict[str, IndicatorState] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, ticker: str) -> str:
+        return os.path.join(self.root, f"{ticker}.json")
+
+    def _load(self, ticker: str) -> Optional[IndicatorState]:
+        try:
+            with open(self._path(ticker), "r", encoding="utf-8") as handle:
+                return IndicatorState.from_dict(json.load(handle))
+        except FileNotFoundError:
+            return None
+        except Exception as exc:
+            log_event(
+                "warning",
+                "indicator_state.load_failed",
+                ticker=ticker,
+                errorType=type(exc).__name__,
+                errorMessage=str(exc),
+            )
+            return None
+
+    def _save(self, state: IndicatorState) -> None:
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            atomic_write_json(self._path(state.ticker), state.to_dict())
+        except Exception as exc:
+            log_event(
+                "warning",
+                "indicator_state.save_failed",
+                ticker=state.ticker,
+                errorType=type(exc).__name__,
+                errorMessage=str(exc),
+            )
+
+    def technicals(self, ticker: str, hist: pd.DataFrame) -> TechnicalSnapshot:
+        """Latest technicals for daily `hist`, treating its final bar as still in progress.
+
+        Completed bars newer than the stored state are appended; the final bar is only
+        previewed, so intraday revisions of today's bar never corrupt the state. If the
+        stored state no longer lines up with `hist` (new listing window, split or dividend
+        adjustment) it is rebuilt from the last `WARMUP_BARS` completed bars of `hist`.
+
+        Loads and saves are blocking file I/O; async callers run this in a worker thread.
+        """
+        ticker = ticker.upper()
+        timestamps = _bar_timestamps(hist)
+        close = hist["Close"].to_numpy(dtype=np.float64)
+        high = hist["High"].to_numpy(dtype=np.float64)
+        low = hist["Low"].to_numpy(dtype=np.float64)
+        volume = hist["Volume"].to_numpy(dtype=np.float64)
+        completed = len(hist) - 1
+
+        with self._lock:
+            state = self._states.get(ticker) or self._load(ticker)
+            start = self._replay_start(state, timestamps, close)
+            if start is None:
+                state = IndicatorState(ticker)
+                start = max(0, completed - WARMUP_BARS)
+            for position in range(start, completed):
+                state.append(int(timestamps[position]), high[position], low[position], close[position], volume[position])
+            self._states[ticker] = state
+            appended = completed - start
+
+        if appended > 0:
+            self._save(state)
+        return state.preview(high[-1], low[-1], close[-1], volume[-1])
+
+    @staticmethod
+    def _replay_start(state: Optional[IndicatorState], timestamps: np.ndarray, close: np.ndarray) -> Optional[int]:
+        if state is None or state.last_timestamp is None:
+            return None
+        position = int(np.searchsorted(timestamps, state.last_timestamp))
+        if position >= len(timestamps) - 1 or timestamps[position] != state.last_timestamp:
+            return None
+        if not math.isclose(close[position], state.last_close, rel_tol=_REPLAY_TOLERANCE):
+            return None
+        # The state must also cover the warm-up window that `hist` implies.
+        if state.bars < min(position + 1, WARMUP_BARS):
+            return None
+        return position + 1
+
+
+indicator_states = IndicatorStateStore(INDICATOR_STATE_DIR)
@@ -0,0 +1,172 @@
+"""NumPy implementations of the technical indicators used by the analysis pipeline.
+
+Every function accepts a 1-D series or a 2-D batch shaped (tickers, bars) and works
+along the last axis, so a whole watchlist aligned on the same dates is computed in one
+pass. Outputs match the pandas formulas the pipeline used before (rolling means,
+`ewm(span, adjust=False)`, 14-bar high/low windows), including NaN for warm-up bars.
+Inputs are expected to be finite; NaN bars propagate instead of being skipped.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# Block length for the EMA recurrence. Bounds the growth of the (1 - alpha)^-k weights
+# so the blocked prefix-sum stays well inside float64 precision for any span we use.
+_EMA_BLOCK = 128
+
+
+def _as_float_array(values) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64)
+
+
+def _nan_prefix(shape, count: int) -> np.ndarray:
+    return np.full(shape[:-1] + (count,), np.nan)
+
+
+def sma(values, window: int) -> np.ndarray:
+    """Simple moving average; equivalent to `Series.rolling(window).mean()`."""
+    data = _as_float_array(values)
+    length = data.shape[-1]
+    if length < window:
+        return np.full(data.shape, np.nan)
+    sums = sliding_window_view(data, window, axis=-1).sum(axis=-1)
+    return np.concatenate([_nan_prefix(data.shape, window - 1), sums / window], axis=-1)
+
+
+def rolling_max(values, window: int) -> np.ndarray:
+    data = _as_float_array(values)
+    if data.shape[-1] < window:
+        return np.full(data.shape, np.nan)
+    peaks = sliding_window_view(data, window, axis=-1).max(axis=-1)
+    return np.concatenate([_nan_prefix(data.shape, window - 1), peaks], axis=-1)
+
+
+def rolling_min(values, window: int) -> np.ndarray:
+    data = _as_float_array(values)
+    if data.shape[-1] < window:
+        return np.full(data.shape, np.nan)
+    troughs = sliding_window_view(data, window, axis=-1).min(axis=-1)
+    return np.concatenate([_nan_prefix(data.shape, window - 1), troughs], axis=-1)
+
+
+def ema(values, span: int) -> np.ndarray:
+    """Exponential moving average; equivalent to `Series.ewm(span=span, adjust=False).mean()`.
+
+    The recurrence y[t] = d * y[t-1] + alpha * x[t] is unrolled per block as
+    y[s+j] = d^(j+1) * (y[s-1] + alpha * sum_i d^-(i+1) * x[s+i]), which turns each
+    block into a single cumulative sum.
+    """
+    data = _as_float_array(values)
+    out = np.empty_like(data)
+    length = data.shape[-1]
+    if length == 0:
+        return out
+
+    alpha = 2.0 / (span + 1.0)
+    decay = 1.0 - alpha
+    out[..., 0] = data[..., 0]
+    carry = data[..., 0]
+
+    steps = np.arange(1, _EMA_BLOCK + 1, dtype=np.float64)
+    growth = decay ** -steps
+    shrink = decay ** steps
+
+    for start in range(1, length, _EMA_BLOCK):
+        stop = min(start + _EMA_BLOCK, length)
+        size = stop - start
+        block = data[..., start:stop]
+        weighted = np.cumsum(block * growth[:size], axis=-1)
+        values_block = shrink[:size] * (carry[..., None] + alpha * weighted)
+        out[..., start:stop] = values_block
+        carry = values_block[..., -1]
+    return out
+
+
+def rsi(close, period: int = 14) -> np.ndarray:
+    """Simple-average RSI matching the pipeline's `rolling(period).mean()` of gains and losses.
+
+    As in the pandas version, the undefined first diff counts as a zero move.
+    """
+    data = _as_float_array(close)
+    delta = np.diff(data, axis=-1, prepend=data[..., :1])
+    gains = np.where(delta > 0, delta, 0.0)
+    losses = np.where(delta < 0, -delta, 0.0)
+    avg_gain = sma(gains, period)
+    avg_loss = sma(losses, period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+def macd(close, fast: int = 12, slow: int = 26, signal: int = 9):
+    """Returns (macd_line, signal_line)."""
+    line = ema(close, fast) - ema(close, slow)
+    return line, ema(line, signal)
+
+
+def williams_r(high, low, close, period: int = 14) -> np.ndarray:
+    """Williams %R over `period` bars; NaN where the window has no range."""
+    highest = rolling_max(high, period)
+    lowest = rolling_min(low, period)
+    span = highest - lowest
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = ((highest - _as_float_array(close)) / span) * -100
+    return np.where(span != 0, values, np.nan)
+
+
+@dataclass(frozen=True)
+class TechnicalSnapshot:
+    """Latest-bar indicator values; scalars for a single series, arrays for a batch."""
+
+    close: np.ndarray
+    sma50: np.ndarray
+    sma200: np.ndarray
+    rsi14: np.ndarray
+    macd: np.ndarray
+    macd_signal: np.ndarray
+    volume: np.ndarray
+    volume_avg20: np.ndarray
+    high14: np.ndarray
+    low14: np.ndarray
+
+    def williams_r(self, price: Optional[np.ndarray] = None) -> np.ndarray:
+        """Williams %R of `price` (defaults to the last close) against the 14-bar range."""
+        reference = self.close if price is None else _as_float_array(price)
+        span = self.high14 - self.low14
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = ((self.high14 - reference) / span) * -100
+        return np.where(span != 0, values, np.nan)
+
+
+def latest_technicals(close, high, low, volume) -> TechnicalSnapshot:
+    """Computes the pipeline's technical inputs for the last bar of one or many series."""
+    close = _as_float_array(close)
+    high = _as_float_array(high)
+    low = _as_float_array(low)
+    volume = _as_float_array(volume)
+    macd_line, signal_line = macd(close)
+
+    def last(values: np.ndarray) -> np.ndarray:
+        return values[..., -1]
+
+    def last_window(values: np.ndarray, window: int, reducer) -> np.ndarray:
+        if values.shape[-1] < window:
+            return np.full(values.shape[:-1], np.nan)
+        return reducer(values[..., -window:], axis=-1)
+
+    return TechnicalSnapshot(
+        close=last(close),
+        sma50=last_window(close, 50, np.mean),
+        sma200=last_window(close, 200, np.mean),
+        # Only the last 14 deltas feed the final RSI value.
+        rsi14=last(rsi(close[..., -15:], 14)),
+        macd=last(macd_line),
+        macd_signal=last(signal_line),
+        volume=last(volume),
+        volume_avg20=last_window(volume, 20, np.mean),
+        high14=last_window(high, 14, np.max),
+        low14=last_window(low, 14, np.min),
+    )
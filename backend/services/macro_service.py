@@ -0,0 +1,104 @@
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Tuple
+
+import pandas as pd
+import yfinance as yf
+
+from core.budget import record_provider_call
+from core.config import settings
+from core.logger import log_event
+from services.cache_store import swr_cache
+
+
+MACRO_CACHE_KEY = "macro:snapshot"
+DEFAULT_VIX_LEVEL = 15.0
+# 13-week T-bill yield tracks the fed funds target closely enough to read its direction.
+RATE_PROXY_SYMBOL = "^IRX"
+RATE_TREND_THRESHOLD_PCT = 0.15
+
+
+@dataclass(frozen=True)
+class MacroSnapshot:
+    vix_level: float
+    federal_funds_rate_trend: str
+    us_gdp_expectation_pct: float
+    sources: Dict[str, str]
+    fetched_at: float = field(default_factory=time.time)
+
+    def to_payload(self) -> Dict[str, Any]:
+        """Fields merged into the Macro_and_Risk segment of an analysis."""
+        return {
+            "VIX_Level": self.vix_level,
+            "Federal_Funds_Rate_Trend": self.federal_funds_rate_trend,
+            "US_GDP_Expectation_pct": self.us_gdp_expectation_pct,
+        }
+
+    def staleness(self, cache_meta: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "asOf": datetime.fromtimestamp(self.fetched_at, tz=timezone.utc).isoformat(),
+            "ageSeconds": round(max(0.0, time.time() - self.fetched_at), 1),
+            "stale": bool(cache_meta.get("stale")),
+            "sources": dict(self.sources),
+        }
+
+
+def _fetch_vix_level() -> Tuple[float, str]:
+    try:
+        vix_hist = yf.Ticker("^VIX").history(period="5d")
+        if not vix_hist.empty:
+            return round(float(vix_hist["Close"].iloc[-1]), 2), "yfinance"
+    except Exception as exc:
+        log_event("warning", "macro.vix_fetch_failed", errorType=type(exc).__name__, errorMessage=str(exc))
+    return DEFAULT_VIX_LEVEL, "fallback"
+
+
+def fetch_vix_history(start: datetime, end: datetime) -> pd.Series:
+    """Daily VIX closes between `start` and `end` (exclusive); empty when the provider fails."""
+    record_provider_call("yfinance.macro_history")
+    try:
+        vix_hist = yf.Ticker("^VIX").history(start=start, end=end, interval="1d")
+        if not vix_hist.empty:
+            return vix_hist["Close"]
+    except Exception as exc:
+        log_event("warning", "macro.vix_history_fetch_failed", errorType=type(exc).__name__, errorMessage=str(exc))
+    return pd.Series(dtype="float64")
+
+
+def _fetch_rate_trend() -> Tuple[str, str]:
+    try:
+        rate_hist = yf.Ticker(RATE_PROXY_SYMBOL).history(period="1mo")
+        if len(rate_hist) >= 2:
+            change = float(rate_hist["Close"].iloc[-1]) - float(rate_hist["Close"].iloc[0])
+            if change >= RATE_TREND_THRESHOLD_PCT:
+                return "Rising", "yfinance"
+            if change <= -RATE_TREND_THRESHOLD_PCT:
+                return "Falling", "yfinance"
+            return "Stable", "yfinance"
+    except Exception as exc:
+        log_event("warning", "macro.rate_fetch_failed", errorType=type(exc).__name__, errorMessage=str(exc))
+    return "Stable", "fallback"
+
+
+def _fetch_macro_snapshot() -> MacroSnapshot:
+    record_provider_call("yfinance.macro")
+    vix_level, vix_source = _fetch_vix_level()
+    rate_trend, rate_source = _fetch_rate_trend()
+    return MacroSnapshot(
+        vix_level=vix_level,
+        federal_funds_rate_trend=rate_trend,
+        us_gdp_expectation_pct=settings.macro_gdp_expectation_pct,
+        sources={"VIX_Level": vix_source, "Federal_Funds_Rate_Trend": rate_source, "US_GDP_Expectation_pct": "config"},
+    )
+
+
+def get_macro_snapshot() -> Tuple[MacroSnapshot, Dict[str, Any]]:
+    """Returns the process-wide macro snapshot; concurrent analyses share one fetch per TTL window."""
+    return swr_cache.get_or_fetch(
+        MACRO_CACHE_KEY,
+        _fetch_macro_snapshot,
+        ttl_seconds=settings.cache_ttl_seconds_macro,
+        swr_seconds=settings.cache_swr_seconds_macro,
+        wait_timeout_seconds=settings.request_timeout_seconds,
+    )
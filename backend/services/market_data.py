@@ -0,0 +1,143 @@
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+import yfinance as yf
+
+from core.budget import record_provider_call
+from core.config import settings
+from core.logger import log_event
+from services.cache_store import swr_cache
+from services.chart_series import slice_period
+from services.fundamentals_store import fundamentals_store, priced_info
+from services.ohlcv_store import in_session, ohlcv_store
+
+
+# Snapshots carry the trailing year of daily bars.
+SNAPSHOT_HISTORY_DAYS = 365
+
+# Daily chart periods that fit inside the snapshot history window.
+_SNAPSHOT_PERIODS = frozenset({"5d", "ytd", "1mo", "3mo", "6mo", "1y"})
+
+# Fields kept from the provider's lightweight `fast_info` quote.
+_QUOTE_FIELDS = ("lastPrice", "previousClose")
+
+
+@dataclass(frozen=True)
+class MarketDataSnapshot:
+    """One provider round-trip worth of data for a ticker.
+
+    Snapshots are shared between callers, so consumers must treat `info`,
+    `fast_info` and `history` as read-only.
+    """
+
+    ticker: str
+    info: Dict[str, Any]
+    fast_info: Dict[str, Any]
+    history: pd.DataFrame
+    fetched_at: float = field(default_factory=time.time)
+
+    def history_for_period(self, period: str) -> Optional[pd.DataFrame]:
+        """Slice the daily history to a yfinance-style period, or None if it does not fit."""
+        if period not in _SNAPSHOT_PERIODS:
+            return None
+        return slice_period(self.history, period)
+
+
+def _fetch_quote(ticker: str) -> Dict[str, Any]:
+    """Live last price and previous close while a session is open; {} otherwise or on failure.
+
+    Daily bars are only refreshed every few minutes during a session, so the quote keeps
+    the snapshot price live. Outside a session the last stored bar already is the last price.
+    """
+    if not in_session(time.time()):
+        return {}
+    record_provider_call("yfinance.fast_info")
+    try:
+        quote = yf.Ticker(ticker).fast_info
+        values = {name: quote[name] for name in _QUOTE_FIELDS}
+    except Exception as exc:
+        log_event("warning", "market_data.quote_failed", ticker=ticker, errorType=type(exc).__name__, errorMessage=str(exc))
+        return {}
+    return {
+        name: float(value)
+        for name, value in values.items()
+        if isinstance(value, (int, float)) and math.isfinite(value) and value > 0
+    }
+
+
+def _snapshot_info(fundamentals: Dict[str, Any], hist: pd.DataFrame, fast_info: Dict[str, Any]) -> Dict[str, Any]:
+    """Stored fundamentals priced at the live quote, or the latest daily bar without one."""
+    closes = hist["Close"].dropna() if hist is not None and not hist.empty else pd.Series(dtype=float)
+    price = fast_info.get("lastPrice") or (float(closes.iloc[-1]) if len(closes) > 0 else None)
+    previous_close = fast_info.get("previousClose") or (float(closes.iloc[-2]) if len(closes) > 1 else None)
+    return priced_info(fundamentals, price, previous_close)
+
+
+def _snapshot_start() -> date:
+    return date.today() - timedelta(days=SNAPSHOT_HISTORY_DAYS)
+
+
+def _fetch_snapshot(ticker: str) -> MarketDataSnapshot:
+    fundamentals = fundamentals_store.get_or_fetch(ticker)
+    hist = ohlcv_store.daily(ticker, _snapshot_start())
+    fast_info = _fetch_quote(ticker)
+    return MarketDataSnapshot(
+        ticker=ticker, info=_snapshot_info(fundamentals, hist, fast_info), fast_info=fast_info, history=hist
+    )
+
+
+def prime_market_snapshots(tickers: List[str]) -> Dict[str, MarketDataSnapshot]:
+    """Builds snapshots for many tickers with at most one bulk history download and seeds the cache.
+
+    Fundamentals come from the local store; only tickers it does not hold yet go out to
+    `.info`, concurrently on a bounded pool. Live quotes are fetched on the same bound.
+    """
+    symbols = sorted({ticker.upper() for ticker in tickers if ticker})
+    if not symbols:
+        return {}
+
+    histories = ohlcv_store.daily_many(symbols, _snapshot_start())
+
+    # One store write for every ticker fetched live, rather than one table rewrite per miss.
+    fundamentals = fundamentals_store.get_or_fetch_many(symbols, max_workers=settings.analysis_fetch_workers)
+    with ThreadPoolExecutor(max_workers=max(1, settings.analysis_fetch_workers)) as pool:
+        quotes = dict(zip(symbols, pool.map(_fetch_quote, symbols)))
+
+    snapshots = {}
+    for symbol in symbols:
+        hist = histories.get(symbol)
+        if fundamentals[symbol] is None or hist is None or hist.empty:
+            # Leave the ticker to the regular per-ticker fetch (and its retries) rather than
+            # caching a snapshot without fundamentals or history for the whole TTL.
+            continue
+        snapshot = MarketDataSnapshot(
+            ticker=symbol,
+            info=_snapshot_info(fundamentals[symbol], hist, quotes[symbol]),
+            fast_info=quotes[symbol],
+            history=hist,
+        )
+        swr_cache.set(
+            f"snapshot:{symbol}",
+            snapshot,
+            ttl_seconds=settings.cache_ttl_seconds_snapshot,
+            swr_seconds=settings.cache_swr_seconds_snapshot,
+        )
+        snapshots[symbol] = snapshot
+    return snapshots
+
+
+def get_market_snapshot(ticker: str) -> Tuple[MarketDataSnapshot, Dict[str, Any]]:
+    """Returns the shared snapshot for a ticker, fetching at most once per TTL window."""
+    symbol = ticker.upper()
+    return swr_cache.get_or_fetch(
+        f"snapshot:{symbol}",
+        lambda: _fetch_snapshot(symbol),
+        ttl_seconds=settings.cache_ttl_seconds_snapshot,
+        swr_seconds=settings.cache_swr_seconds_snapshot,
+        wait_timeout_seconds=settings.request_timeout_seconds,
+    )
@@ -1,21 +1,19 @@
-import json
-import os
 import time
-from typing import Any, Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import httpx
 import pandas as pd
 import yfinance as yf
 
-from analysis_engine import get_historical_data
+from analysis_engine import chart_points, score_history
 from core.budget import record_provider_call
 from core.config import settings
+from core.encoded_body import EncodedBody
 from core.errors import ApiError
-from core.logger import log_event
+from services import chart_encoding, chart_series
+from services.analysis_store import analysis_store
 from services.cache_store import swr_cache
-
-
-ANALYSIS_CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "cache")
+from services.market_data import get_market_snapshot
 
 
 def _safe_get(info: Dict[str, Any], key: str, default=None):
@@ -90,12 +88,11 @@ def search_tickers_cached(query: str) -> Tuple[List[Dict[str, Any]], Dict[str, A
         lambda: _fetch_search_results(query),
         ttl_seconds=settings.cache_ttl_seconds_search,
         swr_seconds=settings.cache_swr_seconds_search,
+        encoder=EncodedBody.from_json,
     )
 
 
-def _fetch_chart_data(ticker: str, period: str, interval: str):
-    record_provider_call("yfinance.chart")
-    result = get_historical_data(ticker, period, interval)
+def _normalize_chart_points(ticker: str, period: str, interval: str, result):
     if isinstance(result, dict) and "error" in result:
         raise ApiError(
             status_code=502,
@@ -141,58 +138,133 @@ def _fetch_chart_data(ticker: str, period: str, interval: str):
         )
 
     if not normalized:
+        raise _empty_chart_error(ticker, period, interval)
+
+    return normalized
+
+
+def _fetch_provider_chart_frame(ticker: str, period: str, interval: str) -> pd.DataFrame:
+    record_provider_call("yfinance.chart")
+    return yf.Ticker(ticker).history(period=period, interval=interval)
+
+
+def _chart_base_cached(
+    ticker: str, period: str, interval: str
+) -> Tuple[pd.DataFrame, Callable[[Optional[int]], pd.DataFrame], Dict[str, Any]]:
+    """The cached series behind a chart, a function deriving the chart's bars from it, and its cache metadata."""
+    try:
+        if chart_series.supports(period, interval):
+            # Only the canonical per-ticker series are cached; each chart is sliced from them.
+            base, cache_meta = chart_series.chart_base(ticker, period, interval)
+            return base, lambda since: chart_series.chart_frame(base, period, interval, since), cache_meta
+        base, cache_meta = swr_cache.get_or_fetch(
+            f"chart:{ticker.upper()}:{period}:{interval}",
+            lambda: _fetch_provider_chart_frame(ticker, period, interval),
+            ttl_seconds=settings.cache_ttl_seconds_chart,
+            swr_seconds=settings.cache_swr_seconds_chart,
+        )
+        return base, lambda since: chart_series.bars_since(base, since), cache_meta
+    except ApiError:
+        raise
+    except Exception as exc:
         raise ApiError(
             status_code=502,
-            code="CHART_EMPTY_AFTER_SANITIZE",
-            message="Chart provider returned unusable data",
-            details={"provider": "yfinance", "ticker": ticker.upper(), "period": period, "interval": interval},
+            code="CHART_PROVIDER_FAILED",
+            message="Chart data provider failed",
+            details={"provider": "yfinance", "reason": str(exc)},
         )
 
-    return normalized
 
+def _empty_chart_error(ticker: str, period: str, interval: str) -> ApiError:
+    return ApiError(
+        status_code=502,
+        code="CHART_EMPTY_AFTER_SANITIZE",
+        message="Chart provider returned unusable data",
+        details={"provider": "yfinance", "ticker": ticker.upper(), "period": period, "interval": interval},
+    )
+
+
+def _chart_points_payload(ticker: str, period: str, interval: str, hist: pd.DataFrame, cursor, since: Optional[int]):
+    points = chart_points(hist, interval)
+    if since is None:
+        return _normalize_chart_points(ticker, period, interval, points)
+    bars = _normalize_chart_points(ticker, period, interval, points) if points else []
+    return {"since": since, "cursor": cursor, "bars": bars}
+
+
+def _chart_encoded_payload(
+    ticker: str, period: str, interval: str, chart_format: str, hist: pd.DataFrame, cursor, since: Optional[int]
+):
+    columns = chart_encoding.chart_columns(hist, interval)
+    if since is None and not len(columns["close"]):
+        raise _empty_chart_error(ticker, period, interval)
+    if chart_format == "binary":
+        return chart_encoding.encode_binary(columns)
+    return {**chart_encoding.encode_columnar(columns), "cursor": cursor}
+
+
+def get_chart_body(
+    ticker: str, period: str, interval: str, chart_format: str, since: Optional[int] = None
+) -> Tuple[EncodedBody, Dict[str, Any]]:
+    """The chart response in any format as an immutable EncodedBody.
+
+    Full charts are encoded once per version of the series they come from and reused until it
+    changes; `since` deltas are small and encoded per request.
+    """
+    _, derive, cache_meta = _chart_base_cached(ticker, period, interval)
+    body_key = f"chart-body:{ticker.upper()}:{period}:{interval}:{chart_format}"
+    version = cache_meta.get("version")
+    if since is None and version is not None:
+        memo = swr_cache.peek(body_key)
+        if memo is not None and memo[0] == version:
+            return memo[2], {**cache_meta, "cursor": memo[1]}
+
+    hist = derive(since)
+    cursor = chart_series.chart_cursor(hist, since)
+    if chart_format == "points":
+        body = EncodedBody.from_json(_chart_points_payload(ticker, period, interval, hist, cursor, since))
+    else:
+        payload = _chart_encoded_payload(ticker, period, interval, chart_format, hist, cursor, since)
+        if chart_format == "binary":
+            body = EncodedBody.from_bytes(payload, chart_encoding.BINARY_MEDIA_TYPE)
+        else:
+            body = EncodedBody.from_json(payload)
+    if since is None and version is not None:
+        swr_cache.set(
+            body_key,
+            (version, cursor, body),
+            ttl_seconds=settings.cache_ttl_seconds_chart,
+            swr_seconds=settings.cache_swr_seconds_chart,
+        )
+    return body, {**cache_meta, "cursor": cursor}
 
-def get_chart_cached(ticker: str, period: str, interval: str):
-    key = f"chart:{ticker.upper()}:{period}:{interval}"
+
+def get_score_history_cached(ticker: str, start: Optional[str], end: Optional[str]):
+    key = f"score-history:{ticker.upper()}:{start or ''}:{end or ''}"
     return swr_cache.get_or_fetch(
         key,
-        lambda: _fetch_chart_data(ticker, period, interval),
-        ttl_seconds=settings.cache_ttl_seconds_chart,
-        swr_seconds=settings.cache_swr_seconds_chart,
+        lambda: score_history(ticker, start, end),
+        ttl_seconds=settings.cache_ttl_seconds_score_history,
+        swr_seconds=settings.cache_swr_seconds_score_history,
+        wait_timeout_seconds=settings.request_timeout_seconds,
     )
 
 
 def _read_cached_analysis_score(ticker: str) -> Tuple[Any, Any]:
-    cache_file = os.path.join(ANALYSIS_CACHE_DIR, f"{ticker.upper()}.json")
-    if not os.path.exists(cache_file):
-        return None, None
-
-    try:
-        with open(cache_file, "r", encoding="utf-8") as handle:
-            data = json.load(handle)
-        return data.get("score"), data.get("recommendation")
-    except Exception as exc:
-        log_event(
-            "warning",
-            "quick_stats.cache_read_failed",
-            ticker=ticker.upper(),
-            errorType=type(exc).__name__,
-            errorMessage=str(exc),
-        )
+    summary = analysis_store.summary(ticker)
+    if not summary:
         return None, None
+    return summary.get("score"), summary.get("recommendation")
 
 
 def _fetch_quick_stats(ticker: str) -> Dict[str, Any]:
     last_error: Exception = None
     for attempt in range(3):
         try:
-            record_provider_call("yfinance.quick_stats")
-            stock = yf.Ticker(ticker)
-            info = stock.info
-            try:
-                fast_info = dict(getattr(stock, "fast_info", {}) or {})
-            except Exception:
-                fast_info = {}
-            hist = stock.history(period="1mo")
+            snapshot, _ = get_market_snapshot(ticker)
+            info = snapshot.info
+            fast_info = snapshot.fast_info
+            hist = snapshot.history_for_period("1mo")
 
             if hist is None or hist.empty:
                 raise ApiError(
@@ -264,6 +336,7 @@ def _fetch_quick_stats(ticker: str) -> Dict[str, Any]:
                     "historyPoints": int(len(hist)),
                     "missingCriticals": missing_criticals,
                     "provider": "yfinance",
+                    "fundamentalsAsOf": info.get("fundamentalsAsOf"),
                 },
                 "chartData": [
                     {
@@ -0,0 +1,336 @@
+import io
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from core.budget import record_provider_call
+from core.config import settings
+from core.logger import log_event
+from services.analysis_store import ANALYSIS_CACHE_DIR
+from services.storage import atomic_write_bytes
+
+
+STORE_VERSION = 1
+OHLCV_DIR = os.path.join(ANALYSIS_CACHE_DIR, "ohlcv")
+OHLCV_COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+EXCHANGE_TZ = "America/New_York"
+SESSION_OPEN = (9, 30)
+SESSION_CLOSE = (16, 0)
+# Yahoo keeps revising the day's bar for a while after the bell.
+SETTLE_AFTER_CLOSE = timedelta(minutes=30)
+# A stored bar that moved by more than this was re-adjusted (split/dividend); the series is refetched.
+_ADJUSTMENT_TOLERANCE = 1e-6
+
+DateLike = Union[str, date, datetime, pd.Timestamp]
+
+
+def _day(value: DateLike) -> str:
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+def _session_close(day: pd.Timestamp) -> pd.Timestamp:
+    return day.normalize() + pd.Timedelta(hours=SESSION_CLOSE[0], minutes=SESSION_CLOSE[1])
+
+
+def _session_open(day: pd.Timestamp) -> pd.Timestamp:
+    return day.normalize() + pd.Timedelta(hours=SESSION_OPEN[0], minutes=SESSION_OPEN[1])
+
+
+def in_session(now: float) -> bool:
+    now_et = pd.Timestamp(now, unit="s", tz="UTC").tz_convert(EXCHANGE_TZ)
+    if now_et.weekday() >= 5:
+        return False
+    return _session_open(now_et) <= now_et < _session_close(now_et)
+
+
+def last_session_close(now: float) -> pd.Timestamp:
+    """Close of the most recent weekday session that has ended (exchange holidays are not modelled)."""
+    now_et = pd.Timestamp(now, unit="s", tz="UTC").tz_convert(EXCHANGE_TZ)
+    close = _session_close(now_et)
+    while close > now_et or close.weekday() >= 5:
+        close -= pd.Timedelta(days=1)
+    return close
+
+
+def is_settled(fetched_at: float, now: float) -> bool:
+    """True if no bar newer or more final than what was fetched at `fetched_at` can exist yet."""
+    if in_session(now):
+        return False
+    return fetched_at >= (last_session_close(now) + SETTLE_AFTER_CLOSE).timestamp()
+
+
+def is_recent_in_session(fetched_at: float, now: float, refresh_seconds: float) -> bool:
+    """True during a session if the bars were fetched in that session less than `refresh_seconds` ago."""
+    if not in_session(now):
+        return False
+    opened = _session_open(pd.Timestamp(now, unit="s", tz="UTC").tz_convert(EXCHANGE_TZ)).timestamp()
+    return fetched_at >= opened and now - fetched_at < refresh_seconds
+
+
+def split_bulk_frame(frame: pd.DataFrame, symbol: str) -> pd.DataFrame:
+    if frame is None or frame.empty:
+        return pd.DataFrame()
+    if isinstance(frame.columns, pd.MultiIndex):
+        if symbol not in frame.columns.get_level_values(0):
+            return pd.DataFrame()
+        frame = frame[symbol]
+    return frame.dropna(how="all")
+
+
+def ohlcv_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    if frame is None or frame.empty:
+        return pd.DataFrame(columns=list(OHLCV_COLUMNS))
+    frame = frame[[column for column in OHLCV_COLUMNS if column in frame.columns]].dropna(subset=["Close"])
+    return frame.rename_axis("Date")
+
+
+@dataclass
+class OhlcvSeries:
+    """Stored daily bars for one ticker.
+
+    `covered_from` is the earliest start date already requested from the provider, so a
+    listing younger than a requested window is not refetched on every read.
+    """
+
+    frame: pd.DataFrame
+    fetched_at: float
+    covered_from: str
+
+    def to_bytes(self) -> bytes:
+        index = self.frame.index
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            version=np.asarray(STORE_VERSION),
+            timestamps=np.asarray((index - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1), dtype=np.int64),
+            tz=np.asarray(str(index.tz) if getattr(index, "tz", None) else EXCHANGE_TZ),
+            fetched_at=np.asarray(self.fetched_at),
+            covered_from=np.asarray(self.covered_from),
+            **{column.lower(): self.frame[column].to_numpy(dtype=np.float64) for column in OHLCV_COLUMNS},
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "OhlcvSeries":
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            if int(arrays["version"]) != STORE_VERSION:
+                raise ValueError(f"Unsupported OHLCV store version: {int(arrays['version'])}")
+            index = pd.to_datetime(arrays["timestamps"] * 1_000_000_000, utc=True).tz_convert(str(arrays["tz"]))
+            frame = pd.DataFrame({column: arrays[column.lower()] for column in OHLCV_COLUMNS}, index=index)
+            frame.index.name = "Date"
+            return cls(frame=frame, fetched_at=float(arrays["fetched_at"]), covered_from=str(arrays["covered_from"]))
+
+
+def merge_delta(stored: pd.DataFrame, delta: pd.DataFrame) -> Optional[pd.DataFrame]:
+    """Stored bars with `delta` laid over their tail, or None if the overlap no longer matches.
+
+    Deltas start at the second-to-last stored bar, which is always final: if the provider
+    now reports a different close for it, history was re-adjusted and must be refetched.
+    """
+    if delta.empty:
+        return stored
+    if stored.empty:
+        return delta
+    anchor = stored.index[-2] if len(stored) > 1 else stored.index[-1]
+    if anchor in delta.index and not math.isclose(
+        float(delta.at[anchor, "Close"]), float(stored.at[anchor, "Close"]), rel_tol=_ADJUSTMENT_TOLERANCE
+    ):
+        return None
+    return pd.concat([stored[stored.index < delta.index[0]], delta])
+
+
+def _bars_from(series: Optional[OhlcvSeries], start_day: str) -> pd.DataFrame:
+    if series is None or series.frame.empty:
+        return ohlcv_frame(None)
+    frame = series.frame
+    return frame[frame.index >= pd.Timestamp(start_day).tz_localize(frame.index.tz)]
+
+
+class OhlcvStore:
+    """Per-ticker daily OHLCV bars persisted as compressed NumPy archives.
+
+    The first read for a ticker downloads the requested window, or at least the last
+    `backfill_days`, so snapshots, charts and score history share one download. Later
+    reads only ask the provider for bars from the last final stored bar onwards, and not
+    at all while the stored series is settled (no session open and the last close already
+    fetched). During a session, a delta is requested at most once per `session_refresh_seconds`.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        backfill_days: int,
+        clock: Callable[[], float] = time.time,
+        session_refresh_seconds: float = 0.0,
+    ) -> None:
+        self.root = root
+        self.backfill_days = backfill_days
+        self.session_refresh_seconds = session_refresh_seconds
+        self.clock = clock
+        self._series: Dict[str, OhlcvSeries] = {}
+        self._locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._locks_guard = threading.Lock()
+        self._counters = {"hits": 0, "deltas": 0, "backfills": 0, "rebuilds": 0}
+
+    def _path(self, ticker: str) -> str:
+        return os.path.join(self.root, f"{ticker}.npz")
+
+    def _lock_for(self, ticker: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks[ticker]
+
+    def _load(self, ticker: str) -> Optional[OhlcvSeries]:
+        try:
+            with open(self._path(ticker), "rb") as handle:
+                return OhlcvSeries.from_bytes(handle.read())
+        except FileNotFoundError:
+            return None
+        except Exception as exc:
+            log_event(
+                "warning",
+                "ohlcv_store.load_failed",
+                ticker=ticker,
+                errorType=type(exc).__name__,
+                errorMessage=str(exc),
+            )
+            return None
+
+    def _save(self, ticker: str, series: OhlcvSeries) -> None:
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            atomic_write_bytes(self._path(ticker), series.to_bytes())
+        except Exception as exc:
+            log_event(
+                "warning",
+                "ohlcv_store.save_failed",
+                ticker=ticker,
+                errorType=type(exc).__name__,
+                errorMessage=str(exc),
+            )
+
+    def _stored(self, ticker: str) -> Optional[OhlcvSeries]:
+        series = self._series.get(ticker)
+        if series is None:
+            series = self._load(ticker)
+            if series is not None:
+                self._series[ticker] = series
+        return series
+
+    def backfill_start(self, now: Optional[float] = None, days: Optional[int] = None) -> str:
+        """Start date of the minimum window a first read downloads (or of `days` back, if longer)."""
+        days = max(self.backfill_days, days or 0)
+        return _day(pd.Timestamp(self.clock() if now is None else now, unit="s") - pd.Timedelta(days=days))
+
+    def _plan(self, series: Optional[OhlcvSeries], start_day: str, now: float) -> Optional[str]:
+        """The start date to request from the provider, or None if the stored bars suffice."""
+        if series is None or series.frame.empty or start_day < series.covered_from:
+            return min(start_day, self.backfill_start(now), *([series.covered_from] if series is not None else []))
+        if is_settled(series.fetched_at, now):
+            return None
+        if is_recent_in_session(series.fetched_at, now, self.session_refresh_seconds):
+            return None
+        return _day(series.frame.index[-2] if len(series.frame) > 1 else series.frame.index[-1])
+
+    def _apply(self, ticker: str, series: Optional[OhlcvSeries], fetch_start: str, fetched: pd.DataFrame, now: float) -> Optional[OhlcvSeries]:
+        """Folds a provider response into the stored series; None if a full refetch is needed."""
+        fetched = ohlcv_frame(fetched)
+        backfill = series is None or series.frame.empty or fetch_start <= series.covered_from
+        if backfill:
+            if fetched.empty:
+                return series
+            self._counters["backfills"] += 1
+            updated = OhlcvSeries(frame=fetched, fetched_at=now, covered_from=fetch_start)
+        else:
+            merged = merge_delta(series.frame, fetched)
+            if merged is None:
+                self._counters["rebuilds"] += 1
+                log_event("info", "ohlcv_store.history_readjusted", ticker=ticker, coveredFrom=series.covered_from)
+                return None
+            self._counters["deltas"] += 1
+            updated = OhlcvSeries(frame=merged, fetched_at=now, covered_from=series.covered_from)
+        self._series[ticker] = updated
+        self._save(ticker, updated)
+        return updated
+
+    def _fetch(self, ticker: str, start_day: str) -> pd.DataFrame:
+        record_provider_call("yfinance.history")
+        return yf.Ticker(ticker).history(start=start_day, interval="1d")
+
+    def daily(self, ticker: str, start: DateLike) -> pd.DataFrame:
+        """Daily bars for `ticker` from `start` to the latest bar, fetching only what is missing."""
+        ticker = ticker.upper()
+        start_day = _day(start)
+        with self._lock_for(ticker):
+            now = self.clock()
+            series = self._stored(ticker)
+            fetch_start = self._plan(series, start_day, now)
+            if fetch_start is None:
+                self._counters["hits"] += 1
+            else:
+                updated = self._apply(ticker, series, fetch_start, self._fetch(ticker, fetch_start), now)
+                if updated is None:
+                    fetch_start = series.covered_from
+                    updated = self._apply(ticker, None, fetch_start, self._fetch(ticker, fetch_start), now)
+                series = updated
+        return _bars_from(series, start_day)
+
+    def daily_many(self, tickers: Iterable[str], start: DateLike) -> Dict[str, pd.DataFrame]:
+        """`daily` for many tickers, with every needed backfill or delta in one bulk download."""
+        symbols = sorted({ticker.upper() for ticker in tickers if ticker})
+        start_day = _day(start)
+        now = self.clock()
+        plans = {}
+        for symbol in symbols:
+            with self._lock_for(symbol):
+                fetch_start = self._plan(self._stored(symbol), start_day, now)
+            if fetch_start is not None:
+                plans[symbol] = fetch_start
+
+        fetched: Dict[str, pd.DataFrame] = {}
+        if plans:
+            record_provider_call("yfinance.history_bulk")
+            bulk = yf.download(
+                sorted(plans),
+                start=min(plans.values()),
+                interval="1d",
+                group_by="ticker",
+                auto_adjust=True,
+                actions=False,
+                ignore_tz=False,
+                progress=False,
+                threads=True,
+            )
+            for symbol, fetch_start in plans.items():
+                frame = split_bulk_frame(bulk, symbol)
+                if not frame.empty:
+                    frame = frame[frame.index >= pd.Timestamp(fetch_start).tz_localize(frame.index.tz)]
+                with self._lock_for(symbol):
+                    series = self._stored(symbol)
+                    updated = self._apply(symbol, series, fetch_start, frame, now)
+                    if updated is None and series is not None and not series.frame.empty:
+                        # Re-adjusted history: empty it so `daily` below refetches the covered window.
+                        self._series[symbol] = OhlcvSeries(frame=ohlcv_frame(None), fetched_at=0.0, covered_from=series.covered_from)
+                    else:
+                        # Served from the bulk download alone, even when it had no rows for the symbol.
+                        fetched[symbol] = _bars_from(updated, start_day)
+        return {symbol: fetched[symbol] if symbol in fetched else self.daily(symbol, start_day) for symbol in symbols}
+
+    def metrics(self) -> Dict[str, int]:
+        return {"tickers": len(self._series), **self._counters}
+
+
+ohlcv_store = OhlcvStore(
+    OHLCV_DIR,
+    backfill_days=settings.ohlcv_backfill_days,
+    session_refresh_seconds=settings.ohlcv_session_refresh_seconds,
+)
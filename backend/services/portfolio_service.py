@@ -9,7 +9,9 @@ from analysis_engine import chat_with_agent
 from core.budget import record_llm_call
 from core.errors import ApiError
 from core.genai_client import api_key, build_content, stream_content
+from core.llm_scheduler import LLMPriority, llm_priority
 from core.logger import log_event
+from core.prompt_format import compact_json, prompt_metrics
 
 
 class PortfolioItem(BaseModel):
@@ -104,13 +106,16 @@ def delete_portfolio_item(user_ref, item_id: str) -> Dict[str, Any]:
 async def chat_with_selected_agent(request: ChatAgentRequest) -> Dict[str, str]:
     try:
         record_llm_call("chat_agent")
-        text = await chat_with_agent(
-            request.ticker,
-            request.user_message,
-            request.target_agent,
-            request.context_score,
-        )
+        with llm_priority(LLMPriority.CHAT):
+            text = await chat_with_agent(
+                request.ticker,
+                request.user_message,
+                request.target_agent,
+                request.context_score,
+            )
         return {"response": text}
+    except ApiError:
+        raise
     except Exception as exc:
         raise ApiError(
             status_code=502,
@@ -177,10 +182,10 @@ Look at the injected User_Profile JSON context. To provide an accurate portfolio
 - Primary Financial Goal (e.g., buying a house, passive income, capital preservation)
 
 User_Profile:
-{json.dumps(profile_for_prompt, indent=2)}
+{compact_json(profile_for_prompt)}
 
 Current_Holdings:
-{json.dumps(holdings, indent=2)}
+{compact_json(holdings)}
 
 Step 2: Information Gathering (If data is missing)
 If ANY of the 4 data points are missing or null in User_Profile, DO NOT analyze the portfolio yet. Instead, act conversationally and ask the user a polite, engaging question to gather the missing information. Ask one question at a time.
@@ -195,6 +200,7 @@ Use Financial Chain-of-Thought (FinCoT) reasoning to evaluate the portfolio agai
 Output Style:
 Speak directly to the user. Be professional, slightly witty, and highly analytical. Avoid long essays; use bullet points and clear actionable advice.
 """
+    prompt_metrics.record_prompt("portfolio_doctor", system_prompt)
 
     async def chat_stream() -> AsyncGenerator[str, None]:
         try:
@@ -210,6 +216,7 @@ Speak directly to the user. Be professional, slightly witty, and highly analytic
                 system_instruction=system_prompt,
                 tools=[update_user_profile_tool],
                 disable_automatic_function_calling=True,
+                priority=LLMPriority.CHAT,
             )
 
             tool_calls_to_make: List[types.Part] = []
@@ -269,6 +276,7 @@ Speak directly to the user. Be professional, slightly witty, and highly analytic
                         system_instruction=system_prompt,
                         tools=[update_user_profile_tool],
                         disable_automatic_function_calling=True,
+                        priority=LLMPriority.CHAT,
                     )
                     async for follow_chunk in follow_up_stream:
                         for part in _chunk_parts(follow_chunk):
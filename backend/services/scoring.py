@@ -0,0 +1,156 @@
+"""Deterministic scoring rules over NumPy arrays.
+
+Every rule accepts scalars (0-d) or equally shaped arrays, so the same thresholds score a
+single live analysis, one ticker's price history (one entry per trading day) and a whole
+screener universe (one entry per ticker). Missing inputs are NaN and contribute no points.
+"""
+
+from typing import Any, Dict, Mapping
+
+import numpy as np
+
+
+MARKET_CAP_BUCKETS = ("mega_cap", "large_cap", "mid_cap", "small_cap")
+
+SCORE_WEIGHTS = {
+    "mega_cap": {"Fundamental": 0.42, "Technical": 0.26, "Sentiment": 0.12, "Macro_Risk": 0.20},
+    "large_cap": {"Fundamental": 0.40, "Technical": 0.28, "Sentiment": 0.14, "Macro_Risk": 0.18},
+    "mid_cap": {"Fundamental": 0.37, "Technical": 0.30, "Sentiment": 0.15, "Macro_Risk": 0.18},
+    "small_cap": {"Fundamental": 0.32, "Technical": 0.28, "Sentiment": 0.18, "Macro_Risk": 0.22},
+}
+
+SUB_SCORE_KEYS = ("Fundamental", "Technical", "Sentiment", "Macro_Risk")
+
+CLASSIFICATIONS = ("STRONG BUY", "BUY", "HOLD", "SELL", "STRONG SELL")
+
+# Sector P/E median assumed by the pipeline until per-sector medians are sourced.
+SECTOR_PE_MEDIAN = 25.0
+
+
+def as_array(value) -> np.ndarray:
+    """Float array of a scalar or series input; None (a missing input) becomes NaN."""
+    return np.asarray(np.nan if value is None else value, dtype=np.float64)
+
+
+def clamp_scores(scores) -> np.ndarray:
+    return np.clip(np.round(scores), 0, 100).astype(int)
+
+
+def _tiers(values, conditions, points, default=0.0):
+    """Points of the first matching condition; missing (NaN) values always score 0."""
+    return np.select([np.isnan(values), *conditions], [0.0, *points], default)
+
+
+def fundamental_points(pe, sector_pe, peg, roe, debt, fcf_yield, eps_growth) -> np.ndarray:
+    pe, sector_pe, peg, roe, debt, fcf_yield, eps_growth = (
+        as_array(value) for value in (pe, sector_pe, peg, roe, debt, fcf_yield, eps_growth)
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        premium_pct = np.where(sector_pe != 0, (pe - sector_pe) / sector_pe * 100, np.nan)
+    score = 50.0
+    score = score + _tiers(premium_pct, [premium_pct <= -15, premium_pct <= 10, premium_pct >= 50, premium_pct >= 25], [10, 3, -12, -7])
+    score = score + _tiers(peg, [peg <= 1.2, peg <= 2.0, peg >= 3.0], [10, 4, -8])
+    score = score + _tiers(roe, [roe >= 20, roe >= 12, roe < 5], [12, 6, -8])
+    score = score + _tiers(debt, [debt <= 0.8, debt <= 1.5, debt >= 2.5], [8, 2, -10])
+    score = score + _tiers(fcf_yield, [fcf_yield >= 5, fcf_yield >= 2, fcf_yield < 0], [10, 4, -10])
+    score = score + _tiers(eps_growth, [eps_growth >= 20, eps_growth >= 8, eps_growth < 0], [12, 5, -12])
+    return clamp_scores(score)
+
+
+def technical_points(price, sma50, sma200, rsi, williams_r, macd_direction, volume_direction) -> np.ndarray:
+    """`macd_direction` / `volume_direction` are +1 (bullish / expanding), -1 or 0 (unknown)."""
+    price, sma50, sma200, rsi, williams_r = (as_array(value) for value in (price, sma50, sma200, rsi, williams_r))
+
+    def above(left, right, points):
+        return np.where(np.isnan(left) | np.isnan(right), 0.0, np.where(left > right, points, -points))
+
+    score = 50.0 + above(price, sma50, 8) + above(price, sma200, 10) + above(sma50, sma200, 6)
+    score = score + _tiers(
+        rsi, [(45 <= rsi) & (rsi <= 65), ((35 <= rsi) & (rsi < 45)) | ((65 < rsi) & (rsi <= 75))], [8, 2], default=-8
+    )
+    score = score + _tiers(williams_r, [(-80 <= williams_r) & (williams_r <= -20)], [4], default=-4)
+    score = score + 8 * np.asarray(macd_direction) + 4 * np.asarray(volume_direction)
+    return clamp_scores(score)
+
+
+def macro_points(vix, beta, pe_premium, large_cap) -> np.ndarray:
+    vix, beta, pe_premium = (as_array(value) for value in (vix, beta, pe_premium))
+    score = 50.0
+    score = score + _tiers(vix, [vix <= 16, vix <= 22, vix >= 30], [10, 2, -14], default=-6)
+    score = score + np.where(
+        large_cap,
+        _tiers(beta, [beta <= 1.1, beta >= 1.5], [6, -8], default=-2),
+        _tiers(beta, [beta <= 1.3, beta >= 2.0], [4, -10], default=-3),
+    )
+    score = score + _tiers(pe_premium, [pe_premium >= 50, pe_premium >= 20, pe_premium <= -10], [-10, -5, 4])
+    return clamp_scores(score)
+
+
+def bucket_market_caps(market_caps) -> np.ndarray:
+    caps = np.nan_to_num(as_array(market_caps), nan=0.0)
+    return np.select(
+        [caps >= 200_000_000_000, caps >= 10_000_000_000, caps >= 2_000_000_000],
+        list(MARKET_CAP_BUCKETS[:3]),
+        MARKET_CAP_BUCKETS[3],
+    )
+
+
+def is_large_cap(buckets) -> np.ndarray:
+    return np.isin(buckets, ("mega_cap", "large_cap"))
+
+
+def classify_scores(scores) -> np.ndarray:
+    scores = np.asarray(scores)
+    return np.select(
+        [scores >= 85, scores >= 70, scores >= 45, scores >= 25],
+        list(CLASSIFICATIONS[:4]),
+        CLASSIFICATIONS[4],
+    )
+
+
+def weighted_scores(sub_scores: Mapping[str, np.ndarray], buckets) -> np.ndarray:
+    """Cap-weighted composite per entry, each weighted by its own market-cap bucket."""
+    buckets = np.asarray(buckets)
+    total = 0.0
+    for key in SUB_SCORE_KEYS:
+        weights = np.select(
+            [buckets == bucket for bucket in MARKET_CAP_BUCKETS],
+            [SCORE_WEIGHTS[bucket][key] for bucket in MARKET_CAP_BUCKETS],
+            np.nan,
+        )
+        total = total + np.asarray(sub_scores[key]) * weights
+    return clamp_scores(total)
+
+
+def fundamentals_from_info(info: Mapping[str, Any]) -> Dict[str, Any]:
+    """The pipeline's fundamentals segment from a provider `info` dict."""
+    raw_pe = info.get("trailingPE", None)
+    raw_peg = info.get("pegRatio", None)
+    raw_eps_growth = info.get("earningsQuarterlyGrowth", None)
+    raw_dte = info.get("debtToEquity", None)
+
+    # PEG: dynamically calculate if missing
+    peg_ratio = raw_peg
+    if peg_ratio is None or (isinstance(peg_ratio, float) and np.isnan(peg_ratio)):
+        eps_growth_pct = round(raw_eps_growth * 100, 2) if raw_eps_growth else None
+        if raw_pe and eps_growth_pct and eps_growth_pct != 0:
+            peg_ratio = round(raw_pe / eps_growth_pct, 2)
+        else:
+            peg_ratio = 2.0  # Sector fallback
+
+    # D/E: normalize if yfinance returns it as a percentage (>10 heuristic)
+    dte_normalized = None
+    if raw_dte is not None:
+        dte_normalized = round(raw_dte / 100, 2) if abs(raw_dte) > 10 else round(raw_dte, 2)
+
+    return {
+        "P_E_Ratio": raw_pe,
+        "Sector_P_E_Median": SECTOR_PE_MEDIAN,
+        "P_B_Ratio": info.get("priceToBook", None),
+        "PEG_Ratio": peg_ratio,
+        "ROE_pct": round(info.get("returnOnEquity", 0) * 100, 2) if info.get("returnOnEquity") else None,
+        "Debt_to_Equity": dte_normalized,
+        "Free_Cash_Flow_Yield_pct": round(info.get("freeCashflow", 0) / info.get("marketCap", 1) * 100, 2) if info.get("freeCashflow") and info.get("marketCap") else None,
+        "5Y_EPS_Growth_Rate_pct": round(raw_eps_growth * 100, 2) if raw_eps_growth else None,
+        "Recent_EPS_Revision_Trend": "Neutral"
+    }
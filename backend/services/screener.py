@@ -0,0 +1,240 @@
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from core.config import settings
+from core.logger import log_event
+from services import indicators, scoring
+from services.cache_store import swr_cache
+from services.macro_service import get_macro_snapshot
+from services.market_data import MarketDataSnapshot, prime_market_snapshots
+
+
+SCREENER_FEATURES_KEY = "screener:features"
+# No per-ticker news is fetched for a whole universe, so sentiment is scored as neutral.
+NEUTRAL_SENTIMENT_SCORE = 50
+
+
+@dataclass(frozen=True)
+class UniverseFeatures:
+    """Columnar scoring inputs for a universe: entry i of every array belongs to tickers[i]."""
+
+    tickers: np.ndarray
+    names: np.ndarray
+    price: np.ndarray
+    market_cap: np.ndarray
+    pe: np.ndarray
+    peg: np.ndarray
+    roe: np.ndarray
+    debt: np.ndarray
+    fcf_yield: np.ndarray
+    eps_growth: np.ndarray
+    beta: np.ndarray
+    sma50: np.ndarray
+    sma200: np.ndarray
+    rsi14: np.ndarray
+    williams_r: np.ndarray
+    macd_direction: np.ndarray
+    volume_direction: np.ndarray
+    built_at: float
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+
+def _column(values: Iterable[Any]) -> np.ndarray:
+    column = []
+    for value in values:
+        try:
+            column.append(np.nan if value is None else float(value))
+        except (TypeError, ValueError):
+            column.append(np.nan)
+    return np.asarray(column, dtype=np.float64)
+
+
+def build_universe_features(snapshots: Iterable[MarketDataSnapshot]) -> UniverseFeatures:
+    """Flattens per-ticker snapshots into columns, computing technicals in batches of equal history length."""
+    snapshots = [snapshot for snapshot in snapshots if snapshot.history is not None and not snapshot.history.empty]
+    size = len(snapshots)
+    infos = [snapshot.info for snapshot in snapshots]
+    fundamentals = [scoring.fundamentals_from_info(info) for info in infos]
+
+    price = _column(
+        info.get("currentPrice", 0) or snapshot.history["Close"].iloc[-1] for info, snapshot in zip(infos, snapshots)
+    )
+    technicals = {name: np.full(size, np.nan) for name in ("sma50", "sma200", "rsi14", "williams_r", "macd", "signal", "volume", "volume_avg20")}
+
+    # latest_technicals works on (tickers, bars) batches, so stack the histories that share a length.
+    by_length: Dict[int, List[int]] = defaultdict(list)
+    for position, snapshot in enumerate(snapshots):
+        by_length[len(snapshot.history)].append(position)
+    for positions in by_length.values():
+        frames = [snapshots[position].history for position in positions]
+        latest = indicators.latest_technicals(
+            np.stack([frame["Close"].to_numpy(dtype=np.float64) for frame in frames]),
+            np.stack([frame["High"].to_numpy(dtype=np.float64) for frame in frames]),
+            np.stack([frame["Low"].to_numpy(dtype=np.float64) for frame in frames]),
+            np.stack([frame["Volume"].to_numpy(dtype=np.float64) for frame in frames]),
+        )
+        technicals["sma50"][positions] = latest.sma50
+        technicals["sma200"][positions] = latest.sma200
+        technicals["rsi14"][positions] = latest.rsi14
+        technicals["williams_r"][positions] = latest.williams_r(price[positions])
+        technicals["macd"][positions] = latest.macd
+        technicals["signal"][positions] = latest.macd_signal
+        technicals["volume"][positions] = latest.volume
+        technicals["volume_avg20"][positions] = latest.volume_avg20
+
+    return UniverseFeatures(
+        tickers=np.asarray([snapshot.ticker.upper() for snapshot in snapshots], dtype=object),
+        names=np.asarray(
+            [info.get("shortName", info.get("longName", snapshot.ticker)) for info, snapshot in zip(infos, snapshots)],
+            dtype=object,
+        ),
+        price=price,
+        market_cap=_column(info.get("marketCap") for info in infos),
+        pe=_column(row["P_E_Ratio"] for row in fundamentals),
+        peg=_column(row["PEG_Ratio"] for row in fundamentals),
+        roe=_column(row["ROE_pct"] for row in fundamentals),
+        debt=_column(row["Debt_to_Equity"] for row in fundamentals),
+        fcf_yield=_column(row["Free_Cash_Flow_Yield_pct"] for row in fundamentals),
+        eps_growth=_column(row["5Y_EPS_Growth_Rate_pct"] for row in fundamentals),
+        beta=_column(info.get("beta", 1.0) for info in infos),
+        # Rounded like the live technicals payload so both paths hit the same thresholds.
+        sma50=np.round(technicals["sma50"], 2),
+        sma200=np.round(technicals["sma200"], 2),
+        rsi14=np.round(technicals["rsi14"], 2),
+        williams_r=np.round(technicals["williams_r"], 2),
+        macd_direction=np.where(technicals["macd"] > technicals["signal"], 1, -1),
+        volume_direction=np.where(technicals["volume"] > technicals["volume_avg20"], 1, -1),
+        built_at=time.time(),
+    )
+
+
+def score_universe(features: UniverseFeatures, vix_level: float) -> Dict[str, np.ndarray]:
+    """The deterministic sub-scores, composite, bucket and classification for every ticker at once."""
+    buckets = scoring.bucket_market_caps(features.market_cap)
+    median = scoring.SECTOR_PE_MEDIAN
+    with np.errstate(invalid="ignore"):
+        pe_premium = np.where(features.pe != 0, np.round((features.pe - median) / median * 100, 1), np.nan)
+    sub_scores = {
+        "Fundamental": scoring.fundamental_points(
+            features.pe, median, features.peg, features.roe, features.debt, features.fcf_yield, features.eps_growth
+        ),
+        "Technical": scoring.technical_points(
+            np.round(features.price, 2),
+            features.sma50,
+            features.sma200,
+            features.rsi14,
+            features.williams_r,
+            features.macd_direction,
+            features.volume_direction,
+        ),
+        "Sentiment": np.full(len(features), NEUTRAL_SENTIMENT_SCORE),
+        "Macro_Risk": scoring.macro_points(vix_level, features.beta, pe_premium, scoring.is_large_cap(buckets)),
+    }
+    scores = scoring.weighted_scores(sub_scores, buckets)
+    return {
+        **sub_scores,
+        "score": scores,
+        "recommendation": scoring.classify_scores(scores),
+        "stockProfile": buckets,
+    }
+
+
+def screen(
+    features: UniverseFeatures,
+    vix_level: float,
+    min_score: Optional[int] = None,
+    min_sub_scores: Optional[Mapping[str, int]] = None,
+    caps: Optional[Iterable[str]] = None,
+    classifications: Optional[Iterable[str]] = None,
+    limit: int = 50,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Ranks the universe by composite score after filtering; returns (top rows, number matched)."""
+    scored = score_universe(features, vix_level)
+    mask = np.ones(len(features), dtype=bool)
+    if min_score is not None:
+        mask &= scored["score"] >= min_score
+    for key, threshold in (min_sub_scores or {}).items():
+        if threshold is not None:
+            mask &= scored[key] >= threshold
+    if caps:
+        mask &= np.isin(scored["stockProfile"], list(caps))
+    if classifications:
+        mask &= np.isin(scored["recommendation"], list(classifications))
+
+    matched = np.flatnonzero(mask)
+    # Highest score first; ties broken alphabetically so pages are stable across refreshes.
+    order = matched[np.lexsort((features.tickers[matched].astype(str), -scored["score"][matched]))][:limit]
+
+    rows = [
+        {
+            "ticker": features.tickers[index],
+            "name": features.names[index],
+            "price": round(float(features.price[index]), 2) if not np.isnan(features.price[index]) else None,
+            "score": int(scored["score"][index]),
+            "recommendation": str(scored["recommendation"][index]),
+            "stockProfile": str(scored["stockProfile"][index]),
+            "sub_scores": {key: int(scored[key][index]) for key in scoring.SUB_SCORE_KEYS},
+        }
+        for index in order
+    ]
+    return rows, int(matched.size)
+
+
+def _build_configured_universe() -> UniverseFeatures:
+    started = time.perf_counter()
+    snapshots = prime_market_snapshots(settings.screener_universe)
+    features = build_universe_features(snapshots.values())
+    log_event(
+        "info",
+        "screener.universe_built",
+        requested=len(settings.screener_universe),
+        tickers=len(features),
+        latencyMs=round((time.perf_counter() - started) * 1000, 2),
+    )
+    return features
+
+
+def get_universe_features() -> Tuple[UniverseFeatures, Dict[str, Any]]:
+    return swr_cache.get_or_fetch(
+        SCREENER_FEATURES_KEY,
+        _build_configured_universe,
+        ttl_seconds=settings.cache_ttl_seconds_screener,
+        swr_seconds=settings.cache_swr_seconds_screener,
+        wait_timeout_seconds=settings.request_timeout_seconds,
+    )
+
+
+def run_screener(
+    min_score: Optional[int] = None,
+    min_sub_scores: Optional[Mapping[str, int]] = None,
+    caps: Optional[Iterable[str]] = None,
+    classifications: Optional[Iterable[str]] = None,
+    limit: int = 50,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Rescores the cached universe on every call; only the feature columns are cached."""
+    features, cache_meta = get_universe_features()
+    macro_snapshot, _ = get_macro_snapshot()
+
+    started = time.perf_counter()
+    rows, matched = screen(features, macro_snapshot.vix_level, min_score, min_sub_scores, caps, classifications, limit)
+    scoring_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    return {
+        "metadata": {
+            "generated_at": datetime.now().isoformat(),
+            "universe": len(features),
+            "matched": matched,
+            "featuresAsOf": datetime.fromtimestamp(features.built_at).isoformat(),
+            "vixLevel": macro_snapshot.vix_level,
+            "sentiment": "neutral",
+            "scoringMs": scoring_ms,
+        },
+        "results": rows,
+    }, cache_meta
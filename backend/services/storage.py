@@ -0,0 +1,29 @@
+import json
+import os
+import tempfile
+from typing import Any, Callable, IO
+
+
+def _atomic_write(path: str, write: Callable[[IO], None], suffix: str, mode: str) -> None:
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=suffix)
+    try:
+        with os.fdopen(fd, mode, **({"encoding": "utf-8"} if "b" not in mode else {})) as handle:
+            write(handle)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_json(path: str, payload: Any) -> None:
+    """Writes JSON through a temp file in the same directory and renames it into place."""
+    _atomic_write(path, lambda handle: json.dump(payload, handle), ".json", "w")
+
+
+def atomic_write_bytes(path: str, data: bytes) -> None:
+    """Binary counterpart of `atomic_write_json`."""
+    _atomic_write(path, lambda handle: handle.write(data), os.path.splitext(path)[1], "wb")
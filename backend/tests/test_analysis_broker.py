@@ -0,0 +1,90 @@
+import asyncio
+
+from services.analysis_broker import AnalysisBroker
+
+
+def test_concurrent_subscribers_share_one_pipeline_run():
+    started = []
+    release = None
+
+    async def fake_pipeline(ticker, target_date):
+        started.append((ticker, target_date))
+        yield 'data: {"type": "status", "message": "fetching"}\n\n'
+        await release.wait()
+        yield 'data: {"type": "agent_done", "agent": "bull", "text": "..."}\n\n'
+        yield 'data: {"type": "complete", "data": {}}\n\n'
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        broker = AnalysisBroker(stream_factory=fake_pipeline)
+
+        first = broker.subscribe("nvda")
+        first_events = [await first.__anext__()]
+
+        # A late subscriber joins mid-run and must see the replayed status event.
+        second = broker.subscribe("NVDA")
+        assert broker.active_runs() == 1
+        release.set()
+
+        first_events.extend([chunk async for chunk in first])
+        second_events = [chunk async for chunk in second]
+        await asyncio.sleep(0)
+        return broker, first_events, second_events
+
+    broker, first_events, second_events = asyncio.run(scenario())
+
+    assert started == [("NVDA", None)]
+    assert first_events == second_events
+    assert len(first_events) == 3
+    assert '"complete"' in first_events[-1]
+    assert broker.active_runs() == 0
+
+
+def test_distinct_target_dates_run_separately():
+    started = []
+
+    async def fake_pipeline(ticker, target_date):
+        started.append((ticker, target_date))
+        yield 'data: {"type": "complete", "data": {}}\n\n'
+
+    async def scenario():
+        broker = AnalysisBroker(stream_factory=fake_pipeline)
+        streams = [broker.subscribe("AAPL"), broker.subscribe("AAPL", "2025-01-02")]
+        return [[chunk async for chunk in stream] for stream in streams]
+
+    results = asyncio.run(scenario())
+
+    assert sorted(started, key=str) == [("AAPL", "2025-01-02"), ("AAPL", None)]
+    assert all(len(events) == 1 for events in results)
+
+
+def test_disconnected_subscribers_are_no_longer_counted():
+    release = None
+
+    async def fake_pipeline(ticker, target_date):
+        yield 'data: {"type": "status", "message": "fetching"}\n\n'
+        await release.wait()
+        yield 'data: {"type": "complete", "data": {}}\n\n'
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        broker = AnalysisBroker(stream_factory=fake_pipeline)
+        first = broker.subscribe("MSFT")
+        second = broker.subscribe("MSFT")
+        await first.__anext__()
+        await second.__anext__()
+        run = broker._runs[("MSFT", None)]
+        attached = run.subscribers
+
+        await first.aclose()
+        after_disconnect = run.subscribers
+        release.set()
+        remaining = [chunk async for chunk in second]
+        return attached, after_disconnect, run.subscribers, remaining
+
+    attached, after_disconnect, finished, remaining = asyncio.run(scenario())
+
+    assert (attached, after_disconnect, finished) == (2, 1, 0)
+    assert len(remaining) == 1
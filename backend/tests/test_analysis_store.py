@@ -0,0 +1,66 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+from services.analysis_store import INDEX_FILENAME, AnalysisStore
+
+
+def _payload(score, generated_at=None):
+    return {
+        "ticker": "NVDA",
+        "score": score,
+        "recommendation": "BUY",
+        "metadata": {"generated_at": (generated_at or datetime.now()).isoformat()},
+        "ai_analysis": {"sub_scores": {"Fundamental": score}},
+    }
+
+
+def test_save_updates_index_and_serves_reads_from_memory(tmp_path):
+    store = AnalysisStore(str(tmp_path))
+    store.save("nvda", None, _payload(74))
+
+    os.unlink(tmp_path / "NVDA.json")
+
+    assert store.summary("NVDA")["score"] == 74
+    assert store.get("NVDA")["ai_analysis"]["sub_scores"]["Fundamental"] == 74
+    assert json.loads((tmp_path / INDEX_FILENAME).read_text())["NVDA"]["recommendation"] == "BUY"
+    assert not [name for name in os.listdir(tmp_path) if name.startswith(".tmp-")]
+
+
+def test_index_is_rebuilt_from_existing_results(tmp_path):
+    (tmp_path / "AAPL.json").write_text(json.dumps({"score": 61, "recommendation": "HOLD"}))
+
+    store = AnalysisStore(str(tmp_path))
+
+    assert store.summary("aapl")["score"] == 61
+    assert store.summary("aapl")["generated_at"]
+
+
+def test_get_fresh_expires_undated_results_from_previous_days(tmp_path):
+    store = AnalysisStore(str(tmp_path))
+    store.save("NVDA", None, _payload(70, datetime.now() - timedelta(days=1)))
+    store.save("NVDA", "2025-01-02", _payload(55, datetime.now() - timedelta(days=30)))
+
+    assert store.get_fresh("NVDA") is None
+    assert store.get_fresh("NVDA", "2025-01-02")["score"] == 55
+
+
+def test_dated_results_are_compacted_per_ticker(tmp_path):
+    store = AnalysisStore(str(tmp_path), max_dated_per_ticker=2)
+    for day in ("2025-01-02", "2025-01-03", "2025-01-06"):
+        store.save("NVDA", day, _payload(50))
+    store.save("AAPL", "2025-01-02", _payload(50))
+
+    remaining = sorted(name for name in os.listdir(tmp_path) if name.endswith(".json") and name != INDEX_FILENAME)
+
+    assert remaining == ["AAPL_2025-01-02.json", "NVDA_2025-01-03.json", "NVDA_2025-01-06.json"]
+
+
+def test_store_does_not_touch_disk_until_first_use(tmp_path):
+    root = tmp_path / "analyses"
+
+    store = AnalysisStore(str(root))
+    assert not root.exists()
+
+    assert store.summary("NVDA") is None
+    assert json.loads((root / INDEX_FILENAME).read_text()) == {}
@@ -0,0 +1,252 @@
+import asyncio
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+import analysis_engine
+from services.analysis_dag import StageMemo
+from services.analysis_store import AnalysisStore
+from services.cache_store import SWRCache
+from services.fundamentals_store import priced_info
+from services.indicator_state import IndicatorStateStore
+from services.macro_service import MacroSnapshot
+from services.market_data import MarketDataSnapshot
+
+
+CIO_RESPONSE = {
+    "Ticker": "AAPL",
+    "Recommendation_Score": 72,
+    "Classification": "Buy",
+    "Expected_Trend_1_to_6_Months": "Gradual upside toward prior highs.",
+    "XAI_Rationale": {"Top_Positive_Drivers": ["ROE 30%"], "Top_Negative_Drivers": ["P/E premium"]},
+    "Sub_Scores": {"Fundamental": 70, "Technical": 65, "Sentiment": 55, "Macro_Risk": 60},
+}
+
+
+def _daily_history(days=260):
+    index = pd.date_range(end="2026-03-10", periods=days, freq="B", tz="America/New_York", name="Date")
+    close = np.linspace(100.0, 140.0, days)
+    return pd.DataFrame(
+        {"Open": close - 1, "High": close + 2, "Low": close - 2, "Close": close, "Volume": np.full(days, 1_000_000)},
+        index=index,
+    )
+
+
+def _snapshot():
+    return MarketDataSnapshot(
+        ticker="AAPL",
+        info={"shortName": "Apple Inc.", "currentPrice": 140.0, "marketCap": 3_000_000_000_000, "trailingPE": 30.0},
+        fast_info={},
+        history=_daily_history(),
+    )
+
+
+def _macro():
+    return MacroSnapshot(
+        vix_level=18.5,
+        federal_funds_rate_trend="Falling",
+        us_gdp_expectation_pct=2.0,
+        sources={"VIX_Level": "yfinance"},
+    )
+
+
+def _patch_pipeline(monkeypatch, tmp_path, fetch_delay=0.0):
+    def slow(value):
+        def _fetch(*_args):
+            time.sleep(fetch_delay)
+            return value
+
+        return _fetch
+
+    async def fake_agent(prompt, role, use_json=False, max_retries=3):
+        return json.dumps(CIO_RESPONSE) if use_json else "Agent paragraph."
+
+    async def fake_stream(prompt, role, max_retries=3):
+        for delta in ("Agent ", "paragraph."):
+            yield delta
+
+    monkeypatch.setattr(analysis_engine, "api_key", "test-key")
+    monkeypatch.setattr(analysis_engine, "swr_cache", SWRCache())
+    monkeypatch.setattr(analysis_engine, "analysis_store", AnalysisStore(str(tmp_path)))
+    monkeypatch.setattr(analysis_engine, "stage_memo", StageMemo(max_entries=64, ttl_seconds=3600))
+    monkeypatch.setattr(analysis_engine, "indicator_states", IndicatorStateStore(str(tmp_path / "indicators")))
+    monkeypatch.setattr(analysis_engine, "get_market_snapshot", lambda _ticker: (slow(_snapshot())(), {}))
+    monkeypatch.setattr(analysis_engine, "get_macro_snapshot", lambda: (slow(_macro())(), {"stale": False}))
+    monkeypatch.setattr(analysis_engine, "_fetch_headlines", slow(["Apple ships new chip"]))
+    monkeypatch.setattr(analysis_engine, "_call_agent_async", fake_agent)
+    monkeypatch.setattr(analysis_engine, "_stream_agent_async", fake_stream)
+
+
+async def _collect(ticker="AAPL", target_date=None):
+    events = []
+    async for chunk in analysis_engine.analyze_stock_stream(ticker, target_date):
+        events.append(json.loads(chunk[len("data: "):]))
+    return events
+
+
+def test_stream_emits_status_per_source_and_completes(monkeypatch, tmp_path):
+    _patch_pipeline(monkeypatch, tmp_path)
+
+    events = asyncio.run(_collect())
+    messages = [event.get("message", "") for event in events if event["type"] == "status"]
+
+    assert any("Received market data" in message for message in messages)
+    assert any("Received macro snapshot" in message for message in messages)
+    assert any("Received news" in message for message in messages)
+    assert events[-1]["type"] == "complete"
+    assert events[-1]["data"]["ticker"] == "AAPL"
+    assert events[-1]["data"]["metadata"]["macro"]["stale"] is False
+    assert (tmp_path / "AAPL.json").exists()
+
+
+def test_fetch_stage_runs_sources_concurrently(monkeypatch, tmp_path):
+    _patch_pipeline(monkeypatch, tmp_path, fetch_delay=0.3)
+
+    started = time.perf_counter()
+    events = asyncio.run(_collect())
+    elapsed = time.perf_counter() - started
+
+    assert events[-1]["type"] == "complete"
+    assert elapsed < 0.8
+
+
+def test_second_run_same_day_is_served_from_store(monkeypatch, tmp_path):
+    _patch_pipeline(monkeypatch, tmp_path)
+
+    asyncio.run(_collect())
+    events = asyncio.run(_collect())
+
+    assert [event["type"] for event in events] == ["status", "complete"]
+    assert events[-1]["data"]["metadata"]["is_cached"] is True
+
+
+def test_provisional_score_precedes_agents(monkeypatch, tmp_path):
+    _patch_pipeline(monkeypatch, tmp_path)
+
+    events = asyncio.run(_collect())
+    types = [event["type"] for event in events]
+
+    assert types.index("provisional") < types.index("agent_done")
+    provisional = events[types.index("provisional")]["data"]
+    final = events[-1]["data"]
+    assert provisional["sub_scores"] == final["ai_analysis"]["deterministic_sub_scores"]
+    assert provisional["score_weights"] == final["ai_analysis"]["score_weights"]
+    assert provisional["stockProfile"] == "mega_cap"
+
+
+def test_fast_mode_makes_no_agent_calls(monkeypatch, tmp_path):
+    _patch_pipeline(monkeypatch, tmp_path)
+
+    async def no_agent(*_args, **_kwargs):
+        raise AssertionError("fast mode must not call the LLM")
+
+    monkeypatch.setattr(analysis_engine, "_call_agent_async", no_agent)
+    monkeypatch.setattr(analysis_engine, "_stream_agent_async", no_agent)
+    monkeypatch.setattr(analysis_engine, "api_key", None)
+
+    result = asyncio.run(analysis_engine.fast_analysis("aapl"))
+
+    assert result["ticker"] == "AAPL"
+    assert result["metadata"]["mode"] == "fast"
+    expected = round(sum(result["sub_scores"][key] * weight for key, weight in result["score_weights"].items()))
+    assert result["score"] == expected
+    assert result["recommendation"] == analysis_engine._classify_score(expected)
+    assert not (tmp_path / "AAPL.json").exists()
+
+
+def test_debate_agents_stream_deltas_before_done(monkeypatch, tmp_path):
+    _patch_pipeline(monkeypatch, tmp_path)
+
+    events = asyncio.run(_collect())
+
+    for agent in ("bull", "bear", "quant"):
+        agent_events = [event for event in events if event.get("agent") == agent]
+        assert [event["type"] for event in agent_events] == ["agent_delta", "agent_delta", "agent_done"]
+        assert agent_events[-1]["text"] == "".join(event["text"] for event in agent_events[:-1])
+    assert events[-1]["data"]["ai_analysis"]["debate"]["bull"] == "Agent paragraph."
+
+
+def test_agent_failure_surfaces_as_error_event(monkeypatch, tmp_path):
+    _patch_pipeline(monkeypatch, tmp_path)
+
+    async def broken_stream(prompt, role, max_retries=3):
+        yield "Partial"
+        raise RuntimeError("stream dropped")
+
+    monkeypatch.setattr(analysis_engine, "_stream_agent_async", broken_stream)
+
+    events = asyncio.run(_collect())
+
+    assert events[-1] == {"type": "error", "message": "stream dropped"}
+
+
+def test_price_only_change_reruns_quant_and_cio_only(monkeypatch, tmp_path):
+    _patch_pipeline(monkeypatch, tmp_path)
+    calls = []
+
+    async def counting_agent(prompt, role, use_json=False, max_retries=3):
+        calls.append(role)
+        return json.dumps(CIO_RESPONSE)
+
+    async def counting_stream(prompt, role, max_retries=3):
+        calls.append(role)
+        yield f"{role} report"
+
+    monkeypatch.setattr(analysis_engine, "_call_agent_async", counting_agent)
+    monkeypatch.setattr(analysis_engine, "_stream_agent_async", counting_stream)
+    asyncio.run(_collect())
+    assert sorted(calls) == ["bear", "bull", "cio", "quant"]
+
+    repriced = _snapshot()
+    repriced.info["currentPrice"] = 142.5
+    monkeypatch.setattr(analysis_engine, "get_market_snapshot", lambda _ticker: (repriced, {}))
+    monkeypatch.setattr(analysis_engine, "analysis_store", AnalysisStore(str(tmp_path / "next-day")))
+    calls.clear()
+
+    events = asyncio.run(_collect())
+
+    assert sorted(calls) == ["cio", "quant"]
+    reused = [event["agent"] for event in events if event["type"] == "agent_done" and event.get("reused")]
+    assert reused == ["bull", "bear"]
+    final = events[-1]["data"]
+    assert final["price"] == 142.5
+    assert final["metadata"]["reusedStages"] == ["bull", "bear"]
+    assert final["ai_analysis"]["debate"] == {"bull": "bull report", "bear": "bear report", "quant": "quant report"}
+
+
+def test_repriced_fundamentals_row_keeps_bull_and_bear(monkeypatch, tmp_path):
+    _patch_pipeline(monkeypatch, tmp_path)
+    row = {
+        "shortName": "Apple Inc.",
+        "trailingEps": 7.0,
+        "sharesOutstanding": 15_000_000_000,
+        "freeCashflow": 100_000_000_000,
+        "earningsQuarterlyGrowth": 0.1,
+        "returnOnEquity": 0.3,
+    }
+    calls = []
+
+    async def counting_stream(prompt, role, max_retries=3):
+        calls.append(role)
+        yield f"{role} report"
+
+    def snapshot_at(last_close):
+        history = _daily_history()
+        history.iloc[-1, history.columns.get_loc("Close")] = last_close
+        info = priced_info(row, last_close, float(history["Close"].iloc[-2]))
+        return MarketDataSnapshot(ticker="AAPL", info=info, fast_info={}, history=history)
+
+    monkeypatch.setattr(analysis_engine, "_stream_agent_async", counting_stream)
+    monkeypatch.setattr(analysis_engine, "get_market_snapshot", lambda _ticker: (snapshot_at(140.0), {}))
+    asyncio.run(_collect())
+
+    monkeypatch.setattr(analysis_engine, "get_market_snapshot", lambda _ticker: (snapshot_at(143.0), {}))
+    monkeypatch.setattr(analysis_engine, "analysis_store", AnalysisStore(str(tmp_path / "next-tick")))
+    calls.clear()
+
+    events = asyncio.run(_collect())
+
+    assert calls == ["quant"]
+    assert events[-1]["data"]["metadata"]["reusedStages"] == ["bull", "bear"]
@@ -2,6 +2,8 @@ from fastapi.testclient import TestClient
 
 from app import app
 from core.auth import verify_token, verify_token_and_check_limit
+from core.config import settings
+from core.encoded_body import EncodedBody
 from routers import portfolio, stocks
 
 
@@ -47,24 +49,107 @@ def test_quick_stats_contract_includes_metadata(monkeypatch):
     assert response.headers.get("x-request-id")
 
 
+def test_quick_stats_leaves_the_cached_payload_untouched(monkeypatch):
+    mock_payload = {
+        "ticker": "AAPL",
+        "metadata": {"provider": "yfinance"},
+        "chartData": [{"date": "03/10", "close": 200.0}] * 40,
+    }
+    monkeypatch.setattr(
+        stocks,
+        "get_quick_stats_cached",
+        lambda _ticker: (mock_payload, {"cached": True, "stale": False, "version": 3}),
+    )
+
+    with TestClient(app) as client:
+        response = client.get("/api/quick-stats/AAPL")
+
+    assert response.json()["metadata"]["provider"] == "yfinance"
+    assert mock_payload["metadata"] == {"provider": "yfinance"}
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers.get("x-cache-status") == "HIT"
+
+
 def test_chart_contract_has_cache_headers(monkeypatch):
     monkeypatch.setattr(
         stocks,
-        "get_chart_cached",
-        lambda _ticker, _period, _interval: (
-            [{"time": 1710000000, "close": 123.45, "open": 120.0, "high": 124.0, "low": 119.0, "volume": 100}],
-            {"cached": True, "stale": False},
+        "get_chart_body",
+        lambda _ticker, _period, _interval, _format, _since=None: (
+            EncodedBody.from_json(
+                [{"time": 1710000000, "close": 123.45, "open": 120.0, "high": 124.0, "low": 119.0, "volume": 100}]
+            ),
+            {"cached": True, "stale": False, "cursor": 1710000000},
         ),
     )
 
     with TestClient(app) as client:
         response = client.get("/api/chart/AAPL", params={"period": "1mo", "interval": "1d"})
+        bad_cursor = client.get("/api/chart/AAPL", params={"period": "1d", "interval": "5m", "since": "yesterday"})
 
     assert response.status_code == 200
     assert isinstance(response.json(), list)
     assert response.headers.get("x-cache-status") == "HIT"
     assert response.headers.get("x-cache-stale") == "false"
+    assert response.headers.get("x-chart-cursor") == "1710000000"
     assert response.headers.get("x-request-id")
+    assert bad_cursor.status_code == 400
+    assert bad_cursor.json()["error"]["code"] == "INVALID_CURSOR"
+
+
+def test_read_endpoints_answer_conditional_requests(monkeypatch):
+    monkeypatch.setattr(
+        stocks,
+        "search_tickers_cached",
+        lambda _q: ([{"symbol": "AAPL"}], {"cached": True, "stale": False, "version": 7}),
+    )
+    monkeypatch.setattr(
+        stocks,
+        "get_quick_stats_cached",
+        lambda _ticker: ({"ticker": "AAPL"}, {"cached": True, "stale": True, "version": 7}),
+    )
+
+    with TestClient(app) as client:
+        first = client.get("/api/search", params={"q": "AAPL"})
+        etag = first.headers["etag"]
+        repeat = client.get("/api/search", params={"q": "AAPL"}, headers={"If-None-Match": f"W/{etag}, \"other\""})
+        other_query = client.get("/api/search", params={"q": "MSFT"}, headers={"If-None-Match": etag})
+        stale_stats = client.get("/api/quick-stats/AAPL")
+
+    assert first.status_code == 200
+    ttl, swr = settings.cache_ttl_seconds_search, settings.cache_swr_seconds_search
+    assert first.headers["cache-control"] == f"public, max-age={ttl}, stale-while-revalidate={swr}"
+    assert repeat.status_code == 304 and repeat.content == b""
+    assert repeat.headers["etag"] == etag and repeat.headers["x-cache-status"] == "HIT"
+    assert other_query.status_code == 200
+    swr = settings.cache_swr_seconds_quick_stats
+    assert stale_stats.headers["cache-control"] == f"public, max-age=0, stale-while-revalidate={swr}"
+    assert stale_stats.headers["etag"] != etag
+
+
+def test_chart_columnar_and_binary_formats(monkeypatch):
+    calls = []
+
+    def _fake_body(_ticker, _period, interval, chart_format, _since=None):
+        calls.append((interval, chart_format))
+        if chart_format == "binary":
+            body = EncodedBody.from_bytes(b"OHLC", "application/octet-stream")
+        else:
+            body = EncodedBody.from_json({"format": "columnar", "count": 0})
+        return body, {"cached": False, "stale": False}
+
+    monkeypatch.setattr(stocks, "get_chart_body", _fake_body)
+
+    with TestClient(app) as client:
+        columnar = client.get("/api/chart/AAPL", params={"period": "1mo", "interval": "1d", "format": "columnar"})
+        binary = client.get("/api/chart/AAPL", params={"period": "1d", "interval": "5m", "format": "binary"})
+        daily_binary = client.get("/api/chart/AAPL", params={"period": "1mo", "interval": "1d", "format": "binary"})
+
+    assert columnar.json()["format"] == "columnar"
+    assert binary.headers["content-type"] == "application/octet-stream"
+    assert binary.headers.get("x-cache-status") == "MISS"
+    assert binary.content == b"OHLC"
+    assert daily_binary.status_code == 400
+    assert calls == [("1d", "columnar"), ("5m", "binary")]
 
 
 def test_search_contract(monkeypatch):
@@ -152,3 +237,131 @@ def test_portfolio_doctor_chat_requires_auth():
     assert response.status_code == 401
     assert body["error"]["code"] == "AUTH_REQUIRED"
     assert body["requestId"]
+
+
+def test_analyze_batch_sse_contract(monkeypatch):
+    async def _fake_batch(symbols):
+        for symbol in symbols:
+            yield f'data: {{"type": "complete", "ticker": "{symbol}", "data": {{}}}}\n\n'
+        yield 'data: {"type": "batch_complete", "completed": [], "failed": []}\n\n'
+
+    monkeypatch.setattr(stocks, "analyze_batch_stream", _fake_batch)
+    app.dependency_overrides[verify_token_and_check_limit] = _dummy_user_context
+    try:
+        with TestClient(app) as client:
+            with client.stream("POST", "/api/analyze/batch", json={"tickers": ["aapl", "MSFT", "AAPL"]}) as response:
+                body = "".join(response.iter_text())
+                status_code = response.status_code
+                content_type = response.headers.get("content-type", "")
+    finally:
+        app.dependency_overrides.pop(verify_token_and_check_limit, None)
+
+    assert status_code == 200
+    assert content_type.startswith("text/event-stream")
+    assert body.count('"type": "complete"') == 2
+    assert '"type": "batch_complete"' in body
+
+
+def test_analyze_batch_is_open_to_free_plans_and_counts_each_ticker(monkeypatch):
+    updates = []
+
+    async def _fake_batch(symbols):
+        yield 'data: {"type": "batch_complete", "completed": [], "failed": []}\n\n'
+
+    def _free_user_context():
+        context = _dummy_user_context()
+        context["isPro"] = False
+        context["user_ref"].update = updates.append
+        return context
+
+    monkeypatch.setattr(stocks, "analyze_batch_stream", _fake_batch)
+    monkeypatch.setattr(stocks.firestore, "Increment", lambda amount: amount)
+    app.dependency_overrides[verify_token_and_check_limit] = _free_user_context
+    try:
+        with TestClient(app) as client:
+            response = client.post("/api/analyze/batch", json={"tickers": ["aapl", "MSFT", "AAPL"]})
+    finally:
+        app.dependency_overrides.pop(verify_token_and_check_limit, None)
+
+    assert response.status_code == 200
+    assert updates == [{"analysisCount": 2}]
+
+
+def test_analyze_batch_rejects_oversized_batches():
+    app.dependency_overrides[verify_token_and_check_limit] = _dummy_user_context
+    try:
+        with TestClient(app) as client:
+            response = client.post("/api/analyze/batch", json={"tickers": [f"T{i}" for i in range(200)]})
+    finally:
+        app.dependency_overrides.pop(verify_token_and_check_limit, None)
+
+    body = response.json()
+    assert response.status_code == 400
+    assert body["error"]["code"] == "BATCH_TOO_LARGE"
+    assert body["requestId"]
+
+
+def test_analyze_fast_mode_returns_json(monkeypatch):
+    async def _fake_fast(ticker, target_date=None):
+        return {"ticker": ticker.upper(), "score": 64, "recommendation": "HOLD", "metadata": {"mode": "fast"}}
+
+    monkeypatch.setattr(stocks, "fast_analysis", _fake_fast)
+    app.dependency_overrides[verify_token_and_check_limit] = _dummy_user_context
+    try:
+        with TestClient(app) as client:
+            response = client.get("/api/analyze/aapl?mode=fast")
+            invalid = client.get("/api/analyze/aapl?mode=turbo")
+    finally:
+        app.dependency_overrides.pop(verify_token_and_check_limit, None)
+
+    assert response.status_code == 200
+    assert response.json()["metadata"]["mode"] == "fast"
+    assert invalid.status_code == 400
+    assert invalid.json()["error"]["code"] == "INVALID_MODE"
+
+
+def test_score_history_contract(monkeypatch):
+    calls = []
+
+    def _fake_history(ticker, start, end):
+        calls.append((ticker, start, end))
+        point = {"date": "2026-03-10", "price": 200.0, "score": 61, "recommendation": "HOLD", "sub_scores": {}}
+        return {"ticker": "AAPL", "metadata": {"points": 1}, "series": [point]}, {"cached": False, "stale": False}
+
+    monkeypatch.setattr(stocks, "get_score_history_cached", _fake_history)
+
+    with TestClient(app) as client:
+        response = client.get("/api/score-history/AAPL", params={"start": "2026-03-01", "end": "2026-03-10"})
+
+    assert response.status_code == 200
+    assert response.json()["series"][0]["score"] == 61
+    assert response.headers.get("x-cache-status") == "MISS"
+    assert calls == [("AAPL", "2026-03-01", "2026-03-10")]
+
+
+def test_screener_contract_parses_filters(monkeypatch):
+    captured = {}
+
+    def _fake_screener(**kwargs):
+        captured.update(kwargs)
+        return {"metadata": {"universe": 2, "matched": 1, "scoringMs": 0.4}, "results": [{"ticker": "AAPL"}]}, {
+            "cached": True,
+            "stale": False,
+        }
+
+    monkeypatch.setattr(stocks, "run_screener", _fake_screener)
+
+    with TestClient(app) as client:
+        response = client.get(
+            "/api/screener",
+            params={"min_technical": 60, "cap": "mega_cap,large_cap", "classification": "strong_buy,BUY"},
+        )
+        rejected = client.get("/api/screener", params={"cap": "nano_cap"})
+
+    assert response.status_code == 200
+    assert response.json()["results"] == [{"ticker": "AAPL"}]
+    assert captured["min_sub_scores"]["Technical"] == 60
+    assert captured["caps"] == {"mega_cap", "large_cap"}
+    assert captured["classifications"] == {"STRONG BUY", "BUY"}
+    assert rejected.status_code == 400
+    assert rejected.json()["error"]["code"] == "INVALID_FILTER"
@@ -0,0 +1,49 @@
+import asyncio
+import json
+from dataclasses import replace
+
+from services import batch_analysis
+
+
+def test_batch_stream_tags_events_and_caps_agent_concurrency(monkeypatch):
+    primed = []
+    active = {"now": 0, "peak": 0}
+
+    def fake_prime(symbols):
+        primed.append(list(symbols))
+        return {symbol: object() for symbol in symbols}
+
+    async def fake_events(symbol, target_date=None, agent_limiter=None):
+        yield {"type": "status", "message": f"Fetching {symbol}"}
+        async with agent_limiter:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            await asyncio.sleep(0.01)
+            active["now"] -= 1
+        if symbol == "BAD":
+            yield {"type": "error", "message": "no data"}
+        else:
+            yield {"type": "complete", "data": {"ticker": symbol}}
+
+    monkeypatch.setattr(batch_analysis, "prime_market_snapshots", fake_prime)
+    monkeypatch.setattr(batch_analysis, "get_macro_snapshot", lambda: (None, {}))
+    monkeypatch.setattr(batch_analysis, "analysis_events", fake_events)
+    monkeypatch.setattr(batch_analysis, "settings", replace(batch_analysis.settings, analysis_batch_llm_concurrency=2))
+    monkeypatch.setattr(batch_analysis, "_limiter", None)
+
+    symbols = ["AAPL", "MSFT", "NVDA", "BAD"]
+
+    async def collect():
+        return [json.loads(chunk[len("data: "):]) async for chunk in batch_analysis.analyze_batch_stream(symbols)]
+
+    events = asyncio.run(collect())
+
+    assert primed == [symbols]
+    assert events[0] == {"type": "batch_started", "tickers": symbols}
+    assert {event["ticker"] for event in events if event["type"] == "complete"} == {"AAPL", "MSFT", "NVDA"}
+    assert events[-1] == {"type": "batch_complete", "completed": ["AAPL", "MSFT", "NVDA"], "failed": ["BAD"]}
+    assert active["peak"] <= 2
+
+
+def test_normalize_batch_tickers_dedupes_case_insensitively():
+    assert batch_analysis.normalize_batch_tickers(["aapl", " MSFT ", "AAPL"]) == ["AAPL", "MSFT"]
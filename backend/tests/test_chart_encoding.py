@@ -0,0 +1,57 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from analysis_engine import chart_points
+from services import chart_encoding, market_service
+
+
+def _frame(interval="5m", bars=390):
+    if interval == "5m":
+        index = pd.date_range("2026-03-09 09:30", periods=bars, freq="5min", tz="America/New_York", name="Datetime")
+    else:
+        index = pd.bdate_range(end="2026-03-10", periods=bars, tz="America/New_York", name="Date")
+    close = np.linspace(180.0, 190.0, bars) + 0.00123
+    close[3] = np.nan
+    return pd.DataFrame(
+        {"Open": close - 0.5, "High": close + 1.0, "Low": close - 1.0, "Close": close, "Volume": np.arange(bars) * 1000.0},
+        index=index,
+    )
+
+
+def test_columnar_matches_the_points_format():
+    for interval in ("5m", "1d"):
+        frame = _frame(interval)
+        points = market_service._normalize_chart_points("AAPL", "5d", interval, chart_points(frame, interval))
+
+        columnar = chart_encoding.encode_columnar(chart_encoding.chart_columns(frame, interval))
+
+        assert columnar["count"] == len(points) == len(frame) - 1
+        for name in ("time", "open", "high", "low", "close", "volume"):
+            assert columnar[name] == [point[name] for point in points]
+
+
+def test_binary_round_trips_and_is_smaller_than_json():
+    frame = _frame("5m")
+    columns = chart_encoding.chart_columns(frame, "5m")
+
+    data = chart_encoding.encode_binary(columns)
+    decoded = chart_encoding.decode_binary(data)
+
+    for name in ("time", "open", "high", "low", "close", "volume"):
+        assert decoded[name].tolist() == columns[name].tolist()
+    points = market_service._normalize_chart_points("AAPL", "5d", "5m", chart_points(frame, "5m"))
+    assert len(data) < len(json.dumps(chart_encoding.encode_columnar(columns)))
+    assert len(data) * 2 < len(json.dumps(points))
+
+
+def test_binary_keeps_cents_on_high_priced_tickers():
+    frame = _frame("5m", bars=10)
+    frame[["Open", "High", "Low", "Close"]] += 700_000.0
+    columns = chart_encoding.chart_columns(frame, "5m")
+
+    decoded = chart_encoding.decode_binary(chart_encoding.encode_binary(columns))
+
+    assert decoded["close"].tolist() == columns["close"].tolist()
+    assert decoded["close"][0] == 700_180.0
@@ -0,0 +1,162 @@
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from services import chart_series, market_service
+from services.cache_store import SWRCache
+from services.ohlcv_store import OhlcvStore
+
+
+NY = "America/New_York"
+
+
+def _daily(days=700):
+    index = pd.bdate_range(end=pd.Timestamp.now(tz=NY).normalize(), periods=days, tz=NY, name="Date")
+    close = 100.0 + np.arange(days, dtype=float)
+    return pd.DataFrame(
+        {"Open": close - 0.5, "High": close + 1, "Low": close - 1, "Close": close, "Volume": np.full(days, 10.0)},
+        index=index,
+    )
+
+
+def _intraday(sessions=5):
+    days = pd.bdate_range(end="2026-03-06", periods=sessions, tz=NY)
+    index = pd.DatetimeIndex(
+        [ts for day in days for ts in pd.date_range(day + pd.Timedelta(hours=9, minutes=30), periods=78, freq="5min")],
+        name="Datetime",
+    )
+    close = np.linspace(50.0, 60.0, len(index))
+    return pd.DataFrame(
+        {"Open": close, "High": close + 0.2, "Low": close - 0.2, "Close": close, "Volume": np.full(len(index), 100.0)},
+        index=index,
+    )
+
+
+class _Provider:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, symbol):
+        provider = self
+
+        class _Ticker:
+            def history(self, period=None, interval=None, start=None, **_kwargs):
+                provider.calls.append((period, interval))
+                return _intraday() if interval == "5m" else _daily()
+
+        return _Ticker()
+
+
+def _patch(monkeypatch, tmp_path):
+    provider = _Provider()
+    monkeypatch.setattr(yf, "Ticker", provider)
+    settled = (pd.Timestamp.now(tz=NY).normalize() + pd.Timedelta(days=1, hours=23)).timestamp()
+    monkeypatch.setattr(chart_series, "ohlcv_store", OhlcvStore(str(tmp_path), backfill_days=1830, clock=lambda: settled))
+    monkeypatch.setattr(chart_series, "swr_cache", SWRCache())
+    return provider
+
+
+def test_daily_periods_and_intervals_share_one_canonical_series(monkeypatch, tmp_path):
+    provider = _patch(monkeypatch, tmp_path)
+
+    month, _ = chart_series.get_chart_frame("AAPL", "1mo", "1d")
+    year, _ = chart_series.get_chart_frame("aapl", "1y", "1wk")
+    longer, meta = chart_series.get_chart_frame("AAPL", "5y", "1mo")
+
+    assert provider.calls == [(None, "1d")]
+    assert meta["cached"] is True
+    assert 19 <= len(month) <= 23
+    assert (year.index.dayofweek == 0).all()
+    first_week = _daily().loc[year.index[1]: year.index[1] + pd.Timedelta(days=4)]
+    assert year["Open"].iloc[1] == first_week["Open"].iloc[0]
+    assert year["High"].iloc[1] == first_week["High"].max()
+    assert year["Volume"].iloc[1] == first_week["Volume"].sum()
+    assert (longer.index.day == 1).all()
+
+
+def test_intraday_intervals_are_resampled_from_five_minute_bars(monkeypatch, tmp_path):
+    provider = _patch(monkeypatch, tmp_path)
+
+    today, _ = chart_series.get_chart_frame("AAPL", "1d", "5m")
+    week, _ = chart_series.get_chart_frame("AAPL", "5d", "30m")
+    hourly, _ = chart_series.get_chart_frame("AAPL", "5d", "60m")
+
+    assert provider.calls == [("5d", "5m")]
+    assert len(today) == 78 and today.index[0].date() == pd.Timestamp("2026-03-06").date()
+    assert len(week) == 5 * 13
+    assert hourly.index[0].strftime("%H:%M") == "09:30"
+    assert hourly["Close"].iloc[0] == _intraday()["Close"].iloc[11]
+
+
+def _chart_json(ticker, period, interval, chart_format, since=None):
+    body, meta = market_service.get_chart_body(ticker, period, interval, chart_format, since)
+    return json.loads(body.variants["identity"]), meta
+
+
+def test_unsupported_combinations_keep_their_own_provider_request(monkeypatch, tmp_path):
+    provider = _patch(monkeypatch, tmp_path)
+    monkeypatch.setattr(market_service, "swr_cache", SWRCache())
+
+    assert not chart_series.supports("1d", "1m")
+    assert not chart_series.supports("1mo", "5m")
+    market_service.get_chart_body("AAPL", "1d", "1m", "points")
+
+    assert provider.calls == [("1d", "1m")]
+
+
+def test_intraday_refresh_appends_from_the_last_stored_bar(monkeypatch, tmp_path):
+    _patch(monkeypatch, tmp_path)
+    stored = _intraday()
+    stored.index += pd.Timestamp.now(tz=NY).normalize() - stored.index[-1].normalize()
+    revised = stored.tail(1).assign(Close=70.0)
+    newer = revised.set_axis(revised.index + pd.Timedelta(minutes=5)).assign(Close=71.0)
+    requested = []
+
+    class _Ticker:
+        def history(self, period=None, interval=None, start=None, **_kwargs):
+            requested.append((period, start))
+            return pd.concat([revised, newer])
+
+    monkeypatch.setattr(yf, "Ticker", lambda _symbol: _Ticker())
+
+    refreshed = chart_series._fetch_intraday("AAPL", stored)
+
+    assert requested == [(None, stored.index[-1])]
+    assert len(refreshed) == len(stored) + 1
+    assert refreshed["Close"].iloc[-2:].tolist() == [70.0, 71.0]
+    assert refreshed.index[0] == stored.index[0]
+
+
+def test_since_cursor_returns_the_in_progress_bar_and_newer(monkeypatch, tmp_path):
+    _patch(monkeypatch, tmp_path)
+    monkeypatch.setattr(market_service, "swr_cache", SWRCache())
+
+    full, meta = _chart_json("AAPL", "1d", "5m", "points")
+    delta, delta_meta = _chart_json("AAPL", "1d", "5m", "points", full[-3]["time"])
+    hourly, _ = _chart_json("AAPL", "5d", "60m", "columnar")
+    hourly_delta, _ = _chart_json("AAPL", "5d", "60m", "columnar", hourly["cursor"])
+    caught_up, _ = _chart_json("AAPL", "1d", "5m", "points", meta["cursor"] + 300)
+
+    assert meta["cursor"] == full[-1]["time"]
+    assert delta["bars"] == full[-3:]
+    assert delta["cursor"] == delta_meta["cursor"] == full[-1]["time"]
+    assert hourly_delta["count"] == 1 and hourly_delta["close"] == hourly["close"][-1:]
+    assert caught_up["bars"] == [] and caught_up["cursor"] == meta["cursor"] + 300
+
+
+def test_full_chart_bodies_are_encoded_once_per_series_version(monkeypatch, tmp_path):
+    _patch(monkeypatch, tmp_path)
+    monkeypatch.setattr(market_service, "swr_cache", SWRCache())
+    monkeypatch.setattr(chart_series, "swr_cache", market_service.swr_cache)
+
+    first, meta = market_service.get_chart_body("AAPL", "5d", "30m", "points")
+    again, again_meta = market_service.get_chart_body("AAPL", "5d", "30m", "points")
+    delta, _ = market_service.get_chart_body("AAPL", "5d", "30m", "points", meta["cursor"])
+
+    assert again is first and again_meta["cursor"] == meta["cursor"]
+    assert len(json.loads(first.variants["identity"])) == len(chart_series.get_chart_frame("AAPL", "5d", "30m")[0])
+    assert gzip.decompress(first.variants["gzip"]) == first.variants["identity"]
+    assert len(json.loads(delta.variants["identity"])["bars"]) == 1
@@ -0,0 +1,39 @@
+from fastapi.responses import JSONResponse
+
+from core.encoded_body import EncodedBody
+from services.cache_store import SWRCache
+
+
+def test_json_bytes_match_the_default_response_and_small_bodies_stay_uncompressed():
+    payload = {"ticker": "AAPL", "name": "Société Générale", "chartData": [{"close": 1.5}] * 50}
+
+    body = EncodedBody.from_json(payload)
+    small = EncodedBody.from_json({"ticker": "AAPL"})
+
+    assert body.variants["identity"] == JSONResponse(payload).body
+    assert "gzip" in body.variants
+    assert set(small.variants) == {"identity"}
+
+
+def test_negotiation_honours_q_values_and_falls_back_to_identity():
+    body = EncodedBody.from_bytes(b"x" * 1000, "application/octet-stream")
+
+    assert body.negotiate("gzip, deflate") == "gzip"
+    assert body.negotiate("gzip;q=0, deflate") == "identity"
+    assert body.negotiate("*") in body.variants
+    assert body.negotiate(None) == "identity"
+
+
+def test_cache_encodes_once_at_fill_time():
+    cache = SWRCache()
+    encodes = []
+
+    def _encoder(value):
+        encodes.append(value)
+        return EncodedBody.from_json(value)
+
+    _, first = cache.get_or_fetch("k", lambda: {"a": 1}, ttl_seconds=60, swr_seconds=60, encoder=_encoder)
+    _, second = cache.get_or_fetch("k", lambda: {"a": 2}, ttl_seconds=60, swr_seconds=60, encoder=_encoder)
+
+    assert encodes == [{"a": 1}]
+    assert second["encoded"] is first["encoded"]
@@ -0,0 +1,133 @@
+import json
+import threading
+
+from services import fundamentals_store as store_module
+from services.fundamentals_store import FundamentalsStore, FundamentalsTable
+
+
+def _store(tmp_path, **kwargs):
+    return FundamentalsStore(str(tmp_path), max_versions=kwargs.get("max_versions", 3), max_age_days=3)
+
+
+def _set_today(monkeypatch, value):
+    monkeypatch.setattr(store_module, "_today", lambda: value)
+
+
+def test_versions_are_columnar_and_carry_rows_forward(monkeypatch, tmp_path):
+    store = _store(tmp_path)
+    _set_today(monkeypatch, "2026-10-15")
+    store.put({"AAPL": {"trailingPE": 30.0, "sector": "Technology"}, "MSFT": {"trailingPE": 35.0}})
+    _set_today(monkeypatch, "2026-10-16")
+    store.put({"AAPL": {"trailingPE": 31.0, "sector": "Technology"}})
+
+    payload = json.loads((tmp_path / "2026-10-16.json").read_text())
+    assert payload["tickers"] == ["AAPL", "MSFT"]
+    assert payload["columns"]["trailingPE"] == [31.0, 35.0]
+    assert payload["columns"]["refreshedOn"] == ["2026-10-16", "2026-10-15"]
+    assert store.versions() == ["2026-10-15", "2026-10-16"]
+    assert store.get("aapl")["trailingPE"] == 31.0
+    assert store.get("AAPL", as_of="2026-10-15")["trailingPE"] == 30.0
+    assert store.get("AAPL", as_of="2026-10-01") is None
+    assert FundamentalsStore(str(tmp_path), 3, 3).get("MSFT")["trailingPE"] == 35.0
+
+
+def test_old_versions_are_pruned(monkeypatch, tmp_path):
+    store = _store(tmp_path, max_versions=2)
+    for day in ("2026-10-14", "2026-10-15", "2026-10-16"):
+        _set_today(monkeypatch, day)
+        store.put({"AAPL": {"beta": 1.1}})
+
+    assert store.versions() == ["2026-10-15", "2026-10-16"]
+
+
+def test_get_or_fetch_only_goes_live_for_missing_or_expired_rows(monkeypatch, tmp_path):
+    store = _store(tmp_path)
+    calls = []
+
+    def fetcher(ticker):
+        calls.append(ticker)
+        return {"beta": 1.3}
+
+    first = store.get_or_fetch("nvda", fetcher)
+    second = store.get_or_fetch("NVDA", fetcher)
+
+    assert calls == ["NVDA"]
+    assert first["beta"] == second["beta"] == 1.3
+
+    def failing(ticker):
+        raise RuntimeError("429")
+
+    store.put({"OLD": {"beta": 0.9}})
+    table = store._latest
+    table.columns["refreshedOn"][table.index["OLD"]] = "2020-01-01"
+    assert store.get_or_fetch("OLD", failing)["beta"] == 0.9
+
+
+def test_concurrent_misses_share_one_fetch_and_batches_write_once(monkeypatch, tmp_path):
+    store = _store(tmp_path)
+    calls, saves = [], []
+    release = threading.Event()
+    save = store._save
+    monkeypatch.setattr(store, "_save", lambda table: saves.append(table.as_of) or save(table))
+
+    def slow_fetcher(ticker):
+        calls.append(ticker)
+        release.wait(timeout=5)
+        return {"beta": 1.1}
+
+    threads = [threading.Thread(target=store.get_or_fetch, args=("AAPL", slow_fetcher)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    def fetcher(ticker):
+        if ticker == "BAD":
+            raise RuntimeError("429")
+        return {"beta": 2.0}
+
+    rows = store.get_or_fetch_many(["msft", "GOOG", "BAD", "AAPL"], fetcher, max_workers=4)
+
+    assert calls == ["AAPL"]
+    assert rows["MSFT"]["beta"] == rows["GOOG"]["beta"] == 2.0
+    assert rows["AAPL"]["beta"] == 1.1 and rows["BAD"] is None
+    assert len(saves) == 2
+    assert sorted(json.loads((tmp_path / f"{saves[-1]}.json").read_text())["tickers"]) == ["AAPL", "GOOG", "MSFT"]
+
+
+def test_refresh_runs_in_batches_resumes_and_backs_off_on_failures(monkeypatch, tmp_path):
+    store = _store(tmp_path)
+    _set_today(monkeypatch, "2026-10-17")
+    store.put({"AAPL": {"beta": 1.0}})
+    pauses = []
+
+    class _Stop(threading.Event):
+        def wait(self, timeout=None):
+            pauses.append(timeout)
+            return False
+
+    def fetcher(ticker):
+        if ticker == "BAD":
+            raise RuntimeError("throttled")
+        return {"beta": 2.0}
+
+    summary = store.refresh(["AAPL", "MSFT", "BAD", "NVDA", "AMD"], fetcher, batch_size=2, pause_seconds=1.0, stop_event=_Stop())
+
+    assert summary["requested"] == 4  # AAPL was already refreshed today
+    assert summary["refreshed"] == 3
+    assert summary["failed"] == ["BAD"]
+    assert pauses == [2.0]
+    assert store.refreshed_today()
+    assert store.get("AMD")["beta"] == 2.0
+
+
+def test_priced_info_reprices_multiples_and_omits_missing_fields():
+    row = FundamentalsTable("2026-10-17", ["AAPL"], {"trailingEps": [5.0], "trailingPE": [20.0], "refreshedOn": ["2026-10-16"]}).row("AAPL")
+
+    info = store_module.priced_info(row, 110.0, 100.0)
+
+    assert info["trailingPE"] == 22.0
+    assert info["regularMarketPreviousClose"] == 100.0
+    assert info["fundamentalsAsOf"] == "2026-10-16"
+    assert "beta" not in info
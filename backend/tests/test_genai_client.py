@@ -0,0 +1,142 @@
+import asyncio
+import dataclasses
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from core import genai_client, llm_latency
+from core.llm_latency import LatencyTracker
+from core.llm_scheduler import LLMScheduler
+
+
+def _settings(**overrides):
+    return dataclasses.replace(
+        genai_client.settings,
+        gemini_model_fast="fast-model",
+        gemini_model_strong="strong-model",
+        **overrides,
+    )
+
+
+class _FakeModels:
+    def __init__(self, delay=0.0, delays=None):
+        self.delays = list(delays or [])
+        self.delay = delay
+        self.calls = []
+
+    async def generate_content(self, model, contents, config):
+        self.calls.append((model, config))
+        call_number = len(self.calls)
+        await asyncio.sleep(self.delays.pop(0) if self.delays else self.delay)
+        return SimpleNamespace(text=f" answer {call_number} from {model} ")
+
+
+def _fake_client(models):
+    return SimpleNamespace(aio=SimpleNamespace(models=models))
+
+
+def test_roles_route_to_fast_and_strong_models(monkeypatch):
+    monkeypatch.setattr(genai_client, "settings", _settings())
+
+    assert {genai_client.route_for(role).model for role in ("bull", "bear", "quant", "chat")} == {"fast-model"}
+    assert genai_client.route_for("cio").model == "strong-model"
+    assert genai_client.route_for(None).model == genai_client.MODEL_NAME
+
+
+def test_generate_text_applies_route_model_and_output_cap(monkeypatch):
+    models = _FakeModels()
+    monkeypatch.setattr(genai_client, "settings", _settings(llm_max_output_tokens_cio=321))
+    monkeypatch.setattr(genai_client, "get_client", lambda: _fake_client(models))
+
+    text = asyncio.run(genai_client.generate_text("prompt", role="cio"))
+
+    assert text == "answer 1 from strong-model"
+    model, config = models.calls[0]
+    assert model == "strong-model"
+    assert config.max_output_tokens == 321
+
+
+def test_generate_text_enforces_role_timeout(monkeypatch):
+    models = _FakeModels(delay=0.5)
+    monkeypatch.setattr(genai_client, "settings", _settings(llm_timeout_seconds_chat=0.05))
+    monkeypatch.setattr(genai_client, "get_client", lambda: _fake_client(models))
+
+    with pytest.raises(TimeoutError, match="chat call"):
+        asyncio.run(genai_client.generate_text("prompt", role="chat", max_retries=1))
+
+
+def test_latency_tracker_percentiles_and_adaptive_deadline(monkeypatch):
+    monkeypatch.setattr(
+        llm_latency,
+        "settings",
+        dataclasses.replace(llm_latency.settings, llm_attempt_timeout_floor_seconds=1.0, llm_attempt_timeout_p99_multiplier=2.0),
+    )
+    tracker = LatencyTracker(window=100, min_samples=10)
+    assert tracker.percentile("cio", 0.9) is None
+    assert tracker.attempt_timeout("cio", 30.0) == 30.0
+
+    for seconds in range(1, 11):
+        tracker.observe("cio", float(seconds))
+
+    assert tracker.percentile("cio", 0.9) == 9.0
+    assert tracker.attempt_timeout("cio", 30.0) == 20.0
+    assert tracker.attempt_timeout("cio", 12.0) == 12.0
+
+
+def test_slow_call_is_hedged_and_first_answer_wins(monkeypatch):
+    tracker = LatencyTracker(window=50, min_samples=5)
+    for _ in range(5):
+        tracker.observe("chat:fast-model:response", 0.05)
+    models = _FakeModels(delays=[2.0, 0.01])
+    monkeypatch.setattr(genai_client, "settings", _settings(llm_timeout_seconds_chat=5.0))
+    monkeypatch.setattr(genai_client, "llm_latency", tracker)
+    monkeypatch.setattr(llm_latency, "settings", _settings(llm_hedge_enabled=True, llm_attempt_timeout_floor_seconds=3.0))
+    monkeypatch.setattr(genai_client, "get_client", lambda: _fake_client(models))
+
+    started = time.perf_counter()
+    text = asyncio.run(genai_client.generate_text("prompt", role="chat"))
+
+    assert text == "answer 2 from fast-model"
+    assert len(models.calls) == 2
+    assert time.perf_counter() - started < 1.0
+
+
+def test_hedge_is_not_reported_when_no_duplicate_was_started():
+    calls = []
+
+    async def _call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    result, hedged = asyncio.run(
+        genai_client._race_with_hedge(_call, timeout=1.0, hedge_after=0.01, hedge_allowed=lambda: False)
+    )
+
+    assert (result, hedged) == ("answer", False)
+    assert len(calls) == 1
+
+
+def test_queue_wait_does_not_consume_the_attempt_deadline(monkeypatch):
+    tracker = LatencyTracker(window=50, min_samples=5)
+    for _ in range(5):
+        tracker.observe("chat:fast-model:response", 0.01)
+    scheduler = LLMScheduler(max_concurrency=1, max_queue_depth=10)
+    models = _FakeModels(delay=0.01)
+    monkeypatch.setattr(genai_client, "settings", _settings(llm_timeout_seconds_chat=2.0))
+    monkeypatch.setattr(genai_client, "llm_latency", tracker)
+    monkeypatch.setattr(genai_client, "llm_scheduler", scheduler)
+    monkeypatch.setattr(llm_latency, "settings", _settings(llm_hedge_enabled=False, llm_attempt_timeout_floor_seconds=0.05))
+    monkeypatch.setattr(genai_client, "get_client", lambda: _fake_client(models))
+
+    async def _saturated():
+        release = await scheduler.acquire()
+        asyncio.get_running_loop().call_later(0.3, release)
+        return await asyncio.gather(*(genai_client.generate_text("prompt", role="chat") for _ in range(3)))
+
+    texts = asyncio.run(_saturated())
+
+    assert len(texts) == 3
+    assert len(models.calls) == 3
+    assert scheduler.metrics()["queued"] == 3
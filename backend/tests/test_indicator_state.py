@@ -0,0 +1,98 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from services import indicators
+from services.indicator_state import WARMUP_BARS, IndicatorState, IndicatorStateStore
+
+FIELDS = ("close", "sma50", "sma200", "rsi14", "macd", "macd_signal", "volume_avg20", "high14", "low14")
+
+
+def _history(bars=320, seed=11):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1.5, bars))
+    index = pd.date_range(end="2026-03-10", periods=bars, freq="B", name="Date")
+    return pd.DataFrame(
+        {
+            "Open": close,
+            "High": close + rng.uniform(0.1, 2.0, bars),
+            "Low": close - rng.uniform(0.1, 2.0, bars),
+            "Close": close,
+            "Volume": rng.integers(1_000_000, 5_000_000, bars).astype(float),
+        },
+        index=index,
+    )
+
+
+def _batch(hist):
+    return indicators.latest_technicals(
+        hist["Close"].to_numpy(), hist["High"].to_numpy(), hist["Low"].to_numpy(), hist["Volume"].to_numpy()
+    )
+
+
+def _assert_matches(actual, expected):
+    for field in FIELDS:
+        assert np.isclose(getattr(actual, field), getattr(expected, field), equal_nan=True), field
+
+
+def test_incremental_updates_match_batch_engine():
+    hist = _history()
+    state = IndicatorState("TEST")
+    for ts, row in hist.iterrows():
+        state.append(int(ts.timestamp()), row["High"], row["Low"], row["Close"], row["Volume"])
+        if state.bars in (5, 60, 250, len(hist)):
+            _assert_matches(state.latest(), _batch(hist.iloc[: state.bars]))
+
+
+def test_state_round_trips_through_json():
+    hist = _history(bars=240)
+    state = IndicatorState("TEST")
+    for ts, row in hist.iloc[:-1].iterrows():
+        state.append(int(ts.timestamp()), row["High"], row["Low"], row["Close"], row["Volume"])
+
+    restored = IndicatorState.from_dict(json.loads(json.dumps(state.to_dict())))
+    last = hist.iloc[-1]
+
+    _assert_matches(
+        restored.preview(last["High"], last["Low"], last["Close"], last["Volume"]),
+        _batch(hist),
+    )
+
+
+def test_store_appends_only_new_bars_and_survives_restart(tmp_path):
+    hist = _history()
+    store = IndicatorStateStore(str(tmp_path))
+    _assert_matches(store.technicals("test", hist.iloc[:-3]), _batch(hist.iloc[:-3]))
+
+    restarted = IndicatorStateStore(str(tmp_path))
+    _assert_matches(restarted.technicals("TEST", hist), _batch(hist))
+    # Built from the warm-up window, then advanced by the three newly completed bars only.
+    assert restarted._states["TEST"].bars == WARMUP_BARS + 3
+
+
+def test_store_rebuilds_after_split_adjustment(tmp_path):
+    hist = _history()
+    store = IndicatorStateStore(str(tmp_path))
+    store.technicals("TEST", hist)
+
+    adjusted = hist.copy()
+    adjusted[["Open", "High", "Low", "Close"]] /= 4
+
+    _assert_matches(store.technicals("TEST", adjusted), _batch(adjusted))
+
+
+def test_state_does_not_depend_on_the_history_it_was_first_built_from(tmp_path):
+    hist = _history(bars=900)
+    window = hist.iloc[-400:]
+    long_seed = IndicatorStateStore(str(tmp_path / "long"))
+    short_seed = IndicatorStateStore(str(tmp_path / "short"))
+    long_seed.technicals("TEST", hist.iloc[:-5])
+    short_seed.technicals("TEST", window.iloc[:-5])
+
+    from_long = long_seed.technicals("TEST", window)
+    from_short = short_seed.technicals("TEST", window)
+
+    _assert_matches(from_long, _batch(window))
+    _assert_matches(from_short, _batch(window))
+    assert long_seed._states["TEST"].bars == short_seed._states["TEST"].bars == WARMUP_BARS + 5
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+from services import indicators
+
+
+def _random_walk(seed, bars=300):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1.5, bars))
+    high = close + rng.uniform(0.1, 2.0, bars)
+    low = close - rng.uniform(0.1, 2.0, bars)
+    volume = rng.integers(1_000_000, 5_000_000, bars).astype(float)
+    return close, high, low, volume
+
+
+def _pandas_reference(close, high, low, volume):
+    close_s, high_s, low_s, volume_s = (pd.Series(values) for values in (close, high, low, volume))
+    delta = close_s.diff()
+    gain = delta.where(delta > 0, 0).rolling(14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+    macd = close_s.ewm(span=12, adjust=False).mean() - close_s.ewm(span=26, adjust=False).mean()
+    return {
+        "sma50": close_s.rolling(50).mean(),
+        "sma200": close_s.rolling(200).mean(),
+        "rsi": 100 - (100 / (1 + gain / loss)),
+        "macd": macd,
+        "macd_signal": macd.ewm(span=9, adjust=False).mean(),
+        "volume_avg20": volume_s.rolling(20).mean(),
+        "high14": high_s.rolling(14).max(),
+        "low14": low_s.rolling(14).min(),
+    }
+
+
+def test_series_indicators_match_pandas_formulas():
+    close, high, low, volume = _random_walk(7, bars=700)
+    reference = _pandas_reference(close, high, low, volume)
+    macd_line, signal_line = indicators.macd(close)
+
+    np.testing.assert_allclose(indicators.sma(close, 50), reference["sma50"], equal_nan=True)
+    np.testing.assert_allclose(indicators.sma(close, 200), reference["sma200"], equal_nan=True)
+    np.testing.assert_allclose(indicators.rsi(close, 14), reference["rsi"], equal_nan=True)
+    np.testing.assert_allclose(macd_line, reference["macd"], rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(signal_line, reference["macd_signal"], rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(indicators.rolling_max(high, 14), reference["high14"], equal_nan=True)
+    np.testing.assert_allclose(indicators.rolling_min(low, 14), reference["low14"], equal_nan=True)
+
+
+def test_latest_technicals_batch_matches_single_series():
+    series = [_random_walk(seed) for seed in range(4)]
+    batch = [np.vstack([item[column] for item in series]) for column in range(4)]
+
+    snapshot = indicators.latest_technicals(*batch)
+
+    for row, (close, high, low, volume) in enumerate(series):
+        reference = _pandas_reference(close, high, low, volume)
+        for field in ("sma50", "sma200", "macd", "macd_signal", "volume_avg20", "high14", "low14"):
+            assert np.isclose(getattr(snapshot, field)[row], reference[field].iloc[-1])
+        assert np.isclose(snapshot.rsi14[row], reference["rsi"].iloc[-1])
+
+
+def test_short_history_yields_nan_warmup_values():
+    close, high, low, volume = _random_walk(3, bars=40)
+
+    snapshot = indicators.latest_technicals(close, high, low, volume)
+
+    assert np.isnan(snapshot.sma50) and np.isnan(snapshot.sma200)
+    assert not np.isnan(snapshot.rsi14)
+    assert np.isnan(indicators.williams_r(high[:5], low[:5], close[:5])).all()
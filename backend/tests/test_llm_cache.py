@@ -0,0 +1,56 @@
+import asyncio
+
+import analysis_engine
+from core import llm_cache
+from core.llm_cache import LLMResponseCache
+
+
+def test_cache_expires_and_evicts_least_recently_used(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: clock[0])
+    cache = LLMResponseCache(max_entries=2, ttl_seconds=60)
+    keys = [LLMResponseCache.key("model", 1, f"prompt {index}") for index in range(3)]
+
+    cache.set(keys[0], "zero")
+    cache.set(keys[1], "one")
+    assert cache.get(keys[0]) == "zero"
+    cache.set(keys[2], "two")
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == "zero"
+    clock[0] += 61
+    assert cache.get(keys[2]) is None
+
+    metrics = cache.metrics()
+    assert (metrics["hits"], metrics["misses"], metrics["evictions"], metrics["expired"]) == (2, 2, 1, 1)
+
+
+def test_key_changes_with_model_and_template_version():
+    base = LLMResponseCache.key("flash", 1, "prompt")
+
+    assert base == LLMResponseCache.key("flash", 1, "prompt")
+    assert base != LLMResponseCache.key("pro", 1, "prompt")
+    assert base != LLMResponseCache.key("flash", 2, "prompt")
+
+
+def test_debate_agent_reuses_cached_reply(monkeypatch):
+    calls = []
+
+    async def fake_stream_text(prompt, role=None, max_retries=3):
+        calls.append(role)
+        for delta in ("Strong ", "moat."):
+            yield delta
+
+    monkeypatch.setattr(analysis_engine, "llm_response_cache", LLMResponseCache(max_entries=8, ttl_seconds=60))
+    monkeypatch.setattr(analysis_engine, "stream_text", fake_stream_text)
+
+    async def run_twice():
+        first = [delta async for delta in analysis_engine._stream_agent_async("bull prompt", role="bull")]
+        second = [delta async for delta in analysis_engine._stream_agent_async("bull prompt", role="bull")]
+        return first, second
+
+    first, second = asyncio.run(run_twice())
+
+    assert first == ["Strong ", "moat."]
+    assert second == ["Strong moat."]
+    assert calls == ["bull"]
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from core.errors import ApiError
+from core.llm_scheduler import LLMPriority, LLMScheduler, llm_priority
+
+
+def test_waiters_are_served_by_priority_then_arrival():
+    scheduler = LLMScheduler(max_concurrency=1, max_queue_depth=10)
+    order = []
+
+    async def job(name, priority):
+        release = await scheduler.acquire(priority)
+        order.append(name)
+        await asyncio.sleep(0.01)
+        release()
+
+    async def scenario():
+        release = await scheduler.acquire(LLMPriority.LIVE)
+        tasks = [
+            asyncio.create_task(job("batch-1", LLMPriority.BATCH)),
+            asyncio.create_task(job("live-1", LLMPriority.LIVE)),
+            asyncio.create_task(job("chat-1", LLMPriority.CHAT)),
+            asyncio.create_task(job("batch-2", LLMPriority.BATCH)),
+        ]
+        await asyncio.sleep(0.01)
+        assert scheduler.metrics()["queueDepthByPriority"] == {"chat": 1, "live": 1, "batch": 2}
+        release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert order == ["chat-1", "live-1", "batch-1", "batch-2"]
+
+
+def test_full_queue_sheds_or_displaces_lower_priority():
+    scheduler = LLMScheduler(max_concurrency=1, max_queue_depth=1)
+
+    async def scenario():
+        release = await scheduler.acquire(LLMPriority.LIVE)
+        batch = asyncio.create_task(scheduler.acquire(LLMPriority.BATCH))
+        await asyncio.sleep(0)
+
+        with pytest.raises(ApiError) as shed:
+            await scheduler.acquire(LLMPriority.BATCH)
+        assert shed.value.code == "LLM_OVERLOADED"
+
+        chat = asyncio.create_task(scheduler.acquire(LLMPriority.CHAT))
+        await asyncio.sleep(0)
+        with pytest.raises(ApiError):
+            await batch
+
+        release()
+        (await chat)()
+        return scheduler.metrics()
+
+    metrics = asyncio.run(scenario())
+    assert metrics["displaced"] == 1
+    assert metrics["active"] == 0
+    assert metrics["queueDepth"] == 0
+
+
+def test_priority_context_applies_to_nested_tasks():
+    scheduler = LLMScheduler(max_concurrency=1, max_queue_depth=10)
+
+    async def scenario():
+        release = await scheduler.acquire()
+        with llm_priority(LLMPriority.BATCH):
+            waiter = asyncio.create_task(scheduler.acquire())
+        await asyncio.sleep(0)
+        depth = scheduler.metrics()["queueDepthByPriority"]
+        release()
+        (await waiter)()
+        return depth
+
+    assert asyncio.run(scenario())["batch"] == 1
@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from services import macro_service
+from services.cache_store import SWRCache
+
+
+class _FakeTicker:
+    calls = []
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def history(self, period):
+        _FakeTicker.calls.append(self.symbol)
+        closes = {"^VIX": [19.0, 21.37], "^IRX": [5.2, 5.25, 4.9]}[self.symbol]
+        return pd.DataFrame({"Close": closes})
+
+
+def test_macro_snapshot_burst_costs_one_fetch(monkeypatch):
+    _FakeTicker.calls = []
+    monkeypatch.setattr(macro_service.yf, "Ticker", _FakeTicker)
+    monkeypatch.setattr(macro_service, "swr_cache", SWRCache())
+
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        results = list(pool.map(lambda _i: macro_service.get_macro_snapshot(), range(50)))
+
+    snapshot, _meta = results[0]
+    assert _FakeTicker.calls == ["^VIX", "^IRX"]
+    assert all(result[0] is snapshot for result in results)
+    assert snapshot.to_payload() == {
+        "VIX_Level": 21.37,
+        "Federal_Funds_Rate_Trend": "Falling",
+        "US_GDP_Expectation_pct": 2.0,
+    }
+
+
+def test_macro_snapshot_falls_back_when_provider_fails(monkeypatch):
+    def _broken_ticker(_symbol):
+        raise RuntimeError("provider down")
+
+    monkeypatch.setattr(macro_service.yf, "Ticker", _broken_ticker)
+    monkeypatch.setattr(macro_service, "swr_cache", SWRCache())
+
+    snapshot, meta = macro_service.get_macro_snapshot()
+    staleness = snapshot.staleness(meta)
+
+    assert snapshot.vix_level == macro_service.DEFAULT_VIX_LEVEL
+    assert snapshot.federal_funds_rate_trend == "Stable"
+    assert staleness["sources"]["VIX_Level"] == "fallback"
+    assert staleness["stale"] is False
@@ -0,0 +1,178 @@
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+import analysis_engine
+from services import chart_series, market_data, market_service
+from services.cache_store import SWRCache
+from services.fundamentals_store import FundamentalsStore
+from services.ohlcv_store import OhlcvStore
+
+
+# Bars end on the latest weekday; the store clock sits after the following close, so stored bars are settled.
+_LAST_BAR = pd.bdate_range(end=pd.Timestamp.now(tz="America/New_York").normalize(), periods=1, tz="America/New_York")[0]
+_SETTLED_AT = (_LAST_BAR + pd.Timedelta(days=1, hours=23)).timestamp()
+
+
+def _daily_history(days=260):
+    index = pd.date_range(end=_LAST_BAR, periods=days, freq="B", tz="America/New_York", name="Date")
+    close = np.linspace(100.0, 140.0, days)
+    return pd.DataFrame(
+        {
+            "Open": close - 1,
+            "High": close + 2,
+            "Low": close - 2,
+            "Close": close,
+            "Volume": np.full(days, 1_000_000),
+        },
+        index=index,
+    )
+
+
+class _FakeTicker:
+    calls = []
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    @property
+    def info(self):
+        _FakeTicker.calls.append(("info", self.symbol))
+        return {"shortName": "Apple Inc.", "currentPrice": 140.0, "marketCap": 3_000_000_000_000}
+
+    @property
+    def fast_info(self):
+        return {"lastPrice": 140.0, "previousClose": 139.0}
+
+    def history(self, **kwargs):
+        _FakeTicker.calls.append(("history", self.symbol, kwargs.get("period"), kwargs.get("interval")))
+        return _daily_history()
+
+
+def _patch_provider(monkeypatch, tmp_path):
+    _FakeTicker.calls = []
+    store = OhlcvStore(str(tmp_path / "ohlcv"), backfill_days=1830, clock=lambda: _SETTLED_AT)
+    monkeypatch.setattr(market_data, "fundamentals_store", FundamentalsStore(str(tmp_path / "fundamentals"), 3, 3))
+    monkeypatch.setattr(market_data, "ohlcv_store", store)
+    monkeypatch.setattr(analysis_engine, "ohlcv_store", store)
+    monkeypatch.setattr(chart_series, "ohlcv_store", store)
+    monkeypatch.setattr(chart_series, "swr_cache", SWRCache())
+    monkeypatch.setattr(yf, "Ticker", _FakeTicker)
+    monkeypatch.setattr(market_data, "swr_cache", SWRCache())
+    monkeypatch.setattr(market_service, "swr_cache", SWRCache())
+    monkeypatch.setattr(market_data, "in_session", lambda _now: False)
+
+
+def test_snapshot_serves_quick_stats_and_daily_chart_from_one_fetch(monkeypatch, tmp_path):
+    _patch_provider(monkeypatch, tmp_path)
+
+    stats = market_service._fetch_quick_stats("aapl")
+    chart, _ = chart_series.get_chart_frame("AAPL", "6mo", "1d")
+    market_data.get_market_snapshot("AAPL")
+
+    assert stats["price"] == 140.0
+    assert 18 <= stats["metadata"]["historyPoints"] <= 23
+    assert 120 <= len(chart) <= 135
+    assert _FakeTicker.calls == [("info", "AAPL"), ("history", "AAPL", None, "1d")]
+
+
+def test_intraday_charts_come_from_the_canonical_intraday_series(monkeypatch, tmp_path):
+    _patch_provider(monkeypatch, tmp_path)
+
+    market_service.get_chart_body("AAPL", "1d", "5m", "points")
+    market_service.get_chart_body("AAPL", "1m", "1m", "points")
+
+    assert _FakeTicker.calls == [("history", "AAPL", "5d", "5m"), ("history", "AAPL", "1m", "1m")]
+
+
+def test_history_for_period_rejects_windows_longer_than_snapshot():
+    snapshot = market_data.MarketDataSnapshot(ticker="AAPL", info={}, fast_info={}, history=_daily_history())
+
+    assert snapshot.history_for_period("5y") is None
+    assert len(snapshot.history_for_period("5d")) == 5
+
+
+def test_prime_market_snapshots_seeds_cache_from_one_bulk_download(monkeypatch, tmp_path):
+    _patch_provider(monkeypatch, tmp_path)
+    downloads = []
+
+    def fake_download(symbols, **kwargs):
+        downloads.append(list(symbols))
+        return pd.concat({symbol: _daily_history() for symbol in symbols}, axis=1)
+
+    monkeypatch.setattr(yf, "download", fake_download)
+
+    primed = market_data.prime_market_snapshots(["msft", "AAPL"])
+    snapshot, meta = market_data.get_market_snapshot("MSFT")
+
+    assert downloads == [["AAPL", "MSFT"]]
+    assert set(primed) == {"AAPL", "MSFT"}
+    assert snapshot is primed["MSFT"]
+    assert (meta["cached"], meta["stale"]) == (True, False)
+    assert len(snapshot.history) == 260
+    assert not [call for call in _FakeTicker.calls if call[0] == "history"]
+
+
+def test_prime_market_snapshots_skips_tickers_missing_from_the_bulk_download(monkeypatch, tmp_path):
+    _patch_provider(monkeypatch, tmp_path)
+
+    def fake_download(symbols, **kwargs):
+        empty = _daily_history().iloc[:0].reindex(_daily_history().index)
+        return pd.concat({"AAPL": _daily_history(), "MSFT": empty}, axis=1)
+
+    monkeypatch.setattr(yf, "download", fake_download)
+
+    primed = market_data.prime_market_snapshots(["AAPL", "MSFT"])
+    snapshot, meta = market_data.get_market_snapshot("MSFT")
+
+    assert set(primed) == {"AAPL"}
+    assert meta["cached"] is False
+    assert len(snapshot.history) == 260
+    assert ("history", "MSFT", None, "1d") in _FakeTicker.calls
+
+
+def test_snapshot_reads_fundamentals_from_store_instead_of_live_info(monkeypatch, tmp_path):
+    _patch_provider(monkeypatch, tmp_path)
+    market_data.fundamentals_store.put(
+        {"AAPL": {"shortName": "Apple Inc.", "trailingEps": 7.0, "sharesOutstanding": 15_000_000_000, "beta": 1.2}}
+    )
+
+    snapshot, _ = market_data.get_market_snapshot("AAPL")
+
+    assert _FakeTicker.calls == [("history", "AAPL", None, "1d")]
+    assert snapshot.info["currentPrice"] == 140.0
+    assert snapshot.info["trailingPE"] == 20.0
+    assert snapshot.info["marketCap"] == 2_100_000_000_000
+    assert "pegRatio" not in snapshot.info
+
+
+class _QuotingTicker(_FakeTicker):
+    @property
+    def fast_info(self):
+        _FakeTicker.calls.append(("fast_info", self.symbol))
+        return {"lastPrice": 142.5, "previousClose": 140.0}
+
+
+def test_snapshot_prices_off_the_live_quote_during_a_session(monkeypatch, tmp_path):
+    _patch_provider(monkeypatch, tmp_path)
+    monkeypatch.setattr(yf, "Ticker", _QuotingTicker)
+    monkeypatch.setattr(market_data, "in_session", lambda _now: True)
+
+    snapshot, _ = market_data.get_market_snapshot("AAPL")
+    stats = market_service._fetch_quick_stats("AAPL")
+
+    assert snapshot.fast_info == {"lastPrice": 142.5, "previousClose": 140.0}
+    assert snapshot.info["currentPrice"] == 142.5
+    assert stats["price"] == 142.5
+    assert ("fast_info", "AAPL") in _FakeTicker.calls
+
+
+def test_snapshot_prices_off_the_last_bar_outside_a_session(monkeypatch, tmp_path):
+    _patch_provider(monkeypatch, tmp_path)
+    monkeypatch.setattr(yf, "Ticker", _QuotingTicker)
+
+    snapshot, _ = market_data.get_market_snapshot("AAPL")
+
+    assert snapshot.fast_info == {}
+    assert snapshot.info["currentPrice"] == 140.0
+    assert ("fast_info", "AAPL") not in _FakeTicker.calls
@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from services.ohlcv_store import OhlcvStore, is_settled
+
+
+NY = "America/New_York"
+
+
+def _bars(start, days, scale=1.0):
+    index = pd.bdate_range(start=start, periods=days, tz=NY, name="Date")
+    close = (100.0 + np.arange(days)) * scale
+    return pd.DataFrame(
+        {"Open": close, "High": close + 1, "Low": close - 1, "Close": close, "Volume": np.full(days, 1_000.0)},
+        index=index,
+    )
+
+
+def _ts(value):
+    return pd.Timestamp(value, tz=NY).timestamp()
+
+
+class _Provider:
+    def __init__(self, frame):
+        self.frame = frame
+        self.starts = []
+
+    def __call__(self, symbol):
+        provider = self
+
+        class _Ticker:
+            def history(self, start=None, interval=None, **_kwargs):
+                provider.starts.append(start)
+                frame = provider.frame
+                return frame[frame.index >= pd.Timestamp(start, tz=NY)]
+
+        return _Ticker()
+
+
+def test_settled_series_is_served_from_disk_without_provider_calls(monkeypatch, tmp_path):
+    provider = _Provider(_bars("2026-01-05", 40))
+    monkeypatch.setattr(yf, "Ticker", provider)
+    saturday = _ts("2026-03-07 12:00")
+
+    first = OhlcvStore(str(tmp_path), backfill_days=0, clock=lambda: saturday).daily("aapl", "2026-01-01")
+    reloaded = OhlcvStore(str(tmp_path), backfill_days=0, clock=lambda: saturday).daily("AAPL", "2026-02-01")
+
+    assert provider.starts == ["2026-01-01"]
+    assert len(first) == 40
+    expected = first[first.index >= pd.Timestamp("2026-02-01", tz=NY)]
+    pd.testing.assert_frame_equal(reloaded, expected, check_freq=False, check_index_type=False)
+
+
+def test_open_session_fetches_only_the_tail_from_the_last_final_bar(monkeypatch, tmp_path):
+    provider = _Provider(_bars("2026-01-05", 40))
+    monkeypatch.setattr(yf, "Ticker", provider)
+    now = [_ts("2026-02-27 18:00")]
+    store = OhlcvStore(str(tmp_path), backfill_days=0, clock=lambda: now[0])
+    store.daily("AAPL", "2026-01-01")
+
+    provider.frame = _bars("2026-01-05", 41)
+    now[0] = _ts("2026-03-02 11:00")
+    hist = store.daily("AAPL", "2026-01-01")
+
+    assert provider.starts == ["2026-01-01", "2026-02-26"]
+    assert len(hist) == 41
+    assert store.metrics()["deltas"] == 1
+
+
+def test_reads_within_one_session_share_a_delta_until_the_refresh_interval(monkeypatch, tmp_path):
+    provider = _Provider(_bars("2026-01-05", 41))
+    monkeypatch.setattr(yf, "Ticker", provider)
+    now = [_ts("2026-03-02 10:00")]
+    store = OhlcvStore(str(tmp_path), backfill_days=0, clock=lambda: now[0], session_refresh_seconds=900)
+    store.daily("AAPL", "2026-01-01")
+
+    now[0] = _ts("2026-03-02 10:10")
+    store.daily("AAPL", "2026-01-01")
+    store.daily_many(["AAPL"], "2026-01-01")
+    now[0] = _ts("2026-03-02 10:20")
+    store.daily("AAPL", "2026-01-01")
+
+    assert provider.starts == ["2026-01-01", "2026-02-27"]
+    assert store.metrics()["hits"] == 2
+
+
+def test_readjusted_history_is_refetched_in_full(monkeypatch, tmp_path):
+    provider = _Provider(_bars("2026-01-05", 40))
+    monkeypatch.setattr(yf, "Ticker", provider)
+    now = [_ts("2026-02-27 18:00")]
+    store = OhlcvStore(str(tmp_path), backfill_days=0, clock=lambda: now[0])
+    store.daily("AAPL", "2026-01-01")
+
+    provider.frame = _bars("2026-01-05", 41, scale=0.5)  # e.g. a 2:1 split
+    now[0] = _ts("2026-03-02 11:00")
+    hist = store.daily("AAPL", "2026-01-01")
+
+    assert provider.starts == ["2026-01-01", "2026-02-26", "2026-01-01"]
+    assert hist["Close"].iloc[0] == 50.0
+    assert store.metrics()["rebuilds"] == 1
+
+
+def test_is_settled_waits_for_the_close_to_settle():
+    friday_close_fetch = _ts("2026-03-06 16:05")
+    assert not is_settled(friday_close_fetch, _ts("2026-03-07 12:00"))
+    assert is_settled(_ts("2026-03-06 17:00"), _ts("2026-03-08 12:00"))
+    assert not is_settled(_ts("2026-03-08 12:00"), _ts("2026-03-09 10:00"))
+
+
+def test_daily_many_serves_symbols_from_the_one_bulk_download(monkeypatch, tmp_path):
+    provider = _Provider(_bars("2026-01-05", 40))
+    monkeypatch.setattr(yf, "Ticker", provider)
+    bars = _bars("2026-01-05", 40)
+    monkeypatch.setattr(
+        yf, "download", lambda *_args, **_kwargs: pd.concat({"AAPL": bars, "MSFT": bars.iloc[:0].reindex(bars.index)}, axis=1)
+    )
+    store = OhlcvStore(str(tmp_path), backfill_days=0, clock=lambda: _ts("2026-03-07 12:00"))
+
+    frames = store.daily_many(["AAPL", "MSFT"], "2026-01-01")
+
+    assert len(frames["AAPL"]) == 40
+    assert frames["MSFT"].empty
+    assert provider.starts == []
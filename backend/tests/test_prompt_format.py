@@ -0,0 +1,44 @@
+import json
+
+import numpy as np
+
+from core.prompt_format import PromptMetrics, compact_json, estimate_tokens
+
+
+def test_compact_json_minifies_rounds_and_drops_nulls():
+    payload = {
+        "P_E_Ratio": 31.456789,
+        "ROE_pct": None,
+        "Sector_P_E_Median": 25.0,
+        "RSI": np.float64(61.23456),
+        "Beta": float("nan"),
+        "Headlines": ["a", None, "b"],
+        "Nested": {"Debt_to_Equity": 1.5, "Missing": None},
+    }
+
+    rendered = compact_json(payload, aliases={"P_E_Ratio": "PE", "Debt_to_Equity": "D_E"})
+
+    assert " " not in rendered
+    assert json.loads(rendered) == {
+        "PE": 31.46,
+        "Sector_P_E_Median": 25,
+        "RSI": 61.23,
+        "Headlines": ["a", "b"],
+        "Nested": {"D_E": 1.5},
+    }
+    assert len(rendered) < len(json.dumps(payload, indent=2, default=str)) / 2
+
+
+def test_prompt_metrics_tracks_chars_and_tokens_per_role():
+    metrics = PromptMetrics()
+    metrics.record_prompt("bull", "x" * 400)
+    metrics.record_prompt("bull", "x" * 200)
+    metrics.record_usage("bull", prompt_tokens=90, output_tokens=30)
+
+    report = metrics.snapshot()["bull"]
+
+    assert report["prompts"] == 2
+    assert report["avgChars"] == 300
+    assert report["maxChars"] == 400
+    assert report["avgEstimatedTokens"] == estimate_tokens("x" * 300)
+    assert (report["calls"], report["avgPromptTokens"], report["avgOutputTokens"]) == (1, 90, 30)
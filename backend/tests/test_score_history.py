@@ -0,0 +1,108 @@
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import analysis_engine
+from core.errors import ApiError
+from services.macro_service import MacroSnapshot
+from services.market_data import MarketDataSnapshot
+from services.ohlcv_store import OhlcvStore
+
+
+def _history(days=520):
+    index = pd.date_range(end="2026-03-10", periods=days, freq="B", tz="America/New_York", name="Date")
+    steps = np.random.default_rng(7).normal(0.0, 1.5, days)
+    close = 120.0 + np.cumsum(steps)
+    volume = np.random.default_rng(11).integers(800_000, 1_200_000, days).astype(float)
+    return pd.DataFrame(
+        {"Open": close - 0.5, "High": close + 1.5, "Low": close - 1.5, "Close": close, "Volume": volume},
+        index=index,
+    )
+
+
+def _info(hist):
+    return {
+        "shortName": "Apple Inc.",
+        "currentPrice": float(hist["Close"].iloc[-1]),
+        "marketCap": 3_000_000_000_000,
+        "trailingPE": 31.0,
+        "returnOnEquity": 0.28,
+        "debtToEquity": 145.0,
+        "freeCashflow": 95_000_000_000,
+        "earningsQuarterlyGrowth": 0.11,
+        "beta": 1.2,
+    }
+
+
+def _patch_sources(monkeypatch, tmp_path, hist, vix):
+    snapshot = MarketDataSnapshot(ticker="AAPL", info=_info(hist), fast_info={}, history=hist)
+    monkeypatch.setattr(analysis_engine, "get_market_snapshot", lambda _ticker: (snapshot, {}))
+    monkeypatch.setattr(analysis_engine, "fetch_vix_history", lambda _start, _end: vix)
+    monkeypatch.setattr(analysis_engine, "ohlcv_store", OhlcvStore(str(tmp_path), backfill_days=0))
+    monkeypatch.setattr(
+        analysis_engine.yf,
+        "Ticker",
+        lambda _ticker: SimpleNamespace(history=lambda **_kwargs: hist),
+    )
+    return snapshot
+
+
+def test_last_day_matches_the_live_deterministic_composite(monkeypatch, tmp_path):
+    hist = _history()
+    vix = pd.Series(np.linspace(14.0, 24.0, len(hist)), index=hist.index)
+    snapshot = _patch_sources(monkeypatch, tmp_path, hist, vix)
+
+    result = analysis_engine.score_history("aapl", "2025-03-10", "2026-03-10")
+
+    macro = MacroSnapshot(
+        vix_level=round(float(vix.iloc[-1]), 2),
+        federal_funds_rate_trend="Stable",
+        us_gdp_expectation_pct=2.0,
+        sources={},
+    )
+    inputs = analysis_engine._prepare_inputs(
+        "AAPL",
+        "2026-03-10",
+        {"market data": snapshot, "price history": hist, "macro snapshot": (macro, {}), "news": []},
+    )
+    live = analysis_engine._deterministic_composite(inputs)["sub_scores"]
+    last = result["series"][-1]
+
+    assert last["date"] == "2026-03-10"
+    assert {key: last["sub_scores"][key] for key in ("Fundamental", "Technical", "Macro_Risk")} == {
+        key: live[key] for key in ("Fundamental", "Technical", "Macro_Risk")
+    }
+    expected = round(sum(last["sub_scores"][key] * weight for key, weight in result["score_weights"].items()))
+    assert last["score"] == expected
+    assert last["recommendation"] == analysis_engine._classify_score(expected)
+
+
+def test_series_covers_only_the_requested_trading_days(monkeypatch, tmp_path):
+    hist = _history()
+    _patch_sources(monkeypatch, tmp_path, hist, pd.Series(dtype="float64"))
+
+    started = time.perf_counter()
+    result = analysis_engine.score_history("AAPL", "2025-03-10", "2026-03-10")
+    elapsed = time.perf_counter() - started
+
+    dates = [point["date"] for point in result["series"]]
+    assert dates[0] == "2025-03-10" and dates[-1] == "2026-03-10"
+    assert result["metadata"]["points"] == len(dates) == 262
+    assert result["metadata"]["vixSource"] == "fallback"
+    assert len({point["score"] for point in result["series"]}) > 1
+    assert elapsed < 0.5
+
+
+def test_rejects_inverted_or_oversized_ranges():
+    with pytest.raises(ApiError) as inverted:
+        analysis_engine.score_history("AAPL", "2026-03-10", "2025-03-10")
+    with pytest.raises(ApiError) as oversized:
+        analysis_engine.score_history("AAPL", "2015-01-01", "2026-03-10")
+    with pytest.raises(ApiError) as malformed:
+        analysis_engine.score_history("AAPL", "03/10/2025", None)
+
+    assert inverted.value.code == oversized.value.code == "INVALID_RANGE"
+    assert malformed.value.code == "INVALID_DATE"
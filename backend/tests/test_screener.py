@@ -0,0 +1,92 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+import analysis_engine
+from services import screener
+from services.macro_service import MacroSnapshot
+from services.market_data import MarketDataSnapshot
+
+
+def _history(seed, days):
+    index = pd.date_range(end="2026-03-10", periods=days, freq="B", tz="America/New_York", name="Date")
+    close = 80.0 + np.cumsum(np.random.default_rng(seed).normal(0.1, 1.2, days))
+    volume = np.random.default_rng(seed + 100).integers(500_000, 1_500_000, days).astype(float)
+    return pd.DataFrame(
+        {"Open": close - 0.4, "High": close + 1.1, "Low": close - 1.3, "Close": close, "Volume": volume},
+        index=index,
+    )
+
+
+def _snapshot(ticker, seed, days, **info):
+    hist = _history(seed, days)
+    info = {"shortName": ticker, "currentPrice": float(hist["Close"].iloc[-1]), **info}
+    return MarketDataSnapshot(ticker=ticker, info=info, fast_info={}, history=hist)
+
+
+UNIVERSE = [
+    _snapshot("AAA", 1, 260, marketCap=2.5e12, trailingPE=18.0, returnOnEquity=0.31, debtToEquity=40.0, beta=0.9),
+    _snapshot("BBB", 2, 260, marketCap=4.0e10, trailingPE=55.0, pegRatio=3.4, freeCashflow=-1e9, beta=1.7),
+    _snapshot("CCC", 3, 120, marketCap=3.0e9, trailingPE=12.0, earningsQuarterlyGrowth=0.25, beta=1.1),
+    _snapshot("DDD", 4, 260, marketCap=5.0e8, returnOnEquity=0.02, debtToEquity=320.0, beta=2.4),
+]
+
+
+def test_columnar_scores_match_the_live_composite():
+    vix = 21.3
+    features = screener.build_universe_features(UNIVERSE)
+    scored = screener.score_universe(features, vix)
+    macro = MacroSnapshot(vix_level=vix, federal_funds_rate_trend="Stable", us_gdp_expectation_pct=2.0, sources={})
+
+    for position, snapshot in enumerate(UNIVERSE):
+        inputs = analysis_engine._prepare_inputs(
+            snapshot.ticker,
+            "2026-03-10",
+            {"market data": snapshot, "price history": snapshot.history, "macro snapshot": (macro, {}), "news": []},
+        )
+        live = analysis_engine._deterministic_composite(inputs)
+        assert scored["stockProfile"][position] == live["stockProfile"]
+        for key in ("Fundamental", "Technical", "Macro_Risk"):
+            assert scored[key][position] == live["sub_scores"][key], (snapshot.ticker, key)
+
+
+def test_screen_filters_and_ranks_a_large_universe_quickly():
+    size = 500
+    rng = np.random.default_rng(42)
+    features = screener.UniverseFeatures(
+        tickers=np.asarray([f"T{index:03d}" for index in range(size)], dtype=object),
+        names=np.asarray([f"Company {index}" for index in range(size)], dtype=object),
+        price=rng.uniform(20, 400, size),
+        market_cap=rng.choice([5e8, 5e9, 5e10, 5e11], size),
+        pe=rng.uniform(5, 80, size),
+        peg=rng.uniform(0.5, 4, size),
+        roe=rng.uniform(-5, 40, size),
+        debt=rng.uniform(0, 3, size),
+        fcf_yield=rng.uniform(-3, 9, size),
+        eps_growth=rng.uniform(-10, 35, size),
+        beta=rng.uniform(0.5, 2.5, size),
+        sma50=rng.uniform(20, 400, size),
+        sma200=rng.uniform(20, 400, size),
+        rsi14=rng.uniform(10, 90, size),
+        williams_r=rng.uniform(-100, 0, size),
+        macd_direction=rng.choice([1, -1], size),
+        volume_direction=rng.choice([1, -1], size),
+        built_at=time.time(),
+    )
+
+    screener.screen(features, 18.0)  # warm-up
+    started = time.perf_counter()
+    rows, matched = screener.screen(
+        features, 18.0, min_sub_scores={"Fundamental": 55}, caps={"large_cap", "mega_cap"}, limit=20
+    )
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.1
+    assert 0 < len(rows) <= 20 <= matched
+    assert all(row["stockProfile"] in {"large_cap", "mega_cap"} for row in rows)
+    assert all(row["sub_scores"]["Fundamental"] >= 55 for row in rows)
+    assert [row["score"] for row in rows] == sorted((row["score"] for row in rows), reverse=True)
+
+    held = {row["recommendation"] for row in screener.screen(features, 18.0, classifications={"HOLD"}, limit=500)[0]}
+    assert held == {"HOLD"}
@@ -483,6 +483,13 @@ export default function StockDashboard({ initialTicker, onBack }) {
                                     const parsed = JSON.parse(line.substring(6));
                                     if (parsed.type === 'status') {
                                         setStreamMsg(parsed.message);
+                                    } else if (parsed.type === 'provisional') {
+                                        setStreamMsg(`Provisional score ${parsed.data.score} (${parsed.data.recommendation}). Agents are debating...`);
+                                    } else if (parsed.type === 'agent_delta') {
+                                        if (parsed.agent && Object.prototype.hasOwnProperty.call(currentDebate, parsed.agent)) {
+                                            currentDebate[parsed.agent] = (currentDebate[parsed.agent] || '') + parsed.text;
+                                            setLiveDebate({ ...currentDebate });
+                                        }
                                     } else if (parsed.type === 'agent_done') {
                                         if (parsed.agent && Object.prototype.hasOwnProperty.call(currentDebate, parsed.agent)) {
                                             currentDebate[parsed.agent] = parsed.text;